@@ -1,15 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import Optional
 
-import uuid
 import jwt
 import logging
 
-from ..models.user import User, UserCreate, UserUpdate, UserInDB, ChangePassword, Token, TokenData
-from ..services.auth_service import verify_password, get_password_hash, authenticate_user, create_access_token
+from ..db_config import get_async_read_db
+from ..models.user import User as UserModel, UserType
+from ..models.transaction import User, UserCreate, UserUpdate, ChangePassword, Token, RefreshTokenRequest
+from ..services.token_cache import token_cache
+from ..services.auth_service import verify_password_async, get_password_hash_async, authenticate_user, create_token_pair, refresh_access_token, rehash_password_if_needed
+from ..services.sqlite_writer import run_write
+from ..utils.ids import new_id
 from ..utils.security import get_current_user
 from ..utils.validators import validate_input
 
@@ -23,29 +29,21 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Dependencia para obtener la sesión de base de datos
-def get_db():
-    db = None
-    try:
-        # Aquí iría el código para obtener la sesión de base de datos
-        # Para este ejemplo, simularemos una DB en memoria
-        db = {}
-        yield db
-    finally:
-        if db:
-            # Cerrar conexión si es necesario
-            pass
+async def _get_user_by_email(db: AsyncSession, email: str) -> Optional[UserModel]:
+    """
+    Busca un usuario por email
+    """
+    return await db.scalar(select(UserModel).where(UserModel.email == email))
 
 # Configuración de seguridad
 SECRET_KEY = "YOUR_SECRET_KEY_HERE"  # En producción usar variables de entorno
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
 # Endpoint para login
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_read_db)):
     """
     Endpoint para autenticación y obtención de token JWT
     """
@@ -58,7 +56,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     
     # Autenticar usuario
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         logger.warning(f"Intento de login fallido para: {form_data.username}")
         raise HTTPException(
@@ -67,23 +65,39 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Crear token de acceso
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    # Actualizar el hash si usa el formato anterior o un coste menor al actual
+    await rehash_password_if_needed(user, form_data.password)
+    
+    # Crear token de acceso (con los claims del usuario) y refresh token
+    tokens = create_token_pair(user)
     
     logger.info(f"Login exitoso para: {user.email}")
-    return {"access_token": access_token, "token_type": "bearer"}
+    return tokens
+
+# Endpoint para renovar el token de acceso
+@router.post("/refresh", response_model=Token)
+async def refresh_token(request: RefreshTokenRequest, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Endpoint para obtener un nuevo token de acceso a partir del refresh token
+    """
+    tokens = await refresh_access_token(db, request.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o revocado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return tokens
 
 # Endpoint para registro
 @router.post("/register", response_model=Token)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_read_db)):
     """
     Endpoint para registro de nuevos usuarios
     """
     # Validar que no exista el email
-    db_user = db.get(user_data.email, None)
+    db_user = await _get_user_by_email(db, user_data.email)
     if db_user:
         logger.warning(f"Intento de registro con email ya existente: {user_data.email}")
         raise HTTPException(
@@ -92,32 +106,41 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Crear nuevo usuario
-    user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(user_data.password)
+    user_id = new_id()
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Guardar en base de datos
-    new_user = {
-        "id": user_id,
-        "name": user_data.name,
-        "email": user_data.email,
-        "hashed_password": hashed_password,
-        "type": user_data.type,
-        "birthdate": user_data.birthdate,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
-    
-    # Simular guardado en base de datos
-    db[user_data.email] = new_user
-    
-    # Crear token de acceso
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user_data.email}, expires_delta=access_token_expires
+    new_user = UserModel(
+        id=user_id,
+        name=user_data.name,
+        email=user_data.email,
+        hashed_password=hashed_password,
+        type=UserType(user_data.type),
+        birthdate=user_data.birthdate,
+        profile_version=1,
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow()
     )
     
+    def insert_user(session):
+        session.add(new_user)
+        session.flush()
+    
+    try:
+        await run_write(insert_user)
+    except IntegrityError:
+        # Otro registro con el mismo email se confirmó mientras se calculaba el hash
+        logger.warning(f"Intento de registro con email ya existente: {user_data.email}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email ya está registrado",
+        )
+    
+    # Crear token de acceso y refresh token
+    tokens = create_token_pair(new_user)
+    
     logger.info(f"Nuevo usuario registrado: {user_data.email}")
-    return {"access_token": access_token, "token_type": "bearer"}
+    return tokens
 
 # Endpoint para obtener usuario actual
 @router.get("/me", response_model=User)
@@ -132,13 +155,13 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 async def change_password(
     password_data: ChangePassword,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para cambiar la contraseña del usuario
     """
     # Obtener usuario de la base de datos
-    user = db.get(current_user.email)
+    user = await _get_user_by_email(db, current_user.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -146,7 +169,7 @@ async def change_password(
         )
     
     # Verificar contraseña actual
-    if not verify_password(password_data.old_password, user["hashed_password"]):
+    if not await verify_password_async(password_data.old_password, user.hashed_password):
         logger.warning(f"Intento fallido de cambio de contraseña para: {current_user.email}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -154,12 +177,30 @@ async def change_password(
         )
     
     # Actualizar contraseña
-    hashed_password = get_password_hash(password_data.new_password)
-    user["hashed_password"] = hashed_password
-    user["updated_at"] = datetime.utcnow()
+    new_hash = await get_password_hash_async(password_data.new_password)
     
-    # Actualizar en base de datos
-    db[current_user.email] = user
+    # Actualizar en base de datos solo si el hash no cambió mientras se verificaba.
+    # Nueva versión del perfil: los refresh tokens anteriores dejan de valer
+    version = await run_write(lambda session: session.execute(
+        update(UserModel)
+        .where(UserModel.id == user.id, UserModel.hashed_password == user.hashed_password)
+        .values(
+            hashed_password=new_hash,
+            updated_at=datetime.utcnow(),
+            profile_version=UserModel.profile_version + 1
+        )
+        .returning(UserModel.profile_version)
+        .execution_options(synchronize_session=False)
+    ).scalar())
+    if version is None:
+        logger.warning(f"Cambio de contraseña simultáneo para: {current_user.email}")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La contraseña cambió durante la solicitud, inténtalo de nuevo",
+        )
+    
+    # Los tokens de acceso emitidos antes del cambio dejan de aceptarse
+    token_cache.revoke_before(user.id, version, user.email)
     
     logger.info(f"Contraseña cambiada para: {current_user.email}")
     return {"message": "Contraseña cambiada exitosamente"}
@@ -169,13 +210,13 @@ async def change_password(
 async def update_profile(
     user_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para actualizar el perfil del usuario
     """
     # Obtener usuario de la base de datos
-    user = db.get(current_user.email)
+    user = await _get_user_by_email(db, current_user.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -183,30 +224,43 @@ async def update_profile(
         )
     
     # Actualizar campos si fueron proporcionados
+    values = {"updated_at": datetime.utcnow(), "profile_version": UserModel.profile_version + 1}
     if user_data.name:
-        user["name"] = user_data.name
+        values["name"] = user_data.name
     
     if user_data.email and user_data.email != current_user.email:
         # Verificar que el nuevo email no exista
-        if user_data.email in db:
+        if await _get_user_by_email(db, user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El email ya está en uso",
             )
         
-        # Cambiar la clave en el diccionario simulado
-        old_email = current_user.email
-        db[user_data.email] = user
-        del db[old_email]
-        user["email"] = user_data.email
+        values["email"] = user_data.email
+    
+    try:
+        version = await run_write(lambda session: session.execute(
+            update(UserModel)
+            .where(UserModel.id == user.id)
+            .values(**values)
+            .returning(UserModel.profile_version)
+            .execution_options(synchronize_session=False)
+        ).scalar())
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email ya está en uso",
+        )
     
-    user["updated_at"] = datetime.utcnow()
+    # Los tokens de acceso anteriores llevan los datos antiguos en sus claims
+    if version is not None:
+        token_cache.revoke_before(user.id, version, values.get("email", user.email), current_user.email)
     
     logger.info(f"Perfil actualizado para: {current_user.email}")
     return {
-        "id": user["id"],
-        "name": user["name"],
-        "email": user["email"],
-        "type": user["type"],
-        "birthdate": user.get("birthdate")
+        "id": user.id,
+        "name": values.get("name", user.name),
+        "email": values.get("email", user.email),
+        "type": user.type.value if user.type else None,
+        "birthdate": user.birthdate
     }
\ No newline at end of file
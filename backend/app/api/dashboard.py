@@ -0,0 +1,95 @@
+"""
+Módulo para el panel principal de la aplicación en la API
+"""
+from fastapi import APIRouter, Depends, Query
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime
+import logging
+
+from ..models.transaction import Dashboard
+from ..models.user import User
+from ..utils.security import get_current_user
+from ..services.transaction_repository import AsyncTransactionRepository
+from ..services.transaction_service import get_category_summary
+from ..services.transaction_store import AsyncTransactionStore
+from ..utils.pagination import page_with_cursor
+from .transactions import _parse_cursor, conditional_get, get_db
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Configuración del router
+router = APIRouter(
+    prefix="/api/dashboard",
+    tags=["dashboard"],
+    responses={404: {"description": "Not found"}},
+)
+
+def _format_transaction(tx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Campos de una transacción que devuelve el panel
+    """
+    return {
+        "id": tx["id"],
+        "type": tx["type"],
+        "category": tx["category"],
+        "subcategory": tx.get("subcategory"),
+        "amount": tx["amount"],
+        "date": tx["date"],
+        "detail": tx["detail"]
+    }
+
+def _format_page(transactions: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """
+    Recorta una página pedida con limit + 1 filas y la formatea con su cursor
+    """
+    page, next_cursor = page_with_cursor(transactions, limit)
+    return {"transactions": [_format_transaction(tx) for tx in page], "next_cursor": next_cursor}
+
+# Endpoint para obtener el panel principal
+@router.get("", response_model=Dashboard, dependencies=[Depends(conditional_get)])
+async def get_dashboard(
+    current_user: User = Depends(get_current_user),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db),
+    recent: int = Query(5, ge=0, le=50),
+    limit: int = Query(20, ge=1, le=100),
+    income_cursor: Optional[str] = Query(None),
+    expense_cursor: Optional[str] = Query(None),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=2020, le=2100),
+    top: int = Query(5, ge=1, le=50)
+):
+    """
+    Endpoint que reúne en una sola respuesta el balance, las últimas
+    transacciones, una página de ingresos y otra de egresos y las categorías
+    principales del mes (por defecto el actual). Sustituye las cuatro
+    llamadas que hacía la aplicación al refrescar sus datos; las páginas
+    siguientes de cada tipo se piden con income_cursor / expense_cursor.
+    """
+    today = datetime.utcnow()
+    month = month or today.month
+    year = year or today.year
+
+    # Una sola llamada al almacén: índices, totales y acumulados del mes
+    data = await db.dashboard(
+        current_user.id,
+        (year, month),
+        recent,
+        limit,
+        income_after=_parse_cursor(income_cursor),
+        expense_after=_parse_cursor(expense_cursor)
+    )
+    income_amount, expense_amount = data["balance"]
+
+    return {
+        "balance": income_amount - expense_amount,
+        "total_income": income_amount,
+        "total_expense": expense_amount,
+        "recent_transactions": [_format_transaction(tx) for tx in data["recent"]],
+        "income_transactions": _format_page(data["income"], limit),
+        "expense_transactions": _format_page(data["expense"], limit),
+        "month": month,
+        "year": year,
+        "top_income_categories": get_category_summary(data["month_cells"], "income")[:top],
+        "top_expense_categories": get_category_summary(data["month_cells"], "expense")[:top]
+    }
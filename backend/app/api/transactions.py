@@ -1,16 +1,28 @@
 """
 Módulo para manejar las transacciones financieras en la API
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
 from datetime import datetime, date
-import uuid
 import logging
 
-from ..models.transaction import Transaction, TransactionCreate, TransactionUpdate, TransactionList, Balance, CategorySummary, MonthlyAnalysis
+from ..models.transaction import Transaction_Schema, TransactionCreate, TransactionUpdate, TransactionList, Balance, CategoryAnalysis, MonthlyAnalysis, BulkImportResult
 from ..models.user import User
 from ..utils.security import get_current_user
+from ..db_config import AsyncReadSessionLocal, settings
+from ..services.data_version import data_versions
+from ..services.result_cache import ANY_CHANGE, category_tag, memoize, month_tag
+from ..services.single_flight import coalesce
+from ..services.transaction_export import MEDIA_TYPES, export_transactions
+from ..services.transaction_import import import_transactions, prepare_transaction
+from ..services.sqlite_writer import WRITER_ENABLED, sqlite_writer
+from ..services.transaction_repository import AsyncTransactionRepository
+from ..services.transaction_service import get_category_rows, get_category_summary, get_transaction_trends
+from ..services.transaction_store import AsyncTransactionStore, transaction_store
+from ..utils.formatting import date_to_ordinal, month_of_ordinal
+from ..utils.http_cache import etag_matches, make_etag
+from ..utils.pagination import decode_cursor, page_with_cursor
 from ..utils.validators import validate_input
 
 # Configuración de logging
@@ -23,57 +35,107 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Dependencia para obtener la sesión de base de datos
-def get_db():
-    db = None
+# Almacén en memoria compartido, con la interfaz asíncrona de los routers
+async_transaction_store = AsyncTransactionStore(transaction_store)
+
+# Dependencia para obtener el almacén de transacciones
+async def get_db():
+    if settings.TRANSACTION_BACKEND != "sql":
+        # El almacén es compartido entre solicitudes y está indexado por usuario,
+        # id y tipo, por lo que ningún endpoint recorre la lista global
+        yield async_transaction_store
+        return
+    
+    # Repositorio SQL sobre una sesión asíncrona: las consultas no bloquean el event loop.
+    # En el perfil de producción de SQLite las lecturas usan el pool de solo
+    # lectura; con él o con group commit las escrituras se encolan en la tarea escritora
+    async with AsyncReadSessionLocal() as session:
+        yield AsyncTransactionRepository(session, writer=sqlite_writer if WRITER_ENABLED else None)
+
+def _parse_date_filter(value: Optional[str]) -> Optional[int]:
+    """
+    Convierte un filtro de fecha de la consulta en ordinal de día
+    """
+    if not value:
+        return None
+    
+    ordinal = date_to_ordinal(value, datetime.utcnow().year)
+    if ordinal is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de fecha inválido",
+        )
+    return ordinal
+
+def _parse_cursor(cursor: Optional[str]):
+    """
+    Decodifica el cursor de paginación recibido en la consulta
+    """
     try:
-        # Aquí iría el código para obtener la sesión de base de datos
-        # Para este ejemplo, simularemos una DB en memoria
-        db = {"transactions": []}
-        yield db
-    finally:
-        if db:
-            # Cerrar conexión si es necesario
-            pass
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido",
+        )
+
+def _write_tags(*transactions: dict) -> list:
+    """
+    Etiquetas (mes y categoría) de los resultados que invalida una escritura
+    """
+    tags = []
+    for tx in transactions:
+        tags.append(month_tag(*month_of_ordinal(tx["date_ordinal"])))
+        tags.append(category_tag(tx["category"]))
+    return tags
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+) -> str:
+    """
+    Dependencia de las lecturas: calcula el ETag del recurso a partir de la
+    versión de datos del usuario y responde 304 si coincide con
+    If-None-Match, antes de consultar el almacén o serializar nada
+    """
+    version = await data_versions.get(current_user.id)
+    resource = f"{request.url.path}?{request.url.query}"
+    etag = make_etag(current_user.id, version, resource, data_versions.epoch)
+    
+    # El cliente debe revalidar siempre, pero puede reutilizar su copia
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return etag
 
 # Endpoint para crear una transacción
-@router.post("", response_model=Transaction)
+@router.post("", response_model=Transaction_Schema)
 async def create_transaction(
     transaction: TransactionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
 ):
     """
     Endpoint para crear una nueva transacción
     """
-    # Validación adicional de seguridad
-    for field in [transaction.category, transaction.subcategory, transaction.date, transaction.detail]:
-        if field and not validate_input(field):
-            logger.warning(f"Posible intento de XSS en transacción para usuario: {current_user.email}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No se permiten usar caracteres especiales",
-            )
-    
-    # Crear ID único para la transacción
-    transaction_id = str(uuid.uuid4())
+    # Validación adicional de seguridad y de fecha; preparar datos para guardar
+    try:
+        transaction_data = prepare_transaction(transaction, current_user.id, datetime.utcnow())
+    except ValueError as e:
+        logger.warning(f"Transacción rechazada para usuario {current_user.email}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
     
-    # Preparar datos para guardar
-    transaction_data = {
-        "id": transaction_id,
-        "user_id": current_user.id,
-        "type": transaction.type,
-        "category": transaction.category,
-        "subcategory": transaction.subcategory,
-        "amount": transaction.amount,
-        "date": transaction.date,
-        "detail": transaction.detail,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
+    transaction_id = transaction_data["id"]
     
-    # Guardar en base de datos simulada
-    db["transactions"].append(transaction_data)
+    # Guardar en el almacén indexado
+    await db.add(transaction_data)
+    await data_versions.bump(current_user.id, _write_tags(transaction_data))
     
     logger.info(f"Nueva transacción creada: {transaction_id} por usuario: {current_user.email}")
     
@@ -88,40 +150,68 @@ async def create_transaction(
         "detail": transaction.detail
     }
 
+# Endpoint para importar transacciones de forma masiva
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_transactions(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
+):
+    """
+    Endpoint para importar transacciones desde un cuerpo NDJSON o CSV.
+    El cuerpo se lee en streaming y se valida e inserta por lotes, así que
+    nunca se mantiene la carga completa en memoria.
+    """
+    # Formato explícito o deducido del Content-Type
+    data_format = format
+    if data_format is None:
+        content_type = request.headers.get("content-type", "")
+        data_format = "csv" if "csv" in content_type else "ndjson"
+    
+    try:
+        result = await import_transactions(db, current_user.id, request.stream(), data_format)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    finally:
+        # Los lotes ya confirmados cuentan aunque la importación falle después;
+        # sin etiquetas se invalidan todos los resultados del usuario
+        await data_versions.bump(current_user.id)
+    
+    return result
+
 # Endpoint para obtener todas las transacciones
-@router.get("", response_model=TransactionList)
+@router.get("", response_model=TransactionList, dependencies=[Depends(conditional_get)])
 async def get_transactions(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     type: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None)
+    end_date: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None)
 ):
     """
     Endpoint para obtener las transacciones del usuario con filtros opcionales
     """
-    # Filtrar transacciones por usuario
-    user_transactions = [tx for tx in db["transactions"] if tx["user_id"] == current_user.id]
-    
-    # Aplicar filtros adicionales si existen
-    if type:
-        user_transactions = [tx for tx in user_transactions if tx["type"] == type]
-    
-    if category:
-        user_transactions = [tx for tx in user_transactions if tx["category"] == category]
-    
-    # Filtrar por rango de fechas si se proporcionan
-    if start_date:
-        user_transactions = [tx for tx in user_transactions if tx["date"] >= start_date]
-    
-    if end_date:
-        user_transactions = [tx for tx in user_transactions if tx["date"] <= end_date]
-    
-    # Aplicar paginación
-    paginated_transactions = user_transactions[skip:skip + limit]
+    # Obtener transacciones del usuario con filtros y paginación aplicados por el almacén
+    # (se pide una fila extra para saber si existe una página siguiente)
+    transactions = await db.list_for_user(
+        current_user.id,
+        type,
+        category=category,
+        start_ordinal=_parse_date_filter(start_date),
+        end_ordinal=_parse_date_filter(end_date),
+        skip=skip,
+        limit=limit + 1,
+        after=_parse_cursor(cursor)
+    )
+    paginated_transactions, next_cursor = page_with_cursor(transactions, limit)
     
     # Formatear resultados
     result = []
@@ -136,27 +226,25 @@ async def get_transactions(
             "detail": tx["detail"]
         })
     
-    return {"transactions": result}
+    return {"transactions": result, "next_cursor": next_cursor}
 
 # Endpoint para obtener ingresos
-@router.get("/income", response_model=TransactionList)
+@router.get("/income", response_model=TransactionList, dependencies=[Depends(conditional_get)])
 async def get_income_transactions(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None)
 ):
     """
     Endpoint para obtener las transacciones de tipo ingreso
     """
     # Filtrar transacciones por usuario y tipo ingreso
-    income_transactions = [
-        tx for tx in db["transactions"]
-        if tx["user_id"] == current_user.id and tx["type"] == "income"
-    ]
-    
-    # Aplicar paginación
-    paginated_transactions = income_transactions[skip:skip + limit]
+    transactions = await db.list_for_user(
+        current_user.id, "income", skip=skip, limit=limit + 1, after=_parse_cursor(cursor)
+    )
+    paginated_transactions, next_cursor = page_with_cursor(transactions, limit)
     
     # Formatear resultados
     result = []
@@ -171,27 +259,25 @@ async def get_income_transactions(
             "detail": tx["detail"]
         })
     
-    return {"transactions": result}
+    return {"transactions": result, "next_cursor": next_cursor}
 
 # Endpoint para obtener egresos
-@router.get("/expense", response_model=TransactionList)
+@router.get("/expense", response_model=TransactionList, dependencies=[Depends(conditional_get)])
 async def get_expense_transactions(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None)
 ):
     """
     Endpoint para obtener las transacciones de tipo egreso
     """
     # Filtrar transacciones por usuario y tipo egreso
-    expense_transactions = [
-        tx for tx in db["transactions"]
-        if tx["user_id"] == current_user.id and tx["type"] == "expense"
-    ]
-    
-    # Aplicar paginación
-    paginated_transactions = expense_transactions[skip:skip + limit]
+    transactions = await db.list_for_user(
+        current_user.id, "expense", skip=skip, limit=limit + 1, after=_parse_cursor(cursor)
+    )
+    paginated_transactions, next_cursor = page_with_cursor(transactions, limit)
     
     # Formatear resultados
     result = []
@@ -206,47 +292,15 @@ async def get_expense_transactions(
             "detail": tx["detail"]
         })
     
-    return {"transactions": result}
-
-# Endpoint para obtener una transacción específica
-@router.get("/{transaction_id}", response_model=Transaction)
-async def get_transaction(
-    transaction_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Endpoint para obtener una transacción específica
-    """
-    # Buscar la transacción
-    transaction = next(
-        (tx for tx in db["transactions"] if tx["id"] == transaction_id and tx["user_id"] == current_user.id),
-        None
-    )
-    
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transacción no encontrada"
-        )
-    
-    return {
-        "id": transaction["id"],
-        "type": transaction["type"],
-        "category": transaction["category"],
-        "subcategory": transaction.get("subcategory"),
-        "amount": transaction["amount"],
-        "date": transaction["date"],
-        "detail": transaction["detail"]
-    }
+    return {"transactions": result, "next_cursor": next_cursor}
 
 # Endpoint para actualizar una transacción
-@router.put("/{transaction_id}", response_model=Transaction)
+@router.put("/{transaction_id}", response_model=Transaction_Schema)
 async def update_transaction(
     transaction_id: str,
     transaction_update: TransactionUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
 ):
     """
     Endpoint para actualizar una transacción existente
@@ -261,42 +315,55 @@ async def update_transaction(
                 detail="No se permiten usar caracteres especiales",
             )
     
-    # Buscar la transacción
-    transaction_index = None
-    for i, tx in enumerate(db["transactions"]):
-        if tx["id"] == transaction_id and tx["user_id"] == current_user.id:
-            transaction_index = i
-            break
-    
-    if transaction_index is None:
+    # Estado anterior: año de creación para las fechas y mes/categoría que se invalidan
+    existing = await db.get(current_user.id, transaction_id)
+    if existing is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Transacción no encontrada"
         )
+    # El almacén en memoria modifica el registro en su sitio: etiquetas antes de actualizar
+    previous_tags = _write_tags(existing)
     
-    # Actualizar campos si fueron proporcionados
-    transaction = db["transactions"][transaction_index]
+    # Preparar campos a actualizar si fueron proporcionados
+    changes = {}
     
     if transaction_update.category:
-        transaction["category"] = transaction_update.category
+        changes["category"] = transaction_update.category
     
     if transaction_update.subcategory:
-        transaction["subcategory"] = transaction_update.subcategory
+        changes["subcategory"] = transaction_update.subcategory
     
     if transaction_update.amount:
-        transaction["amount"] = transaction_update.amount
+        changes["amount"] = transaction_update.amount
     
     if transaction_update.date:
-        transaction["date"] = transaction_update.date
+        # Las fechas sin año se interpretan en el año en que se creó la transacción
+        date_ordinal = date_to_ordinal(transaction_update.date, existing["created_at"].year)
+        if date_ordinal is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Formato de fecha inválido",
+            )
+        
+        changes["date"] = transaction_update.date
+        changes["date_ordinal"] = date_ordinal
     
     if transaction_update.detail:
-        transaction["detail"] = transaction_update.detail
+        changes["detail"] = transaction_update.detail
+    
+    changes["updated_at"] = datetime.utcnow()
     
-    transaction["updated_at"] = datetime.utcnow()
+    # Actualizar en el almacén indexado
+    transaction = await db.update(current_user.id, transaction_id, changes)
     
-    # Actualizar en la lista
-    db["transactions"][transaction_index] = transaction
+    if transaction is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transacción no encontrada"
+        )
     
+    await data_versions.bump(current_user.id, previous_tags + _write_tags(transaction))
     logger.info(f"Transacción actualizada: {transaction_id} por usuario: {current_user.email}")
     
     return {
@@ -314,55 +381,43 @@ async def update_transaction(
 async def delete_transaction(
     transaction_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
 ):
     """
     Endpoint para eliminar una transacción
     """
-    # Buscar la transacción
-    transaction_index = None
-    for i, tx in enumerate(db["transactions"]):
-        if tx["id"] == transaction_id and tx["user_id"] == current_user.id:
-            transaction_index = i
-            break
+    # Eliminar la transacción de todos los índices
+    transaction = await db.delete(current_user.id, transaction_id)
     
-    if transaction_index is None:
+    if transaction is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Transacción no encontrada"
         )
     
-    # Eliminar la transacción
-    db["transactions"].pop(transaction_index)
-    
+    await data_versions.bump(current_user.id, _write_tags(transaction))
     logger.info(f"Transacción eliminada: {transaction_id} por usuario: {current_user.email}")
     
     return {"message": "Transacción eliminada correctamente"}
 
 # Endpoint para obtener el balance
-@router.get("/balance", response_model=Balance)
+@router.get("/balance", response_model=Balance, dependencies=[Depends(conditional_get)])
+@coalesce("balance")
 async def get_balance(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None)
 ):
     """
     Endpoint para obtener el balance financiero del usuario
     """
-    # Obtener todas las transacciones del usuario
-    user_transactions = [tx for tx in db["transactions"] if tx["user_id"] == current_user.id]
-    
-    # Aplicar filtros de fecha si se proporcionan
-    if start_date:
-        user_transactions = [tx for tx in user_transactions if tx["date"] >= start_date]
-    
-    if end_date:
-        user_transactions = [tx for tx in user_transactions if tx["date"] <= end_date]
-    
-    # Calcular balance
-    income_amount = sum(tx["amount"] for tx in user_transactions if tx["type"] == "income")
-    expense_amount = sum(tx["amount"] for tx in user_transactions if tx["type"] == "expense")
+    # Obtener los totales incrementales del usuario (sin recorrer sus transacciones)
+    income_amount, expense_amount = await db.get_balance(
+        current_user.id,
+        start_ordinal=_parse_date_filter(start_date),
+        end_ordinal=_parse_date_filter(end_date)
+    )
     balance = income_amount - expense_amount
     
     return {
@@ -374,75 +429,29 @@ async def get_balance(
     }
 
 # Endpoint para obtener análisis mensual
-@router.get("/analysis/monthly", response_model=MonthlyAnalysis)
+@router.get("/analysis/monthly", response_model=MonthlyAnalysis, dependencies=[Depends(conditional_get)])
+@memoize("analysis_monthly", tags=lambda params: [month_tag(params["year"], params["month"])])
+@coalesce("analysis_monthly")
 async def get_monthly_analysis(
     month: int = Query(..., ge=1, le=12),
     year: int = Query(..., ge=2020, le=2100),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
 ):
     """
     Endpoint para obtener análisis financiero mensual
     """
-    # Obtener todas las transacciones del usuario
-    user_transactions = [tx for tx in db["transactions"] if tx["user_id"] == current_user.id]
-    
-    # Filtrar por mes y año
-    # Suponemos que la fecha está en formato "YYYY-MM-DD"
-    start_date = f"{year}-{month:02d}-01"
-    end_date = f"{year}-{month:02d}-31" if month != 2 else f"{year}-{month:02d}-{29 if year % 4 == 0 else 28}"
-    filtered_transactions = [tx for tx in user_transactions if start_date <= tx["date"] <= end_date]
-    
-    # Separar ingresos y gastos
-    income_transactions = [tx for tx in filtered_transactions if tx["type"] == "income"]
-    expense_transactions = [tx for tx in filtered_transactions if tx["type"] == "expense"]
+    # Leer las celdas ya agregadas del mes (tipo, categoría, subcategoría)
+    month_cells = await db.rollup_cells(current_user.id, (year, month), (year, month))
     
     # Calcular totales
-    total_income = sum(tx["amount"] for tx in income_transactions)
-    total_expense = sum(tx["amount"] for tx in expense_transactions)
+    total_income = sum(cell["amount"] for cell in month_cells if cell["type"] == "income")
+    total_expense = sum(cell["amount"] for cell in month_cells if cell["type"] == "expense")
     balance = total_income - total_expense
     
-    # Agrupar por categoría
-    income_by_category = {}
-    for tx in income_transactions:
-        category = tx["category"]
-        if category not in income_by_category:
-            income_by_category[category] = {"amount": 0, "count": 0}
-        income_by_category[category]["amount"] += tx["amount"]
-        income_by_category[category]["count"] += 1
-    
-    expense_by_category = {}
-    for tx in expense_transactions:
-        category = tx["category"]
-        if category not in expense_by_category:
-            expense_by_category[category] = {"amount": 0, "count": 0}
-        expense_by_category[category]["amount"] += tx["amount"]
-        expense_by_category[category]["count"] += 1
-    
-    # Calcular porcentajes
-    top_income_categories = []
-    for category, data in income_by_category.items():
-        percentage = (data["amount"] / total_income) * 100 if total_income > 0 else 0
-        top_income_categories.append({
-            "category": category,
-            "amount": data["amount"],
-            "percentage": percentage,
-            "count": data["count"]
-        })
-    
-    top_expense_categories = []
-    for category, data in expense_by_category.items():
-        percentage = (data["amount"] / total_expense) * 100 if total_expense > 0 else 0
-        top_expense_categories.append({
-            "category": category,
-            "amount": data["amount"],
-            "percentage": percentage,
-            "count": data["count"]
-        })
-    
-    # Ordenar por monto (de mayor a menor)
-    top_income_categories.sort(key=lambda x: x["amount"], reverse=True)
-    top_expense_categories.sort(key=lambda x: x["amount"], reverse=True)
+    # Agrupar por categoría, con porcentajes y ordenadas por monto
+    top_income_categories = get_category_summary(month_cells, "income")
+    top_expense_categories = get_category_summary(month_cells, "expense")
     
     return {
         "month": month,
@@ -455,37 +464,36 @@ async def get_monthly_analysis(
     }
 
 # Endpoint para obtener análisis por categoría
-@router.get("/analysis/category", response_model=CategorySummary)
+@router.get("/analysis/category", response_model=CategoryAnalysis, dependencies=[Depends(conditional_get)])
+@memoize("analysis_category", tags=lambda params: [category_tag(params["category"])])
+@coalesce("analysis_category")
 async def get_category_analysis(
     category: str = Query(...),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
 ):
     """
     Endpoint para obtener análisis detallado por categoría
     """
-    # Obtener todas las transacciones del usuario
-    user_transactions = [tx for tx in db["transactions"] if tx["user_id"] == current_user.id]
-    
-    # Filtrar por categoría
-    category_transactions = [tx for tx in user_transactions if tx["category"] == category]
-    
-    # Aplicar filtros de fecha si se proporcionan
-    if start_date:
-        category_transactions = [tx for tx in category_transactions if tx["date"] >= start_date]
-    
-    if end_date:
-        category_transactions = [tx for tx in category_transactions if tx["date"] <= end_date]
+    # Obtener las filas de la categoría dentro del rango de fechas (celdas
+    # mensuales para los meses completos, transacciones para los extremos)
+    category_rows = await get_category_rows(
+        db,
+        current_user.id,
+        category,
+        start_ordinal=_parse_date_filter(start_date),
+        end_ordinal=_parse_date_filter(end_date)
+    )
     
     # Calcular totales
-    income_amount = sum(tx["amount"] for tx in category_transactions if tx["type"] == "income")
-    expense_amount = sum(tx["amount"] for tx in category_transactions if tx["type"] == "expense")
+    income_amount = sum(row["amount"] for row in category_rows if row["type"] == "income")
+    expense_amount = sum(row["amount"] for row in category_rows if row["type"] == "expense")
     
     # Agrupar por subcategoría
     subcategory_summary = {}
-    for tx in category_transactions:
+    for tx in category_rows:
         subcategory = tx.get("subcategory", "Sin subcategoría")
         if subcategory not in subcategory_summary:
             subcategory_summary[subcategory] = {
@@ -499,7 +507,7 @@ async def get_category_analysis(
         else:
             subcategory_summary[subcategory]["expense"] += tx["amount"]
         
-        subcategory_summary[subcategory]["count"] += 1
+        subcategory_summary[subcategory]["count"] += tx.get("count", 1)
     
     # Formatear resultados
     subcategories = []
@@ -518,81 +526,114 @@ async def get_category_analysis(
         "category": category,
         "total_income": income_amount,
         "total_expense": expense_amount,
-        "transaction_count": len(category_transactions),
+        "transaction_count": sum(row.get("count", 1) for row in category_rows),
         "subcategories": subcategories,
         "start_date": start_date,
         "end_date": end_date
     }
 
+# Endpoint para obtener tendencias mensuales
+@router.get("/analysis/trends", dependencies=[Depends(conditional_get)])
+async def get_trends(
+    months: int = Query(6, ge=1, le=36),
+    current_user: User = Depends(get_current_user),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
+):
+    """
+    Endpoint para obtener ingresos y egresos de los últimos N meses
+    """
+    return get_transaction_trends(await db.columns_for_user(current_user.id), months)
+
 # Endpoint para obtener estadísticas generales
-@router.get("/stats/general")
+@router.get("/stats/general", dependencies=[Depends(conditional_get)])
+@memoize("stats_general", tags=lambda params: [ANY_CHANGE])
+@coalesce("stats_general")
 async def get_general_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
 ):
     """
     Endpoint para obtener estadísticas generales del usuario
     """
-    # Obtener todas las transacciones del usuario
-    user_transactions = [tx for tx in db["transactions"] if tx["user_id"] == current_user.id]
+    # Totales históricos por (tipo, categoría) desde los acumulados mensuales
+    totals = await db.category_totals(current_user.id)
     
     # Datos básicos
-    total_transactions = len(user_transactions)
-    income_transactions = [tx for tx in user_transactions if tx["type"] == "income"]
-    expense_transactions = [tx for tx in user_transactions if tx["type"] == "expense"]
+    income_totals = [row for row in totals if row["type"] == "income"]
+    expense_totals = [row for row in totals if row["type"] == "expense"]
+    income_count = sum(row["count"] for row in income_totals)
+    expense_count = sum(row["count"] for row in expense_totals)
     
     # Calcular estadísticas
-    avg_income = sum(tx["amount"] for tx in income_transactions) / len(income_transactions) if income_transactions else 0
-    avg_expense = sum(tx["amount"] for tx in expense_transactions) / len(expense_transactions) if expense_transactions else 0
-    
-    # Transacción más reciente
-    latest_transaction = None
-    if user_transactions:
-        latest_transaction = max(user_transactions, key=lambda x: x["created_at"])
+    avg_income = sum(row["amount"] for row in income_totals) / income_count if income_count else 0
+    avg_expense = sum(row["amount"] for row in expense_totals) / expense_count if expense_count else 0
     
     # Categorías únicas
-    unique_categories = set(tx["category"] for tx in user_transactions)
+    unique_categories = set(row["category"] for row in totals)
     
     return {
-        "total_transactions": total_transactions,
-        "income_count": len(income_transactions),
-        "expense_count": len(expense_transactions),
+        "total_transactions": sum(row["count"] for row in totals),
+        "income_count": income_count,
+        "expense_count": expense_count,
         "avg_income": avg_income,
         "avg_expense": avg_expense,
         "unique_categories_count": len(unique_categories),
-        "latest_transaction_date": latest_transaction["created_at"] if latest_transaction else None
+        "latest_transaction_date": await db.latest_created_at(current_user.id)
     }
 
+# Endpoint para exportar las transacciones del usuario
+@router.get("/export")
+async def export_user_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
+):
+    """
+    Endpoint para exportar el historial como CSV o NDJSON. La respuesta se
+    genera en streaming mientras se recorren las transacciones por lotes,
+    así que la memoria no depende del tamaño del historial.
+    """
+    transactions = db.iter_for_user(
+        current_user.id,
+        start_ordinal=_parse_date_filter(start_date),
+        end_ordinal=_parse_date_filter(end_date)
+    )
+    
+    logger.info(f"Exportación {format} iniciada por usuario: {current_user.email}")
+    
+    return StreamingResponse(
+        export_transactions(transactions, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="transacciones.{format}"',
+            "ETag": etag,
+            "Cache-Control": "private, no-cache"
+        }
+    )
+
 # Endpoint para búsqueda de transacciones
-@router.get("/search", response_model=TransactionList)
+@router.get("/search", response_model=TransactionList, dependencies=[Depends(conditional_get)])
 async def search_transactions(
     query: str = Query(..., min_length=3),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db),
     skip: int = Query(0, ge=0),
-    limit: int = Query(20, ge=1, le=50)
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None)
 ):
     """
     Endpoint para buscar transacciones por texto
     """
-    # Obtener todas las transacciones del usuario
-    user_transactions = [tx for tx in db["transactions"] if tx["user_id"] == current_user.id]
-    
-    # Buscar en campos relevantes
-    query = query.lower()
-    search_results = []
-    
-    for tx in user_transactions:
-        # Buscar en categoría, subcategoría y detalle
-        if (
-            (tx["category"] and query in tx["category"].lower()) or
-            (tx.get("subcategory") and query in tx["subcategory"].lower()) or
-            (tx["detail"] and query in tx["detail"].lower())
-        ):
-            search_results.append(tx)
+    # Buscar en categoría, subcategoría y detalle a partir del cursor
+    search_results = await db.search_for_user(
+        current_user.id, query, limit=skip + limit + 1, after=_parse_cursor(cursor)
+    )
     
     # Aplicar paginación
-    paginated_results = search_results[skip:skip + limit]
+    paginated_results, next_cursor = page_with_cursor(search_results[skip:], limit)
     
     # Formatear resultados
     result = []
@@ -607,4 +648,34 @@ async def search_transactions(
             "detail": tx["detail"]
         })
     
-    return {"transactions": result}
\ No newline at end of file
+    return {"transactions": result, "next_cursor": next_cursor}
+
+# Endpoint para obtener una transacción específica
+# Se declara al final para no ocultar rutas GET estáticas como /balance o /search
+@router.get("/{transaction_id}", response_model=Transaction_Schema, dependencies=[Depends(conditional_get)])
+async def get_transaction(
+    transaction_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Union[AsyncTransactionStore, AsyncTransactionRepository] = Depends(get_db)
+):
+    """
+    Endpoint para obtener una transacción específica
+    """
+    # Buscar la transacción por id
+    transaction = await db.get(current_user.id, transaction_id)
+    
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transacción no encontrada"
+        )
+    
+    return {
+        "id": transaction["id"],
+        "type": transaction["type"],
+        "category": transaction["category"],
+        "subcategory": transaction.get("subcategory"),
+        "amount": transaction["amount"],
+        "date": transaction["date"],
+        "detail": transaction["detail"]
+    }
\ No newline at end of file
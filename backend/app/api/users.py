@@ -2,12 +2,19 @@
 Módulo para manejar los usuarios en la API
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
 import uuid
 
-from ..models.user import User, UserUpdate
+from ..db_config import get_async_read_db
+from ..models.user import User as UserModel
+from ..models.transaction import User, UserUpdate
+from ..services.data_version import data_versions
+from ..services.sqlite_writer import run_write
+from ..services.token_cache import token_cache
 from ..utils.security import get_current_user
 from ..utils.validators import validate_input
 
@@ -21,18 +28,24 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Dependencia para obtener la sesión de base de datos
-def get_db():
-    db = None
-    try:
-        # Aquí iría el código para obtener la sesión de base de datos
-        # Para este ejemplo, simularemos una DB en memoria
-        db = {}
-        yield db
-    finally:
-        if db:
-            # Cerrar conexión si es necesario
-            pass
+def _update_user(user_id: str, **values):
+    """
+    Escritura corta: actualiza el usuario e incrementa la versión de su perfil.
+    Devuelve la nueva versión, o None si el usuario no existe.
+    """
+    return run_write(lambda session: session.execute(
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(profile_version=UserModel.profile_version + 1, **values)
+        .returning(UserModel.profile_version)
+        .execution_options(synchronize_session=False)
+    ).scalar())
+
+async def _email_exists(db: AsyncSession, email: str) -> bool:
+    """
+    Indica si ya hay un usuario registrado con el email
+    """
+    return await db.scalar(select(UserModel.id).where(UserModel.email == email)) is not None
 
 # Endpoint para obtener perfil de usuario
 @router.get("/me", response_model=User)
@@ -46,8 +59,7 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
 @router.put("/me", response_model=User)
 async def update_user_profile(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     Endpoint para actualizar el perfil del usuario actual
@@ -60,8 +72,13 @@ async def update_user_profile(
             detail="No se permiten usar caracteres especiales en el nombre",
         )
     
-    # En un caso real, buscaríamos el usuario en la base de datos y lo actualizaríamos
-    # Para este ejemplo, simulamos actualizar el usuario
+    # Actualizar el nombre en la base de datos si el usuario existe
+    version = await _update_user(current_user["id"], name=user_data.name) if user_data.name else None
+    if version is not None:
+        # Los tokens anteriores llevan el nombre antiguo en sus claims
+        token_cache.revoke_before(current_user["id"], version, current_user["email"])
+        await data_versions.bump(current_user["id"])
+    
     updated_user = {
         "id": current_user["id"],
         "name": user_data.name if user_data.name else current_user["name"],
@@ -78,7 +95,7 @@ async def update_user_profile(
 async def change_email(
     email: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para cambiar el correo electrónico del usuario
@@ -92,14 +109,24 @@ async def change_email(
         )
     
     # Verificar que el nuevo email no esté ya registrado
-    # En un caso real, buscaríamos en la base de datos
-    if email in db:
+    if await _email_exists(db, email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El email ya está registrado",
         )
     
-    # En un caso real, actualizaríamos el email en la base de datos
+    # Actualizar el email en la base de datos si el usuario existe
+    try:
+        updated = await _update_user(current_user["id"], email=email)
+    except IntegrityError:
+        # Otro usuario registró el email después de la comprobación
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email ya está registrado",
+        )
+    if updated is not None:
+        token_cache.revoke_before(current_user["id"], updated, current_user["email"])
+        await data_versions.bump(current_user["id"])
     
     logger.info(f"Email cambiado para usuario: {current_user['email']} -> {email}")
     
@@ -109,7 +136,7 @@ async def change_email(
 @router.delete("/me")
 async def delete_account(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para eliminar la cuenta del usuario
@@ -117,6 +144,13 @@ async def delete_account(
     # En un caso real, marcaríamos el usuario como eliminado en la base de datos
     # o lo eliminaríamos físicamente según la política de la aplicación
     
+    # Nueva versión del perfil: los tokens de acceso y refresh emitidos hasta
+    # ahora dejan de aceptarse
+    version = await _update_user(current_user["id"])
+    if version is not None:
+        token_cache.revoke_before(current_user["id"], version, current_user["email"])
+    await data_versions.bump(current_user["id"])
+    
     logger.info(f"Cuenta eliminada para usuario: {current_user['email']}")
     
     return {"message": "Cuenta eliminada correctamente"}
@@ -125,7 +159,7 @@ async def delete_account(
 @router.get("/me/stats")
 async def get_user_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para obtener estadísticas financieras del usuario
@@ -151,7 +185,7 @@ async def get_user_stats(
 @router.get("/email-available")
 async def check_email_available(
     email: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para verificar si un email está disponible para registro
@@ -164,9 +198,8 @@ async def check_email_available(
             detail="No se permiten usar caracteres especiales en el email",
         )
     
-    # En un caso real, verificaríamos si el email existe en la base de datos
-    # Para este ejemplo, simulamos la verificación
-    exists = email in db
+    # Verificar si el email existe en la base de datos
+    exists = await _email_exists(db, email)
     
     return {"available": not exists}
 
@@ -174,7 +207,7 @@ async def check_email_available(
 @router.get("/me/preferences")
 async def get_user_preferences(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para obtener las preferencias del usuario
@@ -198,13 +231,14 @@ async def get_user_preferences(
 async def update_user_preferences(
     preferences: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Endpoint para actualizar las preferencias del usuario
     """
     # En un caso real, actualizaríamos las preferencias en la base de datos
     # Para este ejemplo, simulamos la actualización
+    await data_versions.bump(current_user["id"])
     
     logger.info(f"Preferencias actualizadas para usuario: {current_user['email']}")
     
@@ -1,9 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import logging
 
+from .db_config import dispose_async_engines
+from .services.password_hashing import configure_password_hashing
+from .services.password_pool import PasswordPoolSaturated, password_pool
+from .services.sqlite_writer import sqlite_writer
+from .utils.middleware import SecurityMiddleware
+from .utils.responses import create_error_response
+
 # Configuración básica para settings
 class Settings:
     APP_NAME = "Aureum API"
@@ -49,22 +57,29 @@ def create_app() -> FastAPI:
             TrustedHostMiddleware, allowed_hosts=["localhost", "aureum.com"]
         )
     
-    # Middleware personalizado para seguridad
-    @app.middleware("http")
-    async def security_middleware(request, call_next):
-        # Log request info
-        client_host = request.client.host if request.client else "unknown"
-        logger.info(f"Request from {client_host}: {request.method} {request.url.path}")
-        
-        # Proceed with request
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        
-        return response
+    # Cabeceras de seguridad y línea de acceso (middleware ASGI puro)
+    app.add_middleware(SecurityMiddleware)
+    
+    # Pool de contraseñas saturado: rechazo inmediato en lugar de encolar sin límite
+    @app.exception_handler(PasswordPoolSaturated)
+    async def password_pool_saturated_handler(request: Request, exc: PasswordPoolSaturated):
+        logger.warning(f"Solicitud rechazada en {request.url.path}: {str(exc)}")
+        return create_error_response(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Servicio ocupado, intente de nuevo en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+    
+    # Al arrancar, calibrar el coste de bcrypt para este equipo (fuera del event loop)
+    @app.on_event("startup")
+    async def calibrate_password_hashing():
+        await run_in_threadpool(configure_password_hashing)
+    
+    # Al apagar, ejecutar las escrituras que sigan en la cola de SQLite y cerrar los pools
+    @app.on_event("shutdown")
+    async def stop_sqlite_writer():
+        await sqlite_writer.stop()
+        await dispose_async_engines()
+        password_pool.shutdown()
     
     return app
\ No newline at end of file
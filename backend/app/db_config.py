@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import contextlib
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde el directorio padre
@@ -20,25 +24,182 @@ load_dotenv(env_path)
 # Configuración de la base de datos
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    # Almacenamiento de transacciones: "memory" (almacén indexado) o "sql" (repositorio SQLAlchemy)
+    TRANSACTION_BACKEND: str = os.getenv("TRANSACTION_BACKEND", "memory")
+    # Búsqueda del repositorio SQL: "fts5" (índice de trigramas, solo SQLite) o "like"
+    TRANSACTION_SEARCH: str = os.getenv("TRANSACTION_SEARCH", "fts5")
+    # Perfil de SQLite: "default" o "production" (WAL, pool de lectura y escritor único)
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "default")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Tamaño de la caché de páginas por conexión, en KiB
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Conexiones de solo lectura para las rutas GET
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+    # Group commit: escrituras por transacción (1 = sin agrupar) y espera máxima del lote
+    WRITE_BATCH_MAX_OPS: int = int(os.getenv("WRITE_BATCH_MAX_OPS", "1"))
+    WRITE_BATCH_MAX_DELAY_MS: float = float(os.getenv("WRITE_BATCH_MAX_DELAY_MS", "5"))
+    # Pool de hash de contraseñas: "thread" o "process", trabajadores y llamadas en espera
+    PASSWORD_POOL_KIND: str = os.getenv("PASSWORD_POOL_KIND", "thread")
+    PASSWORD_POOL_WORKERS: int = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_POOL_MAX_QUEUE: int = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "32"))
+    # Coste de bcrypt (0 = calibrar al arrancar contra la latencia objetivo por hash)
+    PASSWORD_BCRYPT_ROUNDS: int = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "0"))
+    PASSWORD_HASH_TARGET_MS: float = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+    # Estado de main.py: "sql" (compartido vía base de datos), "file" (réplica en
+    # memoria de un registro compartido en STATE_FILE) o "memory" (un solo proceso)
+    STATE_BACKEND: str = os.getenv("STATE_BACKEND", "sql")
+    STATE_FILE: str = os.getenv(
+        "STATE_FILE",
+        os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "aureum_state.jsonl")
+    )
+    # Tamaño a partir del cual STATE_FILE se reescribe sin los eventos sustituidos
+    # (cambios de contraseña), si son más de la mitad del registro
+    STATE_COMPACT_BYTES: int = int(os.getenv("STATE_COMPACT_BYTES", str(1024 * 1024)))
+    # Identificador de worker de los ids generados (-1 = aleatorio por proceso)
+    ID_WORKER_ID: int = int(os.getenv("ID_WORKER_ID", "-1"))
+    # Logging: tamaño de la cola (se descarta al llenarse), formato "json" o "text",
+    # muestreo de accesos (tasa por defecto y reglas "prefijo=tasa") y límite de avisos repetidos
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_ACCESS_SAMPLE_RATE: float = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
+    LOG_ACCESS_SAMPLE_ROUTES: str = os.getenv("LOG_ACCESS_SAMPLE_ROUTES", "/health=0.01")
+    LOG_ACCESS_SLOW_MS: float = float(os.getenv("LOG_ACCESS_SLOW_MS", "1000"))
+    LOG_DEDUP_INTERVAL_S: float = float(os.getenv("LOG_DEDUP_INTERVAL_S", "60"))
+    LOG_DEDUP_BURST: int = int(os.getenv("LOG_DEDUP_BURST", "5"))
+    # Presupuesto de la caché de resultados de análisis, en MiB (0 = desactivada)
+    RESULT_CACHE_MB: float = float(os.getenv("RESULT_CACHE_MB", "32"))
+    # Entradas de la caché de tokens verificados (0 = desactivada)
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 settings = Settings()
 
 # Configuración de la base de datos SQLAlchemy
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+def sqlite_production_enabled(url: str = SQLALCHEMY_DATABASE_URL) -> bool:
+    """
+    Indica si se aplica el perfil de producción de SQLite (solo para archivos,
+    no para bases en memoria)
+    """
+    parsed = make_url(url)
+    return (
+        settings.SQLITE_PROFILE == "production"
+        and parsed.get_backend_name() == "sqlite"
+        and parsed.database not in (None, "", ":memory:")
+    )
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """
+    Configura una conexión SQLite recién abierta: WAL para que los lectores no
+    esperen a los escritores, fsync solo en los checkpoints, mmap y caché de
+    páginas, y espera ante bloqueos en lugar de fallar con "database is locked"
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        # Un valor negativo indica el tamaño en KiB en lugar de en páginas
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+def enable_sqlite_profile(target_engine, read_only: bool = False):
+    """
+    Registra los pragmas del perfil de producción en cada conexión nueva del engine
+    """
+    @event.listens_for(target_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+SQLITE_PRODUCTION = sqlite_production_enabled()
+
 # Crear engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
     connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 )
+if SQLITE_PRODUCTION:
+    enable_sqlite_profile(engine)
 
 # Crear sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Drivers asíncronos para cada base de datos soportada
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+# Drivers que ya son asíncronos y se respetan tal cual
+ASYNC_DRIVER_NAMES = {"aiosqlite", "asyncpg", "aiomysql", "asyncmy", "psycopg"}
+
+def async_database_url(url: str) -> str:
+    """
+    Convierte la URL síncrona de la base de datos en su equivalente asíncrona
+    (aiosqlite para SQLite, asyncpg para PostgreSQL)
+    """
+    parsed = make_url(url)
+    backend, _, driver = parsed.drivername.partition("+")
+    if driver in ASYNC_DRIVER_NAMES or backend not in ASYNC_DRIVERS:
+        return url
+
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+    # asyncpg no entiende sslmode de libpq: se traduce a su parámetro ssl
+    if "asyncpg" in parsed.drivername and "sslmode" in parsed.query:
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+
+    return parsed.render_as_string(hide_password=False)
+
+# Engine y sesiones asíncronas para los routers: las consultas no bloquean el event loop.
+# En el perfil de producción de SQLite el engine de escritura tiene una sola
+# conexión (SQLite admite un único escritor) y las lecturas usan un pool aparte
+# de conexiones de solo lectura, que en modo WAL no esperan a las escrituras
+if SQLITE_PRODUCTION:
+    async_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    enable_sqlite_profile(async_engine.sync_engine)
+    async_read_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+    )
+    enable_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+else:
+    async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL))
+    async_read_engine = async_engine
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
 # Base para modelos
 Base = declarative_base()
 
-# Función para obtener sesión de DB
+# Cierra las conexiones de los pools asíncronos (al apagar la aplicación)
+async def dispose_async_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+# Dependencia de FastAPI con la sesión asíncrona de las rutas (pool de solo lectura en
+# producción). Las escrituras no usan esta sesión: pasan por run_write
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+# Función para obtener sesión de DB (scripts y tareas fuera de línea)
 @contextlib.contextmanager
 def get_db():
     db = SessionLocal()
@@ -1,37 +1,19 @@
 import logging
-import uuid
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import contextlib
-
 # Importar modelos (corregir las rutas relativas)
 from app.models.user import User, UserType
 from app.models.transaction import Transaction, TransactionType
 from app.services.auth_service import get_password_hash
+from app.services.transaction_repository import TransactionRepository
+from app.utils.formatting import date_to_ordinal
+from app.utils.ids import new_id
+
+# Usar el mismo engine y sesiones que el repositorio de transacciones
+from app.db_config import engine, SessionLocal, get_db
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
-# Configuración de la base de datos
-DATABASE_URL = "sqlite:///./aureum.db"
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Solo para SQLite
-)
-
-# Crear session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Función para obtener sesión de DB
-@contextlib.contextmanager
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def init_db():
     """
     Inicializa la base de datos con datos de prueba
@@ -54,7 +36,7 @@ def init_db():
             
             # Crear usuario de prueba
             test_user = User(
-                id=str(uuid.uuid4()),
+                id=new_id(),
                 name="Usuario de Prueba",
                 email="test@example.com",
                 hashed_password=get_password_hash("password123"),
@@ -74,23 +56,25 @@ def init_db():
             # Ingresos
             incomes = [
                 Transaction(
-                    id=str(uuid.uuid4()),
+                    id=new_id(),
                     user_id=test_user.id,
                     type=TransactionType.INCOME,
                     category="Salario",
                     amount=1200.00,
                     date="10 abr",
+                    date_ordinal=date_to_ordinal("10 abr", now.year),
                     detail="Salario mensual",
                     created_at=now - timedelta(days=20),
                     updated_at=now - timedelta(days=20)
                 ),
                 Transaction(
-                    id=str(uuid.uuid4()),
+                    id=new_id(),
                     user_id=test_user.id,
                     type=TransactionType.INCOME,
                     category="Venta",
                     amount=150.00,
                     date="15 abr",
+                    date_ordinal=date_to_ordinal("15 abr", now.year),
                     detail="Venta de artículos usados",
                     created_at=now - timedelta(days=15),
                     updated_at=now - timedelta(days=15)
@@ -100,34 +84,37 @@ def init_db():
             # Egresos
             expenses = [
                 Transaction(
-                    id=str(uuid.uuid4()),
+                    id=new_id(),
                     user_id=test_user.id,
                     type=TransactionType.EXPENSE,
                     category="Supermercado",
                     amount=200.00,
                     date="12 abr",
+                    date_ordinal=date_to_ordinal("12 abr", now.year),
                     detail="Compras semanales",
                     created_at=now - timedelta(days=18),
                     updated_at=now - timedelta(days=18)
                 ),
                 Transaction(
-                    id=str(uuid.uuid4()),
+                    id=new_id(),
                     user_id=test_user.id,
                     type=TransactionType.EXPENSE,
                     category="Servicio de Luz",
                     amount=50.00,
                     date="20 abr",
+                    date_ordinal=date_to_ordinal("20 abr", now.year),
                     detail="Factura mensual",
                     created_at=now - timedelta(days=10),
                     updated_at=now - timedelta(days=10)
                 ),
                 Transaction(
-                    id=str(uuid.uuid4()),
+                    id=new_id(),
                     user_id=test_user.id,
                     type=TransactionType.EXPENSE,
                     category="Gastos Médicos",
                     amount=75.00,
                     date="22 abr",
+                    date_ordinal=date_to_ordinal("22 abr", now.year),
                     detail="Consulta médica",
                     created_at=now - timedelta(days=8),
                     updated_at=now - timedelta(days=8)
@@ -137,8 +124,49 @@ def init_db():
             db.add_all(incomes + expenses)
             db.commit()
             
+            # Los datos se insertaron sin pasar por el repositorio: calcular sus acumulados
+            rebuild_aggregates(db, test_user.id)
+            
             logger.info(f"Datos de prueba creados: Usuario {test_user.email} con {len(incomes)} ingresos y {len(expenses)} egresos")
     
     except Exception as e:
         logger.error(f"Error al inicializar la base de datos: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+def rebuild_aggregates(db=None, user_id=None):
+    """
+    Recalcula los totales, acumulados mensuales y (para todos los usuarios)
+    el índice de búsqueda desde las transacciones. Sirve para reconstruirlos
+    fuera de línea.
+    """
+    session = db or SessionLocal()
+    try:
+        repository = TransactionRepository(session)
+        repository.rebuild_balances(user_id)
+        repository.rebuild_rollups(user_id)
+        if user_id is None:
+            repository.rebuild_search_index()
+        logger.info("Acumulados de transacciones reconstruidos")
+    finally:
+        if db is None:
+            session.close()
+
+
+def vacuum_database():
+    """
+    Compacta la base SQLite con VACUUM y reconstruye después el índice de
+    búsqueda, porque VACUUM puede renumerar los rowid implícitos de
+    transactions a los que apunta la tabla FTS5.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    # VACUUM no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
+
+    session = SessionLocal()
+    try:
+        TransactionRepository(session).rebuild_search_index()
+        logger.info("Base de datos compactada e índice de búsqueda reconstruido")
+    finally:
+        session.close()
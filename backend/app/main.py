@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, validator, Field
 from typing import Optional, List
@@ -10,7 +11,6 @@ import hashlib
 import secrets
 import html
 import logging
-from logging.handlers import RotatingFileHandler
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -19,18 +19,12 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
-# Configurar logging
+# Configurar logging: cola acotada y un hilo que formatea, escribe y rota el archivo
+from app.utils.log_pipeline import setup_logging
+from app.utils.middleware import SecurityMiddleware
+
 log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        RotatingFileHandler(log_dir / "aureum_api.log", maxBytes=10485760, backupCount=5),
-        logging.StreamHandler()
-    ]
-)
+log_pipeline = setup_logging(log_dir / "aureum_api.log")
 logger = logging.getLogger("aureum_api")
 
 # Initialize FastAPI
@@ -56,14 +50,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60 *
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Database models (using in-memory data for demo)
-users_db = {}
-transactions_db = []
-current_id = 0
-
 # Import utility functions from separate modules
 from app.utils.validators import validate_input, sanitize_input
-from app.utils.security import hash_password, verify_password
+from app.utils.security import hash_password_async, verify_password_async
+from app.services.password_hashing import configure_password_hashing, needs_rehash
+from app.services.password_pool import PasswordPoolSaturated, password_pool
+from app.services.token_cache import token_cache
+from app.services.result_cache import result_cache
+from app.services.single_flight import single_flight
+from app.utils.responses import create_error_response
+from app.services.state_backend import create_state_backend
+from app.utils.ids import new_id
+
+# Users, transactions and balances live outside the process (STATE_BACKEND)
+# so every uvicorn/gunicorn worker sees the same data; ids come from
+# utils.ids and need no shared counter
+state = create_state_backend()
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create JWT token"""
@@ -86,6 +88,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Reuse the user of an already verified, unexpired token
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -94,30 +101,44 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except jwt.PyJWTError:
         raise credentials_exception
         
-    user = users_db.get(username)
-    if user is None:
+    user_data = await state.get_user(username)
+    if user_data is None:
         raise credentials_exception
-        
+    
+    user = UserInDB(**user_data)
+    token_cache.put(token, user, payload.get("exp", 0), (user.id, user.email))
     return user
 
-# Security middleware
-@app.middleware("http")
-async def security_middleware(request: Request, call_next):
-    """Middleware for security checks"""
-    # Log request info for security monitoring
-    client_host = request.client.host if request.client else "unknown"
-    logger.info(f"Request from {client_host}: {request.method} {request.url.path}")
-    
-    # Proceed with request
-    response = await call_next(request)
-    
-    # Add security headers
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Content-Security-Policy"] = "default-src 'self'"
-    
-    return response
+# Security headers and access log (pure ASGI: no extra task or body copy per request)
+app.add_middleware(SecurityMiddleware)
+
+# Reject logins immediately when the password pool is saturated
+@app.exception_handler(PasswordPoolSaturated)
+async def password_pool_saturated_handler(request: Request, exc: PasswordPoolSaturated):
+    """Return 503 with Retry-After instead of queueing without limit"""
+    logger.warning(f"Request rejected on {request.url.path}: {str(exc)}")
+    return create_error_response(
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        "Servicio ocupado, intente de nuevo en unos segundos",
+        headers={"Retry-After": "1"}
+    )
+
+@app.on_event("startup")
+async def calibrate_password_hashing():
+    """Pick the bcrypt cost for this machine without blocking the event loop"""
+    await run_in_threadpool(configure_password_hashing)
+
+@app.on_event("startup")
+async def start_state_backend():
+    """Open the shared state backend"""
+    await state.startup()
+
+@app.on_event("shutdown")
+async def shutdown_password_pool():
+    """Stop the password pool workers and close the state backend"""
+    password_pool.shutdown()
+    await state.shutdown()
+    log_pipeline.stop()
 
 # Pydantic models
 class UserBase(BaseModel):
@@ -195,8 +216,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     
     # Check user
-    user = users_db.get(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user_data = await state.get_user(form_data.username)
+    user = UserInDB(**user_data) if user_data else None
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         logger.warning(f"Failed login attempt for user: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -204,6 +226,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Upgrade legacy or lower-cost hashes now that we know the password
+    if needs_rehash(user.hashed_password):
+        await state.update_password(user.email, await hash_password_async(form_data.password))
+    
     # Generate token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -217,19 +243,17 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 async def register_user(user_data: UserCreate):
     """User registration endpoint"""
     # Check if email already exists
-    if user_data.email in users_db:
+    if await state.get_user(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
     
     # Create user
-    global current_id
-    current_id += 1
-    user_id = f"user-{current_id}"
+    user_id = new_id()
     
     # Hash the password
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     
     # Create user in DB
     user = UserInDB(
@@ -240,7 +264,19 @@ async def register_user(user_data: UserCreate):
         hashed_password=hashed_password
     )
     
-    users_db[user_data.email] = user
+    # Another worker may have registered the same email in the meantime
+    try:
+        created = await state.add_user(user.dict())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid user type",
+        )
+    if not created:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered",
+        )
     
     # Generate token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -262,9 +298,6 @@ async def create_transaction(
     current_user: UserInDB = Depends(get_current_user)
 ):
     """Create a new transaction"""
-    global current_id
-    current_id += 1
-    
     # Sanitize inputs
     sanitized_transaction = TransactionCreate(
         type=sanitize_input(transaction.type),
@@ -275,7 +308,7 @@ async def create_transaction(
     )
     
     # Create transaction in DB
-    transaction_id = f"tx-{current_id}"
+    transaction_id = new_id()
     transaction_obj = Transaction(
         id=transaction_id,
         user_id=current_user.id,
@@ -283,7 +316,13 @@ async def create_transaction(
         **sanitized_transaction.dict()
     )
     
-    transactions_db.append(transaction_obj)
+    try:
+        await state.add_transaction(transaction_obj.dict())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid transaction type",
+        )
     
     logger.info(f"New transaction created: {transaction_id} for user {current_user.id}")
     return transaction_obj
@@ -291,60 +330,54 @@ async def create_transaction(
 @app.get("/transactions", response_model=List[Transaction])
 async def get_transactions(current_user: UserInDB = Depends(get_current_user)):
     """Get all transactions for the current user"""
-    user_transactions = [tx for tx in transactions_db if tx.user_id == current_user.id]
-    return user_transactions
+    return await state.list_transactions(current_user.id)
 
 @app.get("/transactions/income", response_model=List[Transaction])
 async def get_income_transactions(current_user: UserInDB = Depends(get_current_user)):
     """Get income transactions for the current user"""
-    user_transactions = [
-        tx for tx in transactions_db 
-        if tx.user_id == current_user.id and tx.type == "income"
-    ]
-    return user_transactions
+    return await state.list_transactions(current_user.id, "income")
 
 @app.get("/transactions/expense", response_model=List[Transaction])
 async def get_expense_transactions(current_user: UserInDB = Depends(get_current_user)):
     """Get expense transactions for the current user"""
-    user_transactions = [
-        tx for tx in transactions_db 
-        if tx.user_id == current_user.id and tx.type == "expense"
-    ]
-    return user_transactions
+    return await state.list_transactions(current_user.id, "expense")
 
 @app.get("/balance")
 async def get_balance(current_user: UserInDB = Depends(get_current_user)):
     """Get balance for the current user"""
-    user_transactions = [tx for tx in transactions_db if tx.user_id == current_user.id]
-    
-    balance = 0
-    for tx in user_transactions:
-        if tx.type == "income":
-            balance += tx.amount
-        else:
-            balance -= tx.amount
-    
-    return {"balance": balance}
+    income, expense = await state.get_balance(current_user.id)
+    return {"balance": income - expense}
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow(),
+        "password_pool": password_pool.metrics(),
+        "token_cache": token_cache.metrics(),
+        "result_cache": result_cache.metrics(),
+        "single_flight": single_flight.metrics(),
+        "logging": log_pipeline.metrics(),
+    }
+
+async def seed_default_user():
+    """Add a default user for testing if it does not exist yet"""
+    if await state.get_user("test@example.com") is None:
+        await state.add_user(UserInDB(
+            id="user-0",
+            email="test@example.com",
+            name="Test User",
+            type="personal",
+            hashed_password=await hash_password_async("password123")
+        ).dict())
 
 # Main function
 if __name__ == "__main__":
     import uvicorn
     
-    # Add a default user for testing
-    default_user = UserInDB(
-        id="user-0",
-        email="test@example.com",
-        name="Test User",
-        type="personal",
-        hashed_password=hash_password("password123")
-    )
-    users_db[default_user.email] = default_user
+    app.add_event_handler("startup", seed_default_user)
     
     # Start server
     port = int(os.getenv("PORT", 8000))
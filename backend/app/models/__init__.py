@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Boolean, Enum, Integer
-from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
-import enum
-
-# Base para los modelos SQLAlchemy
-Base = declarative_base()
\ No newline at end of file
+# Base compartida con db_config para que create_all conozca todas las tablas
+from ..db_config import Base
+from .user import User, UserType
+from .transaction import Transaction, TransactionType
+from .balance import UserBalance, DailyBalance
+from .rollup import MonthlyRollup
+from .version import UserDataVersion
+from . import search  # Tabla FTS5 de búsqueda (solo SQLite)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, Float, Integer, ForeignKey
+
+from ..db_config import Base
+
+
+class UserBalance(Base):
+    """
+    Totales de ingresos y egresos de un usuario, mantenidos en cada escritura.
+    """
+    __tablename__ = "user_balances"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    total_income = Column(Float, nullable=False, default=0.0)
+    total_expense = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<UserBalance {self.user_id}: {self.total_income} - {self.total_expense}>"
+
+
+class DailyBalance(Base):
+    """
+    Ingresos y egresos acumulados de un usuario por día (date_ordinal).
+    Los balances por rango de fechas suman estas filas en lugar de las transacciones.
+    """
+    __tablename__ = "daily_balances"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    date_ordinal = Column(Integer, primary_key=True)
+    income = Column(Float, nullable=False, default=0.0)
+    expense = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<DailyBalance {self.user_id} {self.date_ordinal}: {self.income} - {self.expense}>"
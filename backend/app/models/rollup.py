@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Float, Integer, ForeignKey
+
+from ..db_config import Base
+
+
+class MonthlyRollup(Base):
+    """
+    Monto y cantidad de transacciones por (usuario, año, mes, tipo, categoría, subcategoría).
+    Se mantiene en cada escritura del repositorio y alimenta los endpoints de análisis.
+    """
+    __tablename__ = "monthly_rollups"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    type = Column(String(10), primary_key=True)
+    category = Column(String(50), primary_key=True)
+    subcategory = Column(String(50), primary_key=True, default="")  # "" cuando no hay subcategoría
+    amount = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MonthlyRollup {self.user_id} {self.year}-{self.month:02d} {self.type} {self.category}: {self.amount}>"
@@ -0,0 +1,52 @@
+from sqlalchemy import DDL, event
+
+from .transaction import Transaction
+
+# Tabla FTS5 de contenido externo sobre transactions: guarda solo el índice de
+# trigramas de los campos buscables y se mantiene con triggers, de modo que la
+# búsqueda con MATCH equivale a LIKE '%consulta%' sin recorrer la tabla.
+#
+# La clave primaria de transactions es texto, así que content_rowid apunta al
+# rowid implícito. VACUUM puede renumerar esos rowid y desalinear el índice:
+# compactar siempre con db_init.vacuum_database, que lo reconstruye después.
+SEARCH_TABLE = "transactions_fts"
+
+SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        category, subcategory, detail,
+        content='transactions', content_rowid='rowid', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, category, subcategory, detail)
+        VALUES (new.rowid, new.category, new.subcategory, new.detail);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON transactions BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, category, subcategory, detail)
+        VALUES ('delete', old.rowid, old.category, old.subcategory, old.detail);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF category, subcategory, detail ON transactions BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, category, subcategory, detail)
+        VALUES ('delete', old.rowid, old.category, old.subcategory, old.detail);
+        INSERT INTO {SEARCH_TABLE}(rowid, category, subcategory, detail)
+        VALUES (new.rowid, new.category, new.subcategory, new.detail);
+    END
+    """,
+]
+
+# Reconstruye el índice desde transactions (bases creadas antes de la tabla FTS o tras VACUUM)
+SEARCH_REBUILD = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+
+# Crear la tabla y los triggers junto con transactions, solo en SQLite
+for statement in SEARCH_DDL:
+    event.listen(
+        Transaction.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite")
+    )
@@ -3,7 +3,7 @@ from datetime import datetime
 import re
 from typing import Optional, List
 from pydantic import BaseModel, EmailStr, Field, validator
-from sqlalchemy import Column, String, Float, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, Float, DateTime, Enum, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 
 from ..db_config import Base
@@ -24,7 +24,8 @@ class Transaction(Base):
     category = Column(String(50), nullable=False)
     subcategory = Column(String(50), nullable=True)
     amount = Column(Float, nullable=False)
-    date = Column(String(10), nullable=False)  # Formato: DD MMM (ej: "15 mar")
+    date = Column(String(20), nullable=False)  # Formato: DD MMM (ej: "15 mar"), tal como lo envía la app
+    date_ordinal = Column(Integer, nullable=False)  # Ordinal de día (date.toordinal) calculado al guardar
     detail = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -32,6 +33,14 @@ class Transaction(Base):
     # Relaciones
     user = relationship("User", back_populates="transactions")
     
+    # Índices compuestos para las consultas por usuario del repositorio
+    __table_args__ = (
+        Index("ix_transactions_user_date", "user_id", "date_ordinal", "id"),
+        Index("ix_transactions_user_type_date", "user_id", "type", "date_ordinal", "id"),
+        Index("ix_transactions_user_category_date", "user_id", "category", "date_ordinal", "id"),
+        Index("ix_transactions_user_created", "user_id", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<Transaction {self.id}: {self.type} - {self.category} - {self.amount}>"
 
@@ -183,6 +192,18 @@ class Transaction_Schema(TransactionBase):
 class TransactionList(BaseModel):
     """Modelo para lista de transacciones"""
     transactions: List[Transaction_Schema]
+    next_cursor: Optional[str] = None  # Cursor opaco para pedir la siguiente página
+
+class BulkImportError(BaseModel):
+    """Modelo para el error de una fila en la importación masiva"""
+    line: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    """Modelo para el resultado de la importación masiva"""
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]  # Limitado a los primeros errores; "failed" tiene el total
 
 class ChangePassword(BaseModel):
     """Modelo para cambio de contraseña"""
@@ -213,6 +234,12 @@ class Token(BaseModel):
     """Modelo para token de autenticación"""
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshTokenRequest(BaseModel):
+    """Modelo para renovar el token de acceso"""
+    refresh_token: str
 
 class TokenData(BaseModel):
     """Modelo para data del token"""
@@ -229,6 +256,36 @@ class CategorySummary(BaseModel):
     percentage: float
     count: int
 
+class SubcategorySummary(BaseModel):
+    """Modelo para resumen de subcategoría"""
+    name: Optional[str] = None
+    income: float
+    expense: float
+    count: int
+
+class CategoryAnalysis(BaseModel):
+    """Modelo para análisis de una categoría"""
+    category: str
+    total_income: float
+    total_expense: float
+    transaction_count: int
+    subcategories: List[SubcategorySummary]
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+class Dashboard(BaseModel):
+    """Modelo para el panel principal (balance, recientes, listas por tipo y categorías del mes)"""
+    balance: float
+    total_income: float
+    total_expense: float
+    recent_transactions: List[Transaction_Schema]
+    income_transactions: TransactionList
+    expense_transactions: TransactionList
+    month: int
+    year: int
+    top_income_categories: List[CategorySummary]
+    top_expense_categories: List[CategorySummary]
+
 class MonthlyAnalysis(BaseModel):
     """Modelo para análisis mensual"""
     month: int
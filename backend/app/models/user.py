@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Enum
+from sqlalchemy import Column, String, DateTime, Enum, Integer
 from sqlalchemy.orm import relationship
 from ..db_config import Base
 
@@ -24,6 +24,9 @@ class User(Base):
     birthdate = Column(String(10), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Versión del perfil: se incrementa al cambiar datos que viajan en el token
+    # o la contraseña, e invalida los refresh tokens emitidos antes
+    profile_version = Column(Integer, default=1, server_default="1", nullable=False)
     
     # Relaciones
     transactions = relationship("Transaction", back_populates="user")
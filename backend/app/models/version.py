@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, ForeignKey
+
+from ..db_config import Base
+
+
+class UserDataVersion(Base):
+    """
+    Versión de los datos de un usuario: se incrementa en cada escritura de
+    sus transacciones o de su perfil y de ella se derivan los ETag.
+    """
+    __tablename__ = "user_data_versions"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserDataVersion {self.user_id}: {self.version}>"
@@ -2,11 +2,16 @@ from datetime import datetime, timedelta
 from typing import Optional
 import jwt
 import re
-import hashlib
-import secrets
 import logging
+import secrets
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models.user import User, UserInDB
+from ..models.user import User
+from . import password_hashing
+from .password_pool import password_pool
+from .sqlite_writer import run_write
 
 # Configuración de logging
 logger = logging.getLogger(__name__)
@@ -14,50 +19,76 @@ logger = logging.getLogger(__name__)
 # Configuración de seguridad
 SECRET_KEY = "YOUR_SECRET_KEY_HERE"  # En producción usar variables de entorno
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
+ACCESS_TOKEN_EXPIRE_MINUTES = 15  # Tokens de acceso de corta duración
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+
+# Tipos de token (claim "typ")
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
 # Funciones para el manejo de contraseñas
 def get_password_hash(password: str) -> str:
     """
-    Crea un hash seguro para la contraseña
+    Crea un hash bcrypt ($2b$<coste>$...) para la contraseña
     """
-    salt = secrets.token_hex(16)
-    hash_obj = hashlib.sha256(f"{password}{salt}".encode())
-    return f"{hash_obj.hexdigest()}:{salt}"
+    return password_hashing.hash_password(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifica si la contraseña plana coincide con el hash almacenado
+    (bcrypt o el formato anterior sha256hex:salt)
+    """
+    return password_hashing.verify_password(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Crea el hash de la contraseña en el pool de contraseñas, fuera del event loop
+    """
+    return await password_pool.run(password_hashing.hash_password, password, password_hashing.current_rounds())
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifica la contraseña en el pool de contraseñas, fuera del event loop
     """
-    if ":" not in hashed_password:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def rehash_password_if_needed(user: User, password: str) -> bool:
+    """
+    Tras un login correcto, regenera el hash si usa el formato anterior o un
+    coste menor al actual. Solo se sustituye si el hash no cambió entretanto
+    (por ejemplo, por un cambio de contraseña simultáneo).
+    """
+    if not password_hashing.needs_rehash(user.hashed_password):
         return False
-    
-    hash_val, salt = hashed_password.split(":")
-    hash_obj = hashlib.sha256(f"{plain_password}{salt}".encode())
-    return hash_obj.hexdigest() == hash_val
 
-def authenticate_user(db, email: str, password: str) -> Optional[User]:
+    # El hash se calcula antes de pedir la conexión de escritura
+    new_hash = await get_password_hash_async(password)
+    updated = await run_write(lambda session: session.execute(
+        update(User)
+        .where(User.id == user.id, User.hashed_password == user.hashed_password)
+        .values(hashed_password=new_hash)
+        .execution_options(synchronize_session=False)
+    ).rowcount)
+
+    if updated:
+        logger.info(f"Hash de contraseña actualizado para usuario: {user.email}")
+    return bool(updated)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """
     Autentica un usuario por email y contraseña
     """
-    # En un caso real, buscaríamos en la base de datos
-    # Para este ejemplo, simulamos con un diccionario
-    user = db.get(email)
+    # Buscar el usuario en la base de datos sin bloquear el event loop
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         logger.warning(f"Intento de autenticación con email no existente: {email}")
         return None
     
-    if not verify_password(password, user["hashed_password"]):
+    if not await verify_password_async(password, user.hashed_password):
         logger.warning(f"Contraseña incorrecta para usuario: {email}")
         return None
     
-    return {
-        "id": user["id"],
-        "name": user["name"],
-        "email": user["email"],
-        "type": user["type"],
-        "birthdate": user.get("birthdate")
-    }
+    return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -70,7 +101,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
+    to_encode.setdefault("typ", ACCESS_TOKEN_TYPE)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def user_claims(user: User) -> dict:
+    """
+    Claims del usuario que viajan en el token de acceso: con ellos
+    get_current_user construye el usuario sin consultar la base de datos
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.name,
+        "type": user.type.value if user.type else None,
+        "ver": user.profile_version or 1,
+    }
+
+def create_refresh_token(user: User) -> str:
+    """
+    Crea un refresh token de larga duración ligado a la versión del perfil
+    """
+    return create_access_token(
+        data={
+            "sub": user.email,
+            "uid": user.id,
+            "ver": user.profile_version or 1,
+            "typ": REFRESH_TOKEN_TYPE,
+            "jti": secrets.token_hex(8),
+        },
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+def create_token_pair(user: User) -> dict:
+    """
+    Crea el token de acceso y el refresh token de un usuario autenticado
+    """
+    return {
+        "access_token": create_access_token(user_claims(user)),
+        "refresh_token": create_refresh_token(user),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+async def refresh_access_token(db: AsyncSession, refresh_token: str) -> Optional[dict]:
+    """
+    Emite un nuevo par de tokens a partir de un refresh token válido. Es el
+    único punto en que se consulta el usuario: si cambió la versión del perfil
+    (contraseña o datos del token), el refresh token deja de aceptarse.
+    """
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError as e:
+        logger.warning(f"Refresh token inválido: {str(e)}")
+        return None
+
+    if payload.get("typ") != REFRESH_TOKEN_TYPE or not payload.get("uid"):
+        logger.warning("Token sin tipo refresh usado para renovar")
+        return None
+
+    user = await db.get(User, payload["uid"])
+    if user is None or (user.profile_version or 1) != payload.get("ver"):
+        logger.warning(f"Refresh token revocado para: {payload.get('sub')}")
+        return None
+
+    return create_token_pair(user)
\ No newline at end of file
@@ -0,0 +1,85 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+class BalanceLedger:
+    """
+    Totales de ingresos y egresos por usuario mantenidos de forma incremental.
+
+    Cada escritura ajusta el total del usuario y el acumulado de su día, por lo
+    que el balance sin filtros es O(1). Para los rangos de fechas se construyen
+    sumas prefijas sobre los días ordenados; se invalidan al escribir y se
+    reconstruyen en la siguiente consulta, que después cuesta O(log días).
+    """
+
+    def __init__(self):
+        self._totals: Dict[str, List[float]] = {}
+        self._daily: Dict[str, Dict[int, List[float]]] = {}
+        self._prefix: Dict[str, Tuple[List[int], List[float], List[float]]] = {}
+
+    def apply(
+        self,
+        user_id: str,
+        transaction_type: str,
+        amount: float,
+        date_ordinal: Optional[int] = None,
+        sign: int = 1
+    ):
+        """
+        Suma (sign=1) o resta (sign=-1) el monto de una transacción.
+        Todo lo que no es "income" cuenta como egreso.
+        """
+        column = 0 if transaction_type == "income" else 1
+        self._totals.setdefault(user_id, [0.0, 0.0])[column] += sign * amount
+
+        if date_ordinal is not None:
+            day = self._daily.setdefault(user_id, {}).setdefault(date_ordinal, [0.0, 0.0])
+            day[column] += sign * amount
+            self._prefix.pop(user_id, None)
+
+    def _prefix_sums(self, user_id: str) -> Tuple[List[int], List[float], List[float]]:
+        """
+        Devuelve (reconstruyéndolas si hace falta) las sumas prefijas por día
+        """
+        prefix = self._prefix.get(user_id)
+        if prefix is not None:
+            return prefix
+
+        daily = self._daily.get(user_id, {})
+        days = sorted(daily)
+        income, expense = [0.0], [0.0]
+        for day in days:
+            income.append(income[-1] + daily[day][0])
+            expense.append(expense[-1] + daily[day][1])
+
+        prefix = self._prefix[user_id] = (days, income, expense)
+        return prefix
+
+    def totals(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None
+    ) -> Tuple[float, float]:
+        """
+        Devuelve (ingresos, egresos) del usuario, opcionalmente en un rango de días
+        """
+        if start_ordinal is None and end_ordinal is None:
+            income, expense = self._totals.get(user_id, (0.0, 0.0))
+            return income, expense
+
+        days, income, expense = self._prefix_sums(user_id)
+        low = bisect_left(days, start_ordinal) if start_ordinal is not None else 0
+        high = bisect_right(days, end_ordinal) if end_ordinal is not None else len(days)
+        if high <= low:
+            return 0.0, 0.0
+
+        return income[high] - income[low], expense[high] - expense[low]
+
+    def clear(self):
+        """
+        Elimina todos los acumulados
+        """
+        self._totals.clear()
+        self._daily.clear()
+        self._prefix.clear()
@@ -0,0 +1,192 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Bits del tipo de transacción; cualquier otro tipo queda en 0
+INCOME = 1
+EXPENSE = 2
+TYPE_BITS = {"income": INCOME, "expense": EXPENSE}
+
+# Ordinal del 1970-01-01, origen de datetime64 en NumPy
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class TransactionColumns:
+    """
+    Transacciones de un usuario en formato columnar para agregaciones vectorizadas.
+
+    Columnas:
+    - amounts: float64
+    - types: uint8 con los bits INCOME / EXPENSE
+    - categories: int32 con el código de la categoría en `category_names`
+    - days: int64 con el ordinal de día (date_ordinal)
+    - counts: int64 con las transacciones que representa cada fila
+      (1 para transacciones, "count" para celdas ya agregadas)
+
+    Los arreglos crecen duplicando su capacidad y las eliminaciones mueven la
+    última fila al hueco, de modo que agregar, modificar y eliminar cuestan O(1)
+    amortizado. El orden de las filas no es significativo.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._amounts = np.empty(capacity, dtype=np.float64)
+        self._types = np.empty(capacity, dtype=np.uint8)
+        self._categories = np.empty(capacity, dtype=np.int32)
+        self._days = np.empty(capacity, dtype=np.int64)
+        self._counts = np.empty(capacity, dtype=np.int64)
+        self._size = 0
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self.category_names: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Dict[str, Any]]) -> "TransactionColumns":
+        """
+        Construye las columnas a partir de transacciones o celdas (diccionarios)
+        """
+        transactions = list(transactions)
+        columns = cls(capacity=max(len(transactions), 1))
+        size = len(transactions)
+
+        columns._amounts[:size] = np.fromiter((tx["amount"] for tx in transactions), np.float64, size)
+        columns._types[:size] = np.fromiter((TYPE_BITS.get(tx["type"], 0) for tx in transactions), np.uint8, size)
+        columns._categories[:size] = np.fromiter(
+            (columns.encode_category(tx["category"]) for tx in transactions), np.int32, size
+        )
+        columns._days[:size] = np.fromiter((tx.get("date_ordinal") or 0 for tx in transactions), np.int64, size)
+        columns._counts[:size] = np.fromiter((tx.get("count", 1) for tx in transactions), np.int64, size)
+        columns._size = size
+        columns._ids = [tx.get("id") for tx in transactions]
+        columns._rows = {tx_id: row for row, tx_id in enumerate(columns._ids) if tx_id is not None}
+
+        return columns
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def amounts(self) -> np.ndarray:
+        return self._amounts[:self._size]
+
+    @property
+    def types(self) -> np.ndarray:
+        return self._types[:self._size]
+
+    @property
+    def categories(self) -> np.ndarray:
+        return self._categories[:self._size]
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._days[:self._size]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts[:self._size]
+
+    def encode_category(self, name: str) -> int:
+        """
+        Devuelve (asignándolo si es nuevo) el código de una categoría
+        """
+        code = self._category_codes.get(name)
+        if code is None:
+            code = self._category_codes[name] = len(self.category_names)
+            self.category_names.append(name)
+        return code
+
+    def _grow(self):
+        """
+        Duplica la capacidad de todas las columnas
+        """
+        capacity = max(len(self._amounts) * 2, 64)
+        for name in ("_amounts", "_types", "_categories", "_days", "_counts"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _write(self, row: int, transaction: Dict[str, Any]):
+        """
+        Escribe los valores de una transacción en una fila
+        """
+        self._amounts[row] = transaction["amount"]
+        self._types[row] = TYPE_BITS.get(transaction["type"], 0)
+        self._categories[row] = self.encode_category(transaction["category"])
+        self._days[row] = transaction.get("date_ordinal") or 0
+        self._counts[row] = transaction.get("count", 1)
+
+    def append(self, transaction: Dict[str, Any]):
+        """
+        Agrega una transacción al final de las columnas
+        """
+        if self._size == len(self._amounts):
+            self._grow()
+
+        row = self._size
+        self._write(row, transaction)
+        self._rows[transaction["id"]] = row
+        self._ids.append(transaction["id"])
+        self._size += 1
+
+    def update(self, transaction: Dict[str, Any]):
+        """
+        Sobrescribe la fila de una transacción existente
+        """
+        row = self._rows.get(transaction["id"])
+        if row is None:
+            self.append(transaction)
+            return
+        self._write(row, transaction)
+
+    def remove(self, transaction_id: str):
+        """
+        Elimina una transacción moviendo la última fila a su lugar
+        """
+        row = self._rows.pop(transaction_id, None)
+        if row is None:
+            return
+
+        last = self._size - 1
+        if row != last:
+            for column in (self._amounts, self._types, self._categories, self._days, self._counts):
+                column[row] = column[last]
+            moved_id = self._ids[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+
+        self._ids.pop()
+        self._size -= 1
+
+    def type_mask(self, transaction_type: str) -> np.ndarray:
+        """
+        Máscara booleana de las filas de un tipo
+        """
+        return (self.types & TYPE_BITS.get(transaction_type, 0)) != 0
+
+    def months(self) -> np.ndarray:
+        """
+        Índice de mes (año * 12 + mes - 1) de cada fila
+        """
+        months = (self.days - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        return months + 1970 * 12
+
+    def clear(self):
+        """
+        Elimina todas las filas conservando la capacidad
+        """
+        self._size = 0
+        self._rows.clear()
+        self._ids.clear()
+        self.category_names.clear()
+        self._category_codes.clear()
+
+
+def as_columns(transactions) -> TransactionColumns:
+    """
+    Devuelve las columnas tal cual o las construye desde una lista de diccionarios
+    """
+    if isinstance(transactions, TransactionColumns):
+        return transactions
+    return TransactionColumns.from_transactions(transactions)
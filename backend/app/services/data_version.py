@@ -0,0 +1,114 @@
+import secrets
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db_config import AsyncReadSessionLocal, AsyncSessionLocal, settings
+from ..models.version import UserDataVersion
+from .sqlite_writer import WRITER_ENABLED, sqlite_writer
+
+# Versión leída durante la solicitud en curso: (usuario, versión)
+_request_version: ContextVar[Optional[Tuple[str, int]]] = ContextVar("request_data_version", default=None)
+
+
+def _bump_row(session: Session, user_id: str) -> int:
+    """
+    Incrementa la versión del usuario, creando su fila si todavía no existe,
+    y devuelve la nueva versión
+    """
+    version = session.execute(
+        update(UserDataVersion)
+        .where(UserDataVersion.user_id == user_id)
+        .values(version=UserDataVersion.version + 1)
+        .returning(UserDataVersion.version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if version is None:
+        session.add(UserDataVersion(user_id=user_id, version=1))
+        session.flush()
+        version = 1
+    return version
+
+
+class DataVersions:
+    """
+    Versión monótona de los datos de cada usuario.
+
+    Las escrituras de transacciones y de perfil la incrementan después de
+    confirmarse, así que una versión nunca se asocia a datos anteriores a
+    ella. Con el backend SQL vive en la tabla user_data_versions y la ven
+    todos los workers; con el almacén en memoria es un contador del proceso
+    y `epoch` (aleatorio por proceso) evita que un ETag emitido antes de un
+    reinicio coincida con datos distintos.
+
+    La versión leída se recuerda durante la solicitud, así que el ETag y la
+    caché de resultados la consultan una sola vez. Los suscriptores reciben
+    cada incremento hecho en este proceso junto con las etiquetas de lo que
+    cambió (mes, categoría).
+    """
+
+    def __init__(self, shared: bool):
+        self.shared = shared
+        self.epoch = "" if shared else secrets.token_hex(4)
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[str, int, Iterable], None]] = []
+
+    def subscribe(self, listener: Callable[[str, int, Iterable], None]):
+        """
+        Registra una función que se llama tras cada incremento local
+        """
+        self._listeners.append(listener)
+
+    async def get(self, user_id: str) -> int:
+        """
+        Versión actual de los datos del usuario (0 si nunca ha escrito)
+        """
+        remembered = _request_version.get()
+        if remembered is not None and remembered[0] == user_id:
+            return remembered[1]
+
+        if not self.shared:
+            version = self._versions.get(user_id, 0)
+        else:
+            async with AsyncReadSessionLocal() as session:
+                version = await session.scalar(
+                    select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+                ) or 0
+
+        _request_version.set((user_id, version))
+        return version
+
+    async def bump(self, user_id: str, tags: Iterable = ()) -> int:
+        """
+        Marca que los datos del usuario cambiaron y devuelve la nueva versión.
+        tags describe qué cambió, para las invalidaciones precisas.
+        """
+        if not self.shared:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+        elif WRITER_ENABLED:
+            # En el perfil de producción o con group commit pasa por el escritor único
+            version = await sqlite_writer.submit(lambda session: _bump_row(session, user_id))
+        else:
+            async with AsyncSessionLocal() as session:
+                try:
+                    version = await session.run_sync(_bump_row, user_id)
+                    await session.commit()
+                except IntegrityError:
+                    # Otra solicitud creó la fila a la vez: basta con incrementarla
+                    await session.rollback()
+                    version = await session.run_sync(_bump_row, user_id)
+                    await session.commit()
+
+        _request_version.set((user_id, version))
+        tags = tuple(tags)
+        for listener in self._listeners:
+            listener(user_id, version, tags)
+        return version
+
+
+# Versiones compartidas por los routers
+data_versions = DataVersions(shared=settings.TRANSACTION_BACKEND == "sql")
@@ -0,0 +1,147 @@
+import hashlib
+import hmac
+import logging
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from ..db_config import settings
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Límites del coste de bcrypt (log2 de las iteraciones)
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+# Contraseña de prueba para medir el coste
+CALIBRATION_PASSWORD = "calibracion-Aureum-2024"
+
+
+@lru_cache(maxsize=None)
+def _build_context(rounds: int) -> CryptContext:
+    """
+    Contexto de passlib con bcrypt ($2b$<coste>$...). El coste queda en el
+    propio hash, así que cualquier hash con un coste menor se marca para
+    actualizar.
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__ident="2b",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+# Contexto activo; configure_password_hashing lo reemplaza al arrancar
+pwd_context = _build_context(settings.PASSWORD_BCRYPT_ROUNDS or MIN_BCRYPT_ROUNDS)
+
+
+def current_rounds() -> int:
+    """
+    Coste de bcrypt con el que se crean los hashes nuevos
+    """
+    return pwd_context.to_dict()["bcrypt__rounds"]
+
+
+def is_legacy_hash(hashed_password: str) -> bool:
+    """
+    Indica si el hash usa el formato anterior `sha256hex:salt`
+    """
+    return not hashed_password.startswith("$") and ":" in hashed_password
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Crea el hash bcrypt de la contraseña con el coste indicado o el configurado.
+    El pool de procesos pasa el coste explícitamente: sus trabajadores no ven
+    la calibración hecha en el proceso principal.
+    """
+    context = _build_context(rounds) if rounds else pwd_context
+    return context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifica la contraseña contra un hash bcrypt o del formato anterior
+    """
+    if not hashed_password:
+        return False
+
+    if is_legacy_hash(hashed_password):
+        hash_val, salt = hashed_password.split(":", 1)
+        digest = hashlib.sha256(f"{plain_password}{salt}".encode()).hexdigest()
+        return hmac.compare_digest(digest, hash_val)
+
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except ValueError:
+        logger.warning("Formato de hash de contraseña no reconocido")
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Indica si el hash debe regenerarse: formato anterior o coste menor al actual
+    """
+    if is_legacy_hash(hashed_password):
+        return True
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        return True
+
+
+def measure_rounds(rounds: int, samples: int = 3) -> float:
+    """
+    Mediana, en segundos, de crear un hash bcrypt con el coste indicado
+    """
+    context = _build_context(rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash(CALIBRATION_PASSWORD)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def calibrate_rounds(
+    target_ms: float,
+    min_rounds: int = MIN_BCRYPT_ROUNDS,
+    max_rounds: int = MAX_BCRYPT_ROUNDS,
+    samples: int = 3
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Busca el mayor coste cuyo hash tarda como mucho target_ms en este equipo.
+    Cada unidad de coste duplica el tiempo, así que se mide desde min_rounds
+    hacia arriba y se para en cuanto se supera el objetivo. Devuelve el coste
+    elegido y las mediciones (coste, milisegundos).
+    """
+    chosen = min_rounds
+    table = []
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed_ms = measure_rounds(rounds, samples) * 1000
+        table.append((rounds, elapsed_ms))
+        if elapsed_ms > target_ms:
+            break
+        chosen = rounds
+    return chosen, table
+
+
+def configure_password_hashing(rounds: Optional[int] = None) -> int:
+    """
+    Fija el coste de bcrypt: el indicado, el de PASSWORD_BCRYPT_ROUNDS o,
+    si ninguno está definido, el calibrado contra PASSWORD_HASH_TARGET_MS
+    """
+    global pwd_context
+
+    rounds = rounds or settings.PASSWORD_BCRYPT_ROUNDS
+    if not rounds:
+        rounds, table = calibrate_rounds(settings.PASSWORD_HASH_TARGET_MS)
+        measured = ", ".join(f"{cost}: {ms:.0f} ms" for cost, ms in table)
+        logger.info(f"Coste de bcrypt calibrado en {rounds} (objetivo {settings.PASSWORD_HASH_TARGET_MS} ms; {measured})")
+
+    pwd_context = _build_context(rounds)
+    return rounds
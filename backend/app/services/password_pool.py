@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..db_config import settings
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolSaturated(Exception):
+    """
+    El pool de contraseñas tiene todos sus trabajadores ocupados y la cola llena
+    """
+
+
+def _timed_call(func: Callable, *args) -> tuple:
+    """
+    Ejecuta la función en el trabajador y devuelve (resultado, segundos de cómputo)
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordPool:
+    """
+    Pool acotado para calcular y verificar hashes de contraseñas fuera del
+    event loop.
+
+    Un KDF lento (bcrypt) tarda cientos de milisegundos por llamada; ejecutado
+    dentro de un `async def` detiene todas las solicitudes del proceso. Aquí
+    cada llamada se envía a un pool de hilos (o de procesos) de tamaño fijo.
+    Como mucho se admiten `workers + max_queue` llamadas a la vez: las
+    siguientes se rechazan de inmediato con PasswordPoolSaturated (un 503)
+    en lugar de acumular esperas que acabarían en timeouts.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32, kind: str = "thread"):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "peak_in_flight": 0,
+            "wait_seconds": 0.0,
+            "run_seconds": 0.0,
+        }
+
+    @property
+    def executor(self) -> Executor:
+        """
+        Crea el pool la primera vez que se usa
+        """
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+                logger.info(f"Pool de contraseñas iniciado ({self.kind}, {self.workers} trabajadores)")
+            return self._executor
+
+    def _acquire(self):
+        """
+        Reserva un hueco en el pool o rechaza la llamada si está saturado
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise PasswordPoolSaturated(
+                    f"Pool de contraseñas saturado ({self._in_flight} operaciones en curso)"
+                )
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def _release(self, elapsed: float, run: Optional[float]):
+        """
+        Libera el hueco y acumula los tiempos de espera y de cómputo
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if run is None:
+                self._stats["failed"] += 1
+                return
+            self._stats["completed"] += 1
+            self._stats["run_seconds"] += run
+            self._stats["wait_seconds"] += max(0.0, elapsed - run)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Ejecuta func(*args) en el pool y espera el resultado sin bloquear el event loop
+        """
+        self._acquire()
+        start = time.perf_counter()
+        run = None
+        try:
+            result, run = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _timed_call, func, *args
+            )
+            return result
+        finally:
+            self._release(time.perf_counter() - start, run)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Estado y contadores del pool (tiempos medios en milisegundos)
+        """
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "submitted": self._stats["submitted"],
+                "completed": completed,
+                "failed": self._stats["failed"],
+                "rejected": self._stats["rejected"],
+                "peak_in_flight": self._stats["peak_in_flight"],
+                "avg_wait_ms": round(self._stats["wait_seconds"] * 1000 / completed, 3) if completed else 0.0,
+                "avg_run_ms": round(self._stats["run_seconds"] * 1000 / completed, 3) if completed else 0.0,
+            }
+
+    def shutdown(self):
+        """
+        Detiene los trabajadores del pool
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+# Pool compartido por los endpoints de autenticación
+password_pool = PasswordPool(
+    workers=settings.PASSWORD_POOL_WORKERS,
+    max_queue=settings.PASSWORD_POOL_MAX_QUEUE,
+    kind=settings.PASSWORD_POOL_KIND
+)
@@ -0,0 +1,231 @@
+import functools
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from ..db_config import settings
+from .data_version import data_versions
+
+# Etiqueta de las entradas que dependen de todos los datos del usuario
+ANY_CHANGE = ("all", None)
+# Parámetros de los endpoints que no forman parte de la clave
+NON_KEY_PARAMS = frozenset({"current_user", "db", "request", "response"})
+
+
+def month_tag(year: int, month: int) -> Tuple[str, Tuple[int, int]]:
+    return ("month", (year, month))
+
+
+def category_tag(category: str) -> Tuple[str, str]:
+    return ("category", category)
+
+
+def endpoint_key(name: str, params: Dict[str, Any]) -> Tuple:
+    """
+    Clave (usuario, endpoint, parámetros ordenados por nombre) de una llamada
+    a un endpoint, sin las dependencias (current_user, db)
+    """
+    return (
+        params["current_user"].id,
+        name,
+        tuple(sorted((param, value) for param, value in params.items() if param not in NON_KEY_PARAMS)),
+    )
+
+
+def approximate_size(value: Any) -> int:
+    """
+    Tamaño aproximado en bytes de un resultado (diccionarios, listas y escalares)
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(key) + approximate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+
+class ResultCache:
+    """
+    Caché LRU de resultados de endpoints con un presupuesto de memoria.
+
+    Cada entrada guarda el resultado, su tamaño aproximado y sus etiquetas
+    (usuario + mes, categoría o ANY_CHANGE). Una escritura local invalida
+    solo las entradas del usuario que comparten alguna etiqueta con ella;
+    ANY_CHANGE se invalida con cualquier escritura.
+
+    Las entradas son válidas para la versión de datos del usuario que la
+    caché tiene confirmada. Cada escritura local avanza esa versión en uno;
+    si al leer la versión actual es mayor, otro worker escribió y no se sabe
+    qué cambió, así que se descartan todas las entradas del usuario. Un
+    resultado calculado mientras se invalidaba al usuario no se guarda.
+
+    Solo se usa desde el event loop, así que no necesita lock.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, str, Tuple]]" = OrderedDict()
+        self._by_tag: Dict[Tuple[str, Tuple], Set[Hashable]] = {}
+        self._by_user: Dict[str, Set[Hashable]] = {}
+        self._confirmed: Dict[str, int] = {}
+        self._generation: Dict[str, int] = {}
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def generation(self, user_id: str) -> int:
+        """
+        Contador de invalidaciones del usuario (para descartar resultados a medio calcular)
+        """
+        return self._generation.get(user_id, 0)
+
+    def _sync_version(self, user_id: str, version: int):
+        """
+        Descarta las entradas del usuario si su versión avanzó fuera de este proceso
+        """
+        confirmed = self._confirmed.get(user_id)
+        if confirmed is None or version > confirmed:
+            if confirmed is not None:
+                self._invalidate_keys(user_id, list(self._by_user.get(user_id, ())))
+            self._confirmed[user_id] = version
+
+    def get(self, key: Hashable, user_id: str, version: int) -> Tuple[bool, Any]:
+        """
+        Devuelve (acierto, resultado) para la versión de datos indicada
+        """
+        self._sync_version(user_id, version)
+        entry = self._entries.get(key)
+        if entry is None or self._confirmed[user_id] != version:
+            self._stats["misses"] += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return True, entry[0]
+
+    def put(self, key: Hashable, user_id: str, value: Any, tags: Iterable, version: int, generation: int):
+        """
+        Guarda un resultado calculado con la versión y generación indicadas
+        """
+        if self._confirmed.get(user_id) != version or self.generation(user_id) != generation:
+            return
+
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (value, size, user_id, tags)
+        self._bytes += size
+        self._by_user.setdefault(user_id, set()).add(key)
+        for tag in tags:
+            self._by_tag.setdefault((user_id, tag), set()).add(key)
+
+        # Desalojar las entradas menos usadas hasta volver al presupuesto
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+
+    def _remove(self, key: Hashable):
+        """
+        Elimina una entrada y sus referencias en los índices
+        """
+        _, size, user_id, tags = self._entries.pop(key)
+        self._bytes -= size
+        for index, index_key in [(self._by_user, user_id)] + [(self._by_tag, (user_id, tag)) for tag in tags]:
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+
+    def _invalidate_keys(self, user_id: str, keys: Iterable[Hashable]):
+        removed = 0
+        for key in keys:
+            if key in self._entries:
+                self._remove(key)
+                removed += 1
+        self._generation[user_id] = self.generation(user_id) + 1
+        self._stats["invalidations"] += removed
+
+    def note_write(self, user_id: str, version: int, tags: Iterable):
+        """
+        Invalida las entradas afectadas por una escritura local del usuario.
+        Sin etiquetas (o si se perdió alguna versión intermedia) se invalida
+        todo el usuario.
+        """
+        tags = tuple(tags)
+        confirmed = self._confirmed.get(user_id)
+        if not tags or confirmed is None or version != confirmed + 1:
+            keys = list(self._by_user.get(user_id, ()))
+        else:
+            keys = set()
+            for tag in tags + (ANY_CHANGE,):
+                keys.update(self._by_tag.get((user_id, tag), ()))
+        self._invalidate_keys(user_id, keys)
+        self._confirmed[user_id] = max(version, confirmed or 0)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_tag.clear()
+        self._by_user.clear()
+        self._confirmed.clear()
+        self._bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Tamaño, presupuesto y contadores de la caché, con la tasa de aciertos
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Caché compartida por los endpoints de análisis
+result_cache = ResultCache(int(settings.RESULT_CACHE_MB * 1024 * 1024))
+data_versions.subscribe(result_cache.note_write)
+
+
+def memoize(
+    name: str,
+    tags: Callable[[Dict[str, Any]], Iterable],
+    cache: Optional[ResultCache] = None
+):
+    """
+    Decorador para endpoints asíncronos cuyo resultado depende solo de los
+    datos del usuario y de sus parámetros. La clave es (usuario, name,
+    parámetros ordenados por nombre, sin current_user ni db) y tags devuelve
+    las etiquetas de la entrada a partir de los argumentos del endpoint.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            target = cache or result_cache
+            if not target.enabled:
+                return await func(**kwargs)
+
+            cache_key = endpoint_key(name, kwargs)
+            user_id = cache_key[0]
+            version = await data_versions.get(user_id)
+
+            hit, value = target.get(cache_key, user_id, version)
+            if hit:
+                return value
+
+            generation = target.generation(user_id)
+            value = await func(**kwargs)
+            target.put(cache_key, user_id, value, tags(kwargs), version, generation)
+            return value
+
+        return wrapper
+    return decorator
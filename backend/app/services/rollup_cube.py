@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional, Any, Tuple
+
+from ..utils.formatting import month_of_ordinal
+
+# Clave de un mes: (año, mes)
+Month = Tuple[int, int]
+# Clave de una celda dentro de un mes: (tipo, categoría, subcategoría)
+CellKey = Tuple[str, str, Optional[str]]
+
+
+class RollupCube:
+    """
+    Acumulados de monto y cantidad por (usuario, año-mes, tipo, categoría, subcategoría).
+
+    Se actualiza en cada escritura del almacén, de modo que los análisis
+    mensuales, por categoría y las estadísticas generales leen celdas
+    ya agregadas en lugar de reagrupar el historial del usuario.
+    """
+
+    def __init__(self):
+        self._months: Dict[str, Dict[Month, Dict[CellKey, List[float]]]] = {}
+        self._all_time: Dict[str, Dict[Tuple[str, str], List[float]]] = {}
+
+    @staticmethod
+    def _add(cells: Dict[Any, List[float]], key: Any, amount: float, count: int):
+        """
+        Suma monto y cantidad a una celda, eliminándola si queda vacía
+        """
+        cell = cells.setdefault(key, [0.0, 0])
+        cell[0] += amount
+        cell[1] += count
+        if cell[1] <= 0:
+            del cells[key]
+
+    def apply(
+        self,
+        user_id: str,
+        transaction_type: str,
+        category: str,
+        subcategory: Optional[str],
+        amount: float,
+        date_ordinal: int,
+        sign: int = 1
+    ):
+        """
+        Suma (sign=1) o resta (sign=-1) una transacción de sus celdas
+        """
+        month_cells = self._months.setdefault(user_id, {}).setdefault(month_of_ordinal(date_ordinal), {})
+        self._add(month_cells, (transaction_type, category, subcategory), sign * amount, sign)
+        self._add(self._all_time.setdefault(user_id, {}), (transaction_type, category), sign * amount, sign)
+
+    def cells(
+        self,
+        user_id: str,
+        first_month: Optional[Month] = None,
+        last_month: Optional[Month] = None,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve las celdas de un usuario entre dos meses (inclusive)
+        """
+        result = []
+        for month, month_cells in self._months.get(user_id, {}).items():
+            if first_month is not None and month < first_month:
+                continue
+            if last_month is not None and month > last_month:
+                continue
+
+            for (tx_type, cell_category, subcategory), (amount, count) in month_cells.items():
+                if category is not None and cell_category != category:
+                    continue
+                result.append({
+                    "year": month[0],
+                    "month": month[1],
+                    "type": tx_type,
+                    "category": cell_category,
+                    "subcategory": subcategory,
+                    "amount": amount,
+                    "count": count
+                })
+
+        return result
+
+    def category_totals(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Devuelve monto y cantidad históricos del usuario por (tipo, categoría)
+        """
+        return [
+            {"type": tx_type, "category": category, "amount": amount, "count": count}
+            for (tx_type, category), (amount, count) in self._all_time.get(user_id, {}).items()
+        ]
+
+    def clear(self):
+        """
+        Elimina todas las celdas
+        """
+        self._months.clear()
+        self._all_time.clear()
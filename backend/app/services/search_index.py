@@ -0,0 +1,90 @@
+from typing import Dict, Iterable, Optional, Set
+
+# Longitud de los fragmentos indexados; las búsquedas más cortas no usan el índice
+GRAM_SIZE = 3
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """
+    Devuelve los trigramas (en minúsculas) de un texto
+    """
+    if not text:
+        return set()
+    text = text.lower()
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas por usuario para la búsqueda de transacciones.
+
+    Cada usuario tiene sus propias listas de postings (trigrama -> ids), así que
+    una búsqueda solo intersecta conjuntos de ese usuario. La intersección
+    devuelve candidatos: contienen todos los trigramas de la consulta, pero el
+    llamador debe confirmar la subcadena sobre el registro.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, Set[str]]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+
+    def add(self, user_id: str, transaction_id: str, texts: Iterable[Optional[str]]):
+        """
+        Indexa los textos de una transacción. Cada texto se descompone por
+        separado para no generar trigramas que crucen campos.
+        """
+        grams = set()
+        for text in texts:
+            grams |= trigrams(text)
+
+        postings = self._postings.setdefault(user_id, {})
+        for gram in grams:
+            postings.setdefault(gram, set()).add(transaction_id)
+        self._grams[transaction_id] = grams
+
+    def remove(self, user_id: str, transaction_id: str):
+        """
+        Retira una transacción de las listas de postings del usuario
+        """
+        postings = self._postings.get(user_id, {})
+        for gram in self._grams.pop(transaction_id, ()):
+            ids = postings.get(gram)
+            if ids is None:
+                continue
+            ids.discard(transaction_id)
+            if not ids:
+                del postings[gram]
+
+    def candidates(self, user_id: str, query: str) -> Optional[Set[str]]:
+        """
+        Devuelve los ids que contienen todos los trigramas de la consulta,
+        o None si la consulta es demasiado corta para usar el índice
+        """
+        grams = trigrams(query)
+        if not grams:
+            return None
+
+        postings = self._postings.get(user_id, {})
+        lists = []
+        for gram in grams:
+            ids = postings.get(gram)
+            if not ids:
+                return set()
+            lists.append(ids)
+
+        # Intersectar empezando por la lista más corta
+        lists.sort(key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result &= ids
+            if not result:
+                break
+
+        return result
+
+    def clear(self):
+        """
+        Elimina todas las listas de postings
+        """
+        self._postings.clear()
+        self._grams.clear()
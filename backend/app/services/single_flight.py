@@ -0,0 +1,93 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .data_version import data_versions
+from .result_cache import endpoint_key
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes idénticas en una sola ejecución.
+
+    La primera llamada con una clave (el líder) ejecuta la función; las que
+    llegan mientras sigue en curso esperan su resultado o su excepción en
+    lugar de repetir el cálculo. Si el líder se cancela (el cliente cerró la
+    conexión), las llamadas en espera no heredan la cancelación: la
+    siguiente toma el relevo como líder. Solo se usa desde el event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "collapsed": 0, "failures": 0, "handoffs": 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta func una sola vez para todas las llamadas concurrentes con la misma clave
+        """
+        while key in self._calls:
+            future = self._calls[key]
+            self._stats["collapsed"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Se canceló esta llamada, no el líder
+                if not future.cancelled():
+                    raise
+                self._stats["collapsed"] -= 1
+                self._stats["handoffs"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self._stats["leaders"] += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._stats["failures"] += 1
+            future.set_exception(e)
+            # Marcar la excepción como recuperada aunque nadie más la espere
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Llamadas en curso y contadores: cálculos ejecutados (leaders) y
+        llamadas que esperaron uno ajeno (collapsed)
+        """
+        total = self._stats["leaders"] + self._stats["collapsed"]
+        return {
+            "in_flight": len(self._calls),
+            **self._stats,
+            "collapse_rate": round(self._stats["collapsed"] / total, 4) if total else 0.0,
+        }
+
+
+# Agrupador compartido por los endpoints de lectura costosos
+single_flight = SingleFlight()
+
+
+def coalesce(name: str, group: Optional[SingleFlight] = None):
+    """
+    Decorador para endpoints asíncronos: las llamadas concurrentes del mismo
+    usuario con los mismos parámetros y la misma versión de datos comparten
+    una ejecución. La versión forma parte de la clave para que una lectura
+    iniciada antes de una escritura no responda a las que llegan después.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = endpoint_key(name, kwargs)
+            version = await data_versions.get(key[0])
+            return await (group or single_flight).do(key + (version,), lambda: func(**kwargs))
+
+        return wrapper
+    return decorator
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from ..db_config import AsyncSessionLocal, SQLITE_PRODUCTION, settings
+from .transaction_repository import DEFER_COMMIT
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Escrituras que pueden esperar en la cola antes de que submit se bloquee
+MAX_PENDING_WRITES = 10_000
+
+# Escritura encolada: función síncrona sobre una Session y el futuro del solicitante
+Job = Tuple[Optional[Callable[[Session], Any]], asyncio.Future]
+
+
+class SQLiteWriter:
+    """
+    Tarea única que ejecuta todas las escrituras en orden.
+
+    SQLite admite un solo escritor por archivo: si varias solicitudes escriben
+    a la vez, compiten por el bloqueo y acaban en "database is locked". Aquí
+    cada escritura se encola como una función síncrona sobre una Session y una
+    sola tarea del event loop las ejecuta una tras otra con la conexión de
+    escritura, resolviendo el futuro de la solicitud con el resultado.
+
+    Con max_batch > 1 (group commit) la tarea agrupa las escrituras que llegan
+    en max_delay segundos, hasta max_batch, y las confirma en una sola
+    transacción: un fsync por lote en lugar de uno por escritura. El futuro de
+    cada solicitud se resuelve solo después de confirmar su lote. Si el lote
+    falla, se revierte y sus escrituras se reintentan una a una, de modo que
+    el error llega solo a la solicitud que lo provocó.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        max_pending: int = MAX_PENDING_WRITES,
+        max_batch: int = 1,
+        max_delay: float = 0.005
+    ):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        # Una tarea de otro event loop (por ejemplo, uno ya cerrado) no cuenta
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    def start(self):
+        """
+        Arranca la tarea escritora en el event loop actual
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Tarea escritora de SQLite iniciada (lotes de hasta {self.max_batch})")
+
+    async def submit(self, operation: Callable[[Session], Any]) -> Any:
+        """
+        Encola una escritura y espera a que la tarea escritora la ejecute
+        """
+        if not self.running:
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _next_batch(self) -> List[Job]:
+        """
+        Espera la siguiente escritura y reúne las que lleguen durante max_delay,
+        hasta max_batch. Una marca de parada cierra el lote.
+        """
+        batch = [await self._queue.get()]
+        if self.max_batch == 1 or batch[0][0] is None:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch and batch[-1][0] is not None:
+            # Primero lo que ya está en la cola, sin esperar
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """
+        Consume la cola por lotes hasta recibir la marca de parada
+        """
+        while True:
+            batch = await self._next_batch()
+            operation, stop = batch[-1]
+            if operation is not None:
+                stop = None
+            else:
+                batch.pop()
+
+            if len(batch) == 1:
+                await self._execute(*batch[0])
+            elif batch:
+                await self._execute_batch(batch)
+
+            # Marca de parada: las escrituras anteriores ya se confirmaron
+            if stop is not None:
+                stop.set_result(None)
+                return
+
+    async def _execute(self, operation: Callable[[Session], Any], future: asyncio.Future):
+        """
+        Ejecuta una escritura y propaga su resultado o su error al solicitante
+        """
+        async with self.session_factory() as session:
+            try:
+                result = await session.run_sync(operation)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error en escritura encolada: {str(e)}")
+                if not future.done():
+                    future.set_exception(e)
+                return
+
+        # El solicitante pudo cancelarse mientras esperaba; la escritura se aplica igual
+        if not future.done():
+            future.set_result(result)
+
+    async def _execute_batch(self, batch: List[Job]):
+        """
+        Ejecuta un lote de escrituras en una sola transacción y resuelve los
+        futuros cuando se confirma
+        """
+        async with self.session_factory() as session:
+            session.sync_session.info[DEFER_COMMIT] = True
+            try:
+                results = await session.run_sync(
+                    lambda sync_session: [operation(sync_session) for operation, _ in batch]
+                )
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.warning(f"Lote de {len(batch)} escrituras revertido, se reintentan una a una: {str(e)}")
+                results = None
+
+        if results is None:
+            for operation, future in batch:
+                await self._execute(operation, future)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def stop(self):
+        """
+        Confirma las escrituras pendientes y detiene la tarea
+        """
+        if not self.running:
+            return
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((None, future))
+        await future
+        await self._task
+        self._task = None
+        logger.info("Tarea escritora de SQLite detenida")
+
+
+# Escritor compartido por la aplicación (conexión única del engine de escritura)
+sqlite_writer = SQLiteWriter(
+    AsyncSessionLocal,
+    max_batch=settings.WRITE_BATCH_MAX_OPS,
+    max_delay=settings.WRITE_BATCH_MAX_DELAY_MS / 1000
+)
+
+# El escritor se usa con el perfil de producción de SQLite o con group commit activado
+WRITER_ENABLED = SQLITE_PRODUCTION or settings.WRITE_BATCH_MAX_OPS > 1
+
+
+async def run_write(operation: Callable[[Session], Any]) -> Any:
+    """
+    Ejecuta una escritura corta sobre una Session síncrona: por el escritor
+    único si está activo o en una sesión de escritura propia que se confirma
+    en seguida. La conexión de escritura solo se ocupa mientras dura
+    operation, nunca durante trabajo lento de la solicitud (hash de
+    contraseñas, llamadas externas).
+    """
+    if WRITER_ENABLED:
+        return await sqlite_writer.submit(operation)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.run_sync(operation)
+        await session.commit()
+    return result
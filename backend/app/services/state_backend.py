@@ -0,0 +1,446 @@
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from ..db_config import AsyncReadSessionLocal, Base, dispose_async_engines, engine, settings
+from ..models.transaction import TransactionType
+from ..models.user import User, UserType
+from ..utils.formatting import date_to_ordinal
+from .balance_ledger import BalanceLedger
+from .sqlite_writer import WRITER_ENABLED, run_write, sqlite_writer
+from .transaction_repository import AsyncTransactionRepository
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Campos de usuario que guarda el estado de main.py
+USER_FIELDS = ("id", "email", "name", "type", "hashed_password")
+# Campos de transacción que devuelve el estado de main.py
+TRANSACTION_FIELDS = ("id", "user_id", "type", "category", "amount", "detail", "date", "created_at")
+
+
+class StateBackend:
+    """
+    Interfaz del estado de main.py (usuarios, transacciones y balances). Con
+    varios workers de uvicorn/gunicorn cada proceso tiene su propia memoria,
+    así que el estado debe vivir fuera del proceso para que todos vean los
+    mismos datos.
+
+    Los tipos de usuario y de transacción se validan aquí para todos los
+    backends: un valor desconocido lanza ValueError antes de guardar nada.
+    """
+
+    @staticmethod
+    def _user_type(value: str) -> str:
+        return UserType(value).value
+
+    @staticmethod
+    def _transaction_type(value: str) -> str:
+        return TransactionType(value).value
+
+    async def startup(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def add_user(self, user: Dict[str, Any]) -> bool:
+        """
+        Registra un usuario; devuelve False si el email ya existe
+        """
+        raise NotImplementedError
+
+    async def update_password(self, email: str, hashed_password: str):
+        raise NotImplementedError
+
+    async def add_transaction(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def list_transactions(self, user_id: str, transaction_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def get_balance(self, user_id: str) -> Tuple[float, float]:
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    Estado en la memoria del proceso: solo es consistente con un worker.
+
+    Cada cambio se expresa como un evento que _apply aplica a los índices
+    en memoria; FileStateBackend reutiliza los mismos eventos como registro
+    compartido entre procesos.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._transactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._ledger = BalanceLedger()
+
+    def _apply(self, event: Dict[str, Any]):
+        """
+        Aplica un evento al estado en memoria
+        """
+        op = event["op"]
+        if op == "user":
+            self._users[event["user"]["email"]] = event["user"]
+        elif op == "password":
+            user = self._users.get(event["email"])
+            if user is not None:
+                user["hashed_password"] = event["hashed_password"]
+        elif op == "tx":
+            tx = event["tx"]
+            self._transactions.setdefault(tx["user_id"], []).append(tx)
+            self._ledger.apply(tx["user_id"], tx["type"], tx["amount"])
+
+    async def _write(self, build: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Construye un evento a partir del estado actual y lo aplica.
+        build devuelve None si la escritura no procede.
+        """
+        event = build()
+        if event is not None:
+            self._apply(event)
+        return event
+
+    async def _refresh(self):
+        """
+        Incorpora los cambios de otros procesos (nada que hacer en memoria)
+        """
+
+    async def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        await self._refresh()
+        user = self._users.get(email)
+        return dict(user) if user else None
+
+    async def add_user(self, user: Dict[str, Any]) -> bool:
+        record = {field: user[field] for field in USER_FIELDS}
+        record["type"] = self._user_type(record["type"])
+        event = await self._write(
+            lambda: None if record["email"] in self._users else {"op": "user", "user": record}
+        )
+        return event is not None
+
+    async def update_password(self, email: str, hashed_password: str):
+        await self._write(lambda: {"op": "password", "email": email, "hashed_password": hashed_password})
+
+    async def add_transaction(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        record = {field: transaction[field] for field in TRANSACTION_FIELDS}
+        record["type"] = self._transaction_type(record["type"])
+        if isinstance(record["created_at"], datetime):
+            record["created_at"] = record["created_at"].isoformat()
+        await self._write(lambda: {"op": "tx", "tx": record})
+        return dict(record)
+
+    async def list_transactions(self, user_id: str, transaction_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        await self._refresh()
+        return [
+            dict(tx) for tx in self._transactions.get(user_id, ())
+            if transaction_type is None or tx["type"] == transaction_type
+        ]
+
+    async def get_balance(self, user_id: str) -> Tuple[float, float]:
+        await self._refresh()
+        return self._ledger.totals(user_id)
+
+
+class FileStateBackend(MemoryStateBackend):
+    """
+    Réplica en memoria de un registro de eventos compartido en un archivo.
+
+    Las escrituras se añaden al archivo (JSON por línea) con un bloqueo
+    exclusivo de flock, después de incorporar lo que hayan escrito otros
+    procesos, así que la comprobación de email repetido ve
+    el estado global. Las lecturas solo comparan el tamaño del archivo con lo
+    ya leído y, si creció, aplican las líneas nuevas: en el caso habitual se
+    sirven desde memoria. En /dev/shm el archivo vive en memoria compartida.
+    El bloqueo, la lectura y la escritura del archivo se hacen en un hilo
+    (asyncio.to_thread) para no detener el bucle de eventos.
+
+    El registro crece con el estado: usuarios y transacciones no se borran y
+    cada réplica los guarda todos en memoria, así que este backend sirve para
+    volúmenes pequeños. Los cambios de contraseña sí sustituyen a eventos
+    anteriores: cuando el archivo supera compact_bytes y más de la mitad de
+    sus eventos están sustituidos, el escritor lo reescribe con un evento
+    por registro vivo y lo reemplaza con os.replace. Los demás procesos
+    detectan el cambio de inodo y recargan el archivo nuevo.
+    """
+
+    def __init__(self, path: str, compact_bytes: int = settings.STATE_COMPACT_BYTES):
+        super().__init__()
+        self.path = path
+        self.compact_bytes = compact_bytes
+        self._fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+        # Eventos leídos del archivo actual y cuántos de ellos ya no aportan estado
+        self._events = 0
+        self._superseded = 0
+        # flock no excluye a los hilos de un mismo proceso que comparten el descriptor
+        self._thread_lock = threading.Lock()
+
+    def _apply(self, event: Dict[str, Any]):
+        super()._apply(event)
+        self._events += 1
+        if event["op"] == "password":
+            self._superseded += 1
+
+    def _file(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+            self._inode = os.fstat(self._fd).st_ino
+        return self._fd
+
+    def _replaced(self) -> bool:
+        """
+        Indica si otro proceso compactó el archivo (la ruta apunta a otro inodo)
+        """
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    @contextlib.contextmanager
+    def _locked(self, mode: int):
+        with self._thread_lock:
+            while True:
+                fd = self._file()
+                fcntl.flock(fd, mode)
+                if not self._replaced():
+                    break
+                # El bloqueo es del archivo anterior a una compactación: pasar al nuevo
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                self._reopen()
+            try:
+                yield fd
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                if fd != self._fd:
+                    # Este proceso compactó el archivo mientras tenía el bloqueo
+                    os.close(fd)
+
+    def _reopen(self):
+        """
+        Abre el archivo actual de la ruta y reconstruye el estado desde él.
+        El estado anterior se sustituye al final, así que las lecturas
+        concurrentes nunca ven un estado a medio cargar.
+        """
+        os.close(self._fd)
+        self._fd = None
+        fd = self._file()
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        try:
+            size = os.fstat(fd).st_size
+            replica = FileStateBackend(self.path, self.compact_bytes)
+            for line in os.pread(fd, size, 0).splitlines():
+                if line:
+                    replica._apply(json.loads(line))
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._users, self._transactions, self._ledger = replica._users, replica._transactions, replica._ledger
+        self._events, self._superseded = replica._events, replica._superseded
+        self._offset = size
+
+    def _catch_up(self, fd: int):
+        """
+        Aplica las líneas añadidas desde la última lectura (requiere el bloqueo)
+        """
+        size = os.fstat(fd).st_size
+        if size <= self._offset:
+            return
+        data = os.pread(fd, size - self._offset, self._offset)
+        for line in data.splitlines():
+            if line:
+                self._apply(json.loads(line))
+        self._offset = size
+
+    def _compact(self):
+        """
+        Reescribe el registro con un evento por usuario y por transacción
+        (requiere el bloqueo exclusivo del archivo actual)
+        """
+        events = [{"op": "user", "user": user} for user in self._users.values()]
+        events.extend(
+            {"op": "tx", "tx": tx}
+            for transactions in self._transactions.values()
+            for tx in transactions
+        )
+        data = "".join(json.dumps(event, default=str) + "\n" for event in events).encode()
+
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, data)
+            os.replace(temporary, self.path)
+        except OSError as exc:
+            # El evento ya está escrito: seguir con el archivo actual
+            os.close(fd)
+            with contextlib.suppress(OSError):
+                os.unlink(temporary)
+            logger.warning(f"No se pudo compactar el registro de estado {self.path}: {exc}")
+            return
+
+        # El descriptor anterior lo cierra _locked al soltar el bloqueo
+        self._fd = fd
+        self._inode = os.fstat(fd).st_ino
+        self._offset = len(data)
+        self._events = len(events)
+        self._superseded = 0
+        logger.info(f"Registro de estado compactado: {len(events)} eventos en {self.path}")
+
+    def _refresh_locked(self):
+        with self._locked(fcntl.LOCK_SH) as fd:
+            self._catch_up(fd)
+
+    async def _refresh(self):
+        # Sin cambios en el archivo no hace falta bloquear ni salir del bucle de eventos
+        if self._fd is not None:
+            with contextlib.suppress(FileNotFoundError):
+                stat = os.stat(self.path)
+                if stat.st_ino == self._inode and stat.st_size == self._offset:
+                    return
+        await asyncio.to_thread(self._refresh_locked)
+
+    def _write_locked(self, build: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        with self._locked(fcntl.LOCK_EX) as fd:
+            self._catch_up(fd)
+            event = build()
+            if event is not None:
+                line = (json.dumps(event, default=str) + "\n").encode()
+                os.write(fd, line)
+                self._apply(event)
+                self._offset += len(line)
+                if self._offset >= self.compact_bytes and self._superseded * 2 > self._events:
+                    self._compact()
+        return event
+
+    async def _write(self, build: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._write_locked, build)
+
+    async def startup(self):
+        await self._refresh()
+        logger.info(f"Estado compartido en {self.path}")
+
+    async def shutdown(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SQLStateBackend(StateBackend):
+    """
+    Estado en la base de datos configurada (por defecto el SQLite de la app),
+    sobre las mismas tablas que los routers: users, transactions y los totales
+    de user_balances. Todas las escrituras usan el escritor único o el
+    group commit si están activos: las transacciones por TransactionRepository
+    y los usuarios por run_write.
+    """
+
+    async def startup(self):
+        # Varios workers arrancan a la vez: si otro está creando las tablas,
+        # se reintenta y create_all omite las que ya existen
+        for attempt in range(5):
+            try:
+                await asyncio.to_thread(Base.metadata.create_all, engine)
+                return
+            except OperationalError as e:
+                if attempt == 4:
+                    raise
+                logger.info(f"Esquema en creación por otro worker, reintentando: {str(e).splitlines()[0]}")
+                await asyncio.sleep(0.2 * (attempt + 1))
+
+    async def shutdown(self):
+        # Las conexiones de aiosqlite usan hilos que impiden terminar el proceso
+        await sqlite_writer.stop()
+        await dispose_async_engines()
+
+    @staticmethod
+    def _user_dict(user: User) -> Dict[str, Any]:
+        return {
+            "id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "type": user.type.value if user.type else None,
+            "hashed_password": user.hashed_password,
+        }
+
+    async def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        async with AsyncReadSessionLocal() as session:
+            user = await session.scalar(select(User).where(User.email == email))
+            return self._user_dict(user) if user else None
+
+    async def add_user(self, user: Dict[str, Any]) -> bool:
+        record = User(
+            id=user["id"],
+            email=user["email"],
+            name=user["name"],
+            type=UserType(self._user_type(user["type"])),
+            hashed_password=user["hashed_password"],
+        )
+
+        def insert_user(session):
+            session.add(record)
+            session.flush()
+
+        try:
+            await run_write(insert_user)
+        except IntegrityError:
+            # El email ya está registrado
+            return False
+        return True
+
+    async def update_password(self, email: str, hashed_password: str):
+        await run_write(lambda session: session.execute(
+            update(User)
+            .where(User.email == email)
+            .values(hashed_password=hashed_password)
+            .execution_options(synchronize_session=False)
+        ))
+
+    async def add_transaction(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        created_at = transaction["created_at"]
+        record = {
+            **{field: transaction[field] for field in TRANSACTION_FIELDS},
+            "type": self._transaction_type(transaction["type"]),
+            "subcategory": None,
+            # main.py no valida la fecha: si no se puede interpretar se usa el día de creación
+            "date_ordinal": date_to_ordinal(transaction["date"], created_at.year) or created_at.toordinal(),
+            "updated_at": created_at,
+        }
+        async with AsyncReadSessionLocal() as session:
+            repository = AsyncTransactionRepository(session, writer=sqlite_writer if WRITER_ENABLED else None)
+            saved = await repository.add(record)
+        return {field: saved[field] for field in TRANSACTION_FIELDS}
+
+    async def list_transactions(self, user_id: str, transaction_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        async with AsyncReadSessionLocal() as session:
+            rows = await AsyncTransactionRepository(session).list_for_user(user_id, transaction_type=transaction_type)
+        return [{field: row[field] for field in TRANSACTION_FIELDS} for row in rows]
+
+    async def get_balance(self, user_id: str) -> Tuple[float, float]:
+        async with AsyncReadSessionLocal() as session:
+            return await AsyncTransactionRepository(session).get_balance(user_id)
+
+
+def create_state_backend(kind: Optional[str] = None) -> StateBackend:
+    """
+    Crea el backend de estado configurado en STATE_BACKEND
+    """
+    kind = kind or settings.STATE_BACKEND
+    if kind == "memory":
+        return MemoryStateBackend()
+    if kind == "file":
+        return FileStateBackend(settings.STATE_FILE)
+    return SQLStateBackend()
@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from ..db_config import settings
+from .auth_service import ACCESS_TOKEN_EXPIRE_MINUTES
+
+
+class TokenCache:
+    """
+    Caché LRU acotada de tokens ya verificados.
+
+    La clave es el SHA-256 del token (el token en claro no se guarda) y el
+    valor es el usuario resuelto junto con el `exp` del token: una entrada
+    caduca al mismo tiempo que su token, así que un acierto nunca acepta un
+    token vencido. Cada entrada se indexa también por las identidades del
+    usuario (id y email) para invalidarla cuando cambia su perfil, su
+    contraseña o se elimina la cuenta.
+
+    Invalidar la entrada no basta: el mismo token firmado se volvería a
+    decodificar con los mismos claims. Por eso revoke_before guarda además
+    la versión de perfil mínima del usuario, y get_current_user rechaza los
+    tokens con un claim `ver` menor. La revocación se olvida cuando ya han
+    caducado todos los tokens emitidos antes (revocation_ttl). Es local al
+    proceso: con varios workers, los demás siguen aceptando los tokens
+    anteriores hasta que caducan (como máximo ACCESS_TOKEN_EXPIRE_MINUTES).
+    """
+
+    def __init__(self, max_entries: int = 10_000, revocation_ttl: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60):
+        self.max_entries = max_entries
+        self.revocation_ttl = revocation_ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._by_identity: Dict[str, Set[bytes]] = {}
+        # Usuario -> (versión de perfil mínima, momento en que deja de hacer falta)
+        self._min_versions: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Any]:
+        """
+        Devuelve el usuario del token si está en caché y no ha caducado
+        """
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            user, expires_at, identities = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return user
+
+    def put(self, token: str, user: Any, expires_at: float, identities: Iterable[Any]):
+        """
+        Guarda el usuario resuelto de un token verificado hasta su `exp`
+        """
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+
+        key = self.digest(token)
+        identities = tuple(str(identity) for identity in identities if identity)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (user, expires_at, identities)
+            for identity in identities:
+                self._by_identity.setdefault(identity, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: bytes):
+        """
+        Elimina una entrada y sus referencias en el índice de identidades
+        (requiere el lock)
+        """
+        _, _, identities = self._entries.pop(key)
+        for identity in identities:
+            keys = self._by_identity.get(identity)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_identity[identity]
+
+    def invalidate_user(self, *identities: Any) -> int:
+        """
+        Elimina todas las entradas de un usuario (por id o email)
+        """
+        removed = 0
+        with self._lock:
+            for identity in identities:
+                if not identity:
+                    continue
+                for key in list(self._by_identity.get(str(identity), ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+            self._stats["invalidations"] += removed
+        return removed
+
+    def revoke_before(self, user_id: str, version: int, *identities: Any) -> int:
+        """
+        Rechaza desde ahora los tokens del usuario con una versión de perfil
+        menor que version y elimina sus entradas (por id y por las demás
+        identidades indicadas, como el email anterior)
+        """
+        with self._lock:
+            current = self._min_versions.get(user_id)
+            if current is not None:
+                version = max(version, current[0])
+            self._min_versions[user_id] = (version, time.time() + self.revocation_ttl)
+        return self.invalidate_user(user_id, *identities)
+
+    def min_version(self, user_id: str) -> int:
+        """
+        Versión de perfil mínima aceptada para los tokens del usuario (0 si no hay revocación)
+        """
+        with self._lock:
+            entry = self._min_versions.get(user_id)
+            if entry is None:
+                return 0
+            if entry[1] <= time.time():
+                del self._min_versions[user_id]
+                return 0
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_identity.clear()
+            self._min_versions.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Tamaño y contadores de la caché, con la tasa de aciertos
+        """
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "revocations": len(self._min_versions),
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Caché compartida por las dependencias get_current_user
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
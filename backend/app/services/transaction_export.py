@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict
+
+# Campos incluidos en la exportación, en orden de columna
+EXPORT_FIELDS = ("id", "type", "category", "subcategory", "amount", "date", "detail", "created_at")
+# Filas que se acumulan antes de emitir un fragmento de la respuesta
+ROWS_PER_CHUNK = 500
+
+# Tipo de contenido de cada formato
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _export_value(value: Any) -> Any:
+    """
+    Convierte un valor a su representación exportable
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _csv_chunks(transactions: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Genera fragmentos CSV empezando por la cabecera
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+
+    rows = 0
+    buffer.seek(0)
+    buffer.truncate()
+    async for tx in transactions:
+        writer.writerow([_export_value(tx.get(field)) for field in EXPORT_FIELDS])
+        rows += 1
+        if rows >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+
+    if rows:
+        yield buffer.getvalue()
+
+
+async def _ndjson_chunks(transactions: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Genera fragmentos NDJSON (un objeto por línea)
+    """
+    lines = []
+    async for tx in transactions:
+        lines.append(json.dumps(
+            {field: _export_value(tx.get(field)) for field in EXPORT_FIELDS},
+            ensure_ascii=False
+        ))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def export_transactions(transactions: AsyncIterable[Dict[str, Any]], export_format: str) -> AsyncIterator[bytes]:
+    """
+    Codifica un iterador de transacciones como CSV o NDJSON, fragmento a
+    fragmento, sin materializar el historial completo
+    """
+    chunks = _csv_chunks(transactions) if export_format == "csv" else _ndjson_chunks(transactions)
+    async for chunk in chunks:
+        yield chunk.encode("utf-8")
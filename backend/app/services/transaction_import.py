@@ -0,0 +1,252 @@
+import codecs
+import csv
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..models.transaction import TransactionCreate
+from ..utils.formatting import date_to_ordinal
+from ..utils.ids import new_id
+from ..utils.validators import validate_input
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Filas validadas e insertadas por lote
+BATCH_SIZE = 500
+# Errores por fila que se devuelven como máximo (el total se informa aparte)
+MAX_REPORTED_ERRORS = 1000
+# Columnas esperadas en la cabecera CSV
+CSV_FIELDS = ("type", "category", "subcategory", "amount", "date", "detail")
+
+
+def prepare_transaction(transaction: TransactionCreate, user_id: str, now: datetime) -> Dict[str, Any]:
+    """
+    Aplica las comprobaciones de seguridad y fecha de una transacción nueva y
+    devuelve el registro listo para guardar. Lanza ValueError si no es válida.
+    """
+    for field in [transaction.category, transaction.subcategory, transaction.date, transaction.detail]:
+        if field and not validate_input(field):
+            raise ValueError("No se permiten usar caracteres especiales")
+
+    # Interpretar la fecha una sola vez al guardar para poder filtrar por rangos
+    date_ordinal = date_to_ordinal(transaction.date, now.year)
+    if date_ordinal is None:
+        raise ValueError("Formato de fecha inválido")
+
+    return {
+        "id": new_id(),
+        "user_id": user_id,
+        "type": transaction.type,
+        "category": transaction.category,
+        "subcategory": transaction.subcategory,
+        "amount": transaction.amount,
+        "date": transaction.date,
+        "date_ordinal": date_ordinal,
+        "detail": transaction.detail,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Convierte un flujo de bytes en líneas de texto sin acumular el cuerpo completo
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class LineFeed:
+    """
+    Fuente de líneas para csv.reader que se alimenta desde el flujo
+    asíncrono: el lector toma las líneas a medida que se añaden
+    """
+
+    def __init__(self):
+        self.lines: deque = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Devuelve (línea inicial, valores o error) para cada registro CSV. Un solo
+    csv.reader lee todo el cuerpo, así que un campo entre comillas puede
+    ocupar varias líneas (como los que escribe la exportación CSV). Solo se
+    le pide un registro cuando las comillas de las líneas pendientes están
+    equilibradas, es decir, cuando el registro está completo.
+    """
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    quotes = 0
+
+    async for line in lines:
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            # Campo entre comillas abierto: el registro sigue en la línea siguiente
+            continue
+
+        quotes = 0
+        while feed.lines:
+            start = reader.line_num + 1
+            try:
+                values = next(reader)
+            except csv.Error as e:
+                yield start, f"CSV inválido: {str(e)}"
+                continue
+            if values and (len(values) > 1 or values[0].strip()):
+                yield start, values
+
+    if feed.lines:
+        yield reader.line_num + 1, "Campo entre comillas sin cerrar"
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Filas CSV como diccionarios: el primer registro es la cabecera
+    """
+    header: Optional[List[str]] = None
+
+    async for line_number, values in iter_csv_records(lines):
+        if isinstance(values, str):
+            yield line_number, values
+            continue
+
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            missing = [field for field in CSV_FIELDS if field != "subcategory" and field not in header]
+            if missing:
+                raise ValueError(f"Faltan columnas en la cabecera CSV: {', '.join(missing)}")
+            continue
+
+        if len(values) != len(header):
+            yield line_number, "Número de columnas incorrecto"
+            continue
+
+        row = dict(zip(header, values))
+        if not row.get("subcategory"):
+            row["subcategory"] = None
+        yield line_number, row
+
+
+async def iter_rows(lines: AsyncIterator[str], data_format: str) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Devuelve (número de línea, fila) para cada registro no vacío. La fila es un
+    diccionario o una cadena con el error de formato de esa línea.
+    """
+    if data_format != "ndjson":
+        async for row in iter_csv_rows(lines):
+            yield row
+        return
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, "JSON inválido"
+            continue
+        yield line_number, row if isinstance(row, dict) else "Se esperaba un objeto JSON"
+
+
+def validate_batch(
+    batch: List[Tuple[int, Any]],
+    user_id: str,
+    now: datetime
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Valida un lote con las reglas de TransactionCreate y devuelve
+    (registros válidos, errores por línea)
+    """
+    records = []
+    errors = []
+
+    for line_number, row in batch:
+        if isinstance(row, str):
+            errors.append({"line": line_number, "error": row})
+            continue
+
+        try:
+            transaction = TransactionCreate(**row)
+            records.append(prepare_transaction(transaction, user_id, now))
+        except ValidationError as e:
+            message = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            errors.append({"line": line_number, "error": message})
+        except (TypeError, ValueError) as e:
+            errors.append({"line": line_number, "error": str(e)})
+
+    return records, errors
+
+
+async def import_transactions(db, user_id: str, chunks: AsyncIterator[bytes], data_format: str) -> Dict[str, Any]:
+    """
+    Importa transacciones desde un flujo NDJSON o CSV, validando e insertando
+    por lotes de BATCH_SIZE filas
+    """
+    now = datetime.utcnow()
+    inserted = 0
+    failed = 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, Any]] = []
+
+    async def flush():
+        nonlocal inserted, failed
+        records, batch_errors = validate_batch(batch, user_id, now)
+        inserted += await db.add_many(records)
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        batch.clear()
+
+    last_line = 0
+    decode_failed = False
+    try:
+        async for row in iter_rows(iter_lines(chunks), data_format):
+            last_line = row[0]
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                await flush()
+    except UnicodeDecodeError:
+        # Los lotes anteriores ya se confirmaron: se informa del error con los
+        # totales hasta aquí en lugar de rechazar toda la solicitud
+        decode_failed = True
+
+    if batch:
+        await flush()
+
+    if decode_failed:
+        failed += 1
+        errors.extend([{
+            "line": last_line + 1,
+            "error": "Codificación no válida (se esperaba UTF-8); no se importó el resto del cuerpo"
+        }][:MAX_REPORTED_ERRORS - len(errors)])
+
+    logger.info(f"Importación masiva para usuario {user_id}: {inserted} insertadas, {failed} con errores")
+
+    return {"inserted": inserted, "failed": failed, "errors": errors}
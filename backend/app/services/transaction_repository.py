@@ -0,0 +1,636 @@
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
+from sqlalchemy import select, func, or_, tuple_, update, delete, insert, case, literal_column, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from ..db_config import settings
+from ..models.balance import UserBalance, DailyBalance
+from ..models.rollup import MonthlyRollup
+from ..models.search import SEARCH_DDL, SEARCH_REBUILD, SEARCH_TABLE
+from .columnar import TransactionColumns
+from .transaction_service import collect_dashboard
+from ..models.transaction import Transaction, TransactionType
+from ..utils.formatting import month_of_ordinal
+
+# Campos que se devuelven a los routers para cada transacción
+TRANSACTION_FIELDS = (
+    "id", "user_id", "type", "category", "subcategory", "amount",
+    "date", "date_ordinal", "detail", "created_at", "updated_at"
+)
+# Métodos que escriben: con un escritor configurado se ejecutan en su tarea
+WRITE_METHODS = frozenset({
+    "add", "add_many", "update", "delete",
+    "rebuild_search_index", "rebuild_balances", "rebuild_rollups",
+})
+# Clave de Session.info con la que el escritor por lotes aplaza la confirmación
+DEFER_COMMIT = "defer_commit"
+
+
+class TransactionRepository:
+    """
+    Repositorio de transacciones sobre una sesión SQLAlchemy.
+
+    Expone la misma interfaz que TransactionStore, pero todos los filtros
+    (tipo, categoría, rango de fechas y paginación) se resuelven en SQL
+    apoyándose en los índices compuestos del modelo Transaction.
+
+    Los totales de user_balances y daily_balances y los acumulados de
+    monthly_rollups se ajustan en la misma transacción de base de datos
+    que la escritura que los modifica.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    @staticmethod
+    def _to_dict(transaction: Transaction) -> Dict[str, Any]:
+        """
+        Convierte una fila del modelo en el diccionario que usan los routers
+        """
+        data = {field: getattr(transaction, field) for field in TRANSACTION_FIELDS}
+        if isinstance(data["type"], TransactionType):
+            data["type"] = data["type"].value
+        return data
+
+    def _commit(self):
+        """
+        Confirma la operación, o solo la envía a la base de datos si la sesión
+        pertenece a un lote que confirmará el escritor
+        """
+        if self.session.info.get(DEFER_COMMIT):
+            self.session.flush()
+        else:
+            self.session.commit()
+
+    def _get_model(self, user_id: str, transaction_id: str) -> Optional[Transaction]:
+        """
+        Obtiene la fila de una transacción, solo si pertenece al usuario
+        """
+        transaction = self.session.get(Transaction, transaction_id)
+        if transaction is None or transaction.user_id != user_id:
+            return None
+        return transaction
+
+    def _increment(self, model, key: Dict[str, Any], values: Dict[str, float]):
+        """
+        Suma valores a una fila de totales, creándola si todavía no existe
+        """
+        conditions = [getattr(model, column) == value for column, value in key.items()]
+        increments = {column: getattr(model, column) + value for column, value in values.items()}
+        result = self.session.execute(
+            update(model).where(*conditions).values(**increments).execution_options(synchronize_session=False)
+        )
+
+        if result.rowcount == 0:
+            self.session.add(model(**key, **values))
+            self.session.flush()
+
+    @staticmethod
+    def _aggregate_fields(transaction: Transaction) -> Tuple:
+        """
+        Campos de una transacción que determinan sus totales y acumulados
+        """
+        return (
+            TransactionType(transaction.type).value,
+            transaction.amount,
+            transaction.date_ordinal,
+            transaction.category,
+            transaction.subcategory
+        )
+
+    def _apply_aggregates(self, user_id: str, fields: Tuple, sign: int):
+        """
+        Suma (sign=1) o resta (sign=-1) una transacción de los totales y
+        acumulados mensuales del usuario
+        """
+        transaction_type, amount, date_ordinal, category, subcategory = fields
+        income = sign * amount if transaction_type == TransactionType.INCOME else 0.0
+        expense = sign * amount if transaction_type == TransactionType.EXPENSE else 0.0
+        year, month = month_of_ordinal(date_ordinal)
+
+        self._increment(UserBalance, {"user_id": user_id}, {"total_income": income, "total_expense": expense})
+        self._increment(
+            DailyBalance,
+            {"user_id": user_id, "date_ordinal": date_ordinal},
+            {"income": income, "expense": expense}
+        )
+        self._increment(
+            MonthlyRollup,
+            {
+                "user_id": user_id,
+                "year": year,
+                "month": month,
+                "type": transaction_type,
+                "category": category,
+                "subcategory": subcategory or ""
+            },
+            {"amount": sign * amount, "count": sign}
+        )
+
+    def list_query(
+        self,
+        user_id: str,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        after: Optional[Tuple[int, str]] = None
+    ) -> Select:
+        """
+        Construye la consulta filtrada de transacciones de un usuario.
+
+        El orden de los filtros coincide con el de los índices compuestos
+        (user_id, [type | category], date_ordinal) para que el rango de fechas
+        sea un recorrido de rango sobre el índice.
+        """
+        query = select(Transaction).where(Transaction.user_id == user_id)
+
+        if transaction_type:
+            query = query.where(Transaction.type == TransactionType(transaction_type))
+
+        if category:
+            query = query.where(Transaction.category == category)
+
+        if start_ordinal is not None:
+            query = query.where(Transaction.date_ordinal >= start_ordinal)
+
+        if end_ordinal is not None:
+            query = query.where(Transaction.date_ordinal <= end_ordinal)
+
+        # Paginación por cursor: continuar después de la clave (fecha, id) recibida
+        if after is not None:
+            query = query.where(tuple_(Transaction.date_ordinal, Transaction.id) > tuple_(*after))
+
+        return query.order_by(Transaction.date_ordinal, Transaction.id)
+
+    def add(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Inserta una transacción y confirma la operación
+        """
+        data = dict(transaction)
+        data["type"] = TransactionType(data["type"])
+
+        model = Transaction(**data)
+        self.session.add(model)
+        self._apply_aggregates(model.user_id, self._aggregate_fields(model), 1)
+        self._commit()
+
+        return self._to_dict(model)
+
+    def add_many(self, transactions: List[Dict[str, Any]]) -> int:
+        """
+        Inserta un lote de transacciones con un solo executemany y ajusta los
+        acumulados agrupados por clave (una actualización por día, mes y
+        categoría del lote, no una por fila). Confirma al final del lote.
+        """
+        if not transactions:
+            return 0
+
+        rows = [dict(transaction, type=TransactionType(transaction["type"])) for transaction in transactions]
+        self.session.execute(insert(Transaction), rows)
+
+        balances: Dict[str, List[float]] = {}
+        daily: Dict[Tuple[str, int], List[float]] = {}
+        rollups: Dict[Tuple, List[float]] = {}
+
+        for row in rows:
+            user_id = row["user_id"]
+            amount = row["amount"]
+            column = 0 if row["type"] == TransactionType.INCOME else 1
+            year, month = month_of_ordinal(row["date_ordinal"])
+
+            balances.setdefault(user_id, [0.0, 0.0])[column] += amount
+            daily.setdefault((user_id, row["date_ordinal"]), [0.0, 0.0])[column] += amount
+            cell = rollups.setdefault(
+                (user_id, year, month, row["type"].value, row["category"], row["subcategory"] or ""),
+                [0.0, 0]
+            )
+            cell[0] += amount
+            cell[1] += 1
+
+        for user_id, (income, expense) in balances.items():
+            self._increment(UserBalance, {"user_id": user_id}, {"total_income": income, "total_expense": expense})
+
+        for (user_id, date_ordinal), (income, expense) in daily.items():
+            self._increment(
+                DailyBalance,
+                {"user_id": user_id, "date_ordinal": date_ordinal},
+                {"income": income, "expense": expense}
+            )
+
+        columns = ("user_id", "year", "month", "type", "category", "subcategory")
+        for key, (amount, count) in rollups.items():
+            self._increment(MonthlyRollup, dict(zip(columns, key)), {"amount": amount, "count": count})
+
+        self._commit()
+        return len(rows)
+
+    def get(self, user_id: str, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una transacción por id, solo si pertenece al usuario
+        """
+        transaction = self._get_model(user_id, transaction_id)
+        return self._to_dict(transaction) if transaction else None
+
+    def update(self, user_id: str, transaction_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Aplica cambios a una transacción del usuario y confirma la operación
+        """
+        transaction = self._get_model(user_id, transaction_id)
+        if transaction is None:
+            return None
+
+        previous = self._aggregate_fields(transaction)
+
+        for field, value in changes.items():
+            if field == "type":
+                value = TransactionType(value)
+            setattr(transaction, field, value)
+
+        # Mover la transacción en los acumulados si cambió algún campo que los afecta
+        current = self._aggregate_fields(transaction)
+        if current != previous:
+            self._apply_aggregates(user_id, previous, -1)
+            self._apply_aggregates(user_id, current, 1)
+
+        self._commit()
+        return self._to_dict(transaction)
+
+    def delete(self, user_id: str, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Elimina una transacción del usuario y confirma la operación
+        """
+        transaction = self._get_model(user_id, transaction_id)
+        if transaction is None:
+            return None
+
+        data = self._to_dict(transaction)
+        self.session.delete(transaction)
+        self._apply_aggregates(user_id, self._aggregate_fields(transaction), -1)
+        self._commit()
+
+        return data
+
+    def list_for_user(
+        self,
+        user_id: str,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Lista las transacciones de un usuario aplicando filtros y paginación en SQL
+        """
+        query = self.list_query(user_id, transaction_type, category, start_ordinal, end_ordinal, after)
+
+        if skip:
+            query = query.offset(skip)
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [self._to_dict(tx) for tx in self.session.scalars(query)]
+
+    def recent_for_user(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Últimas transacciones del usuario, recorriendo el índice
+        (user_id, date_ordinal, id) en sentido inverso
+        """
+        query = (
+            select(Transaction)
+            .where(Transaction.user_id == user_id)
+            .order_by(Transaction.date_ordinal.desc(), Transaction.id.desc())
+            .limit(limit)
+        )
+        return [self._to_dict(tx) for tx in self.session.scalars(query)]
+
+    def iter_for_user(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre las transacciones del usuario en orden (fecha, id) con un
+        cursor del servidor, trayendo columnas sueltas por lotes de chunk_size
+        """
+        query = self.iter_query(user_id, start_ordinal, end_ordinal, chunk_size)
+        for row in self.session.execute(query):
+            yield self._to_dict(row)
+
+    def iter_query(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> Select:
+        """
+        Consulta de columnas sueltas, en orden (fecha, id), para recorrer el
+        historial con un cursor del servidor
+        """
+        columns = [getattr(Transaction, field) for field in TRANSACTION_FIELDS]
+        return (
+            self.list_query(user_id, start_ordinal=start_ordinal, end_ordinal=end_ordinal)
+            .with_only_columns(*columns)
+            .execution_options(yield_per=chunk_size)
+        )
+
+    def search_for_user(
+        self,
+        user_id: str,
+        query: str,
+        limit: int,
+        after: Optional[Tuple[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca texto en categoría, subcategoría y detalle de las transacciones
+        de un usuario, con paginación por cursor en SQL. En SQLite, con
+        consultas de al menos 3 caracteres, usa el índice FTS5 de trigramas.
+        """
+        statement = self.list_query(user_id, after=after)
+
+        if self._use_fts(query):
+            # Frase entre comillas: coincide como subcadena dentro de un mismo campo
+            phrase = '"' + query.replace('"', '""') + '"'
+            matches = (
+                select(literal_column("rowid"))
+                .select_from(table(SEARCH_TABLE))
+                .where(text(f"{SEARCH_TABLE} MATCH :phrase").bindparams(phrase=phrase))
+            )
+            statement = statement.where(literal_column("transactions.rowid").in_(matches))
+        else:
+            pattern = f"%{query.lower()}%"
+            statement = statement.where(
+                or_(
+                    func.lower(Transaction.category).like(pattern),
+                    func.lower(Transaction.subcategory).like(pattern),
+                    func.lower(Transaction.detail).like(pattern),
+                )
+            )
+
+        statement = statement.limit(limit)
+
+        return [self._to_dict(tx) for tx in self.session.scalars(statement)]
+
+    def _use_fts(self, query: str) -> bool:
+        """
+        Indica si la búsqueda puede resolverse con la tabla FTS5
+        """
+        return (
+            settings.TRANSACTION_SEARCH == "fts5"
+            and len(query) >= 3
+            and self.session.get_bind().dialect.name == "sqlite"
+        )
+
+    def rebuild_search_index(self):
+        """
+        Crea (si falta) y reconstruye el índice FTS5 desde las transacciones
+        """
+        if self.session.get_bind().dialect.name != "sqlite":
+            return
+
+        for statement in SEARCH_DDL:
+            self.session.execute(text(statement))
+        self.session.execute(text(SEARCH_REBUILD))
+        self._commit()
+
+    def get_balance(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None
+    ) -> Tuple[float, float]:
+        """
+        Devuelve (ingresos, egresos) del usuario desde las tablas de totales
+        """
+        if start_ordinal is None and end_ordinal is None:
+            balance = self.session.get(UserBalance, user_id)
+            return (balance.total_income, balance.total_expense) if balance else (0.0, 0.0)
+
+        # Con rango de fechas se suman los totales diarios (una fila por día, no por transacción)
+        query = select(
+            func.coalesce(func.sum(DailyBalance.income), 0.0),
+            func.coalesce(func.sum(DailyBalance.expense), 0.0)
+        ).where(DailyBalance.user_id == user_id)
+
+        if start_ordinal is not None:
+            query = query.where(DailyBalance.date_ordinal >= start_ordinal)
+
+        if end_ordinal is not None:
+            query = query.where(DailyBalance.date_ordinal <= end_ordinal)
+
+        income, expense = self.session.execute(query).one()
+        return income, expense
+
+    def rebuild_balances(self, user_id: Optional[str] = None):
+        """
+        Recalcula user_balances y daily_balances desde las transacciones
+        (de un usuario o de todos), por ejemplo tras una carga fuera del repositorio
+        """
+        income = func.sum(case((Transaction.type == TransactionType.INCOME, Transaction.amount), else_=0.0))
+        expense = func.sum(case((Transaction.type == TransactionType.EXPENSE, Transaction.amount), else_=0.0))
+
+        daily = select(Transaction.user_id, Transaction.date_ordinal, income, expense).group_by(
+            Transaction.user_id, Transaction.date_ordinal
+        )
+        totals = select(Transaction.user_id, income, expense).group_by(Transaction.user_id)
+
+        clear_daily = delete(DailyBalance)
+        clear_totals = delete(UserBalance)
+
+        if user_id is not None:
+            daily = daily.where(Transaction.user_id == user_id)
+            totals = totals.where(Transaction.user_id == user_id)
+            clear_daily = clear_daily.where(DailyBalance.user_id == user_id)
+            clear_totals = clear_totals.where(UserBalance.user_id == user_id)
+
+        self.session.execute(clear_daily)
+        self.session.execute(clear_totals)
+        self.session.execute(
+            insert(DailyBalance).from_select(["user_id", "date_ordinal", "income", "expense"], daily)
+        )
+        self.session.execute(
+            insert(UserBalance).from_select(["user_id", "total_income", "total_expense"], totals)
+        )
+        self._commit()
+
+    def rollup_cells(
+        self,
+        user_id: str,
+        first_month: Optional[Tuple[int, int]] = None,
+        last_month: Optional[Tuple[int, int]] = None,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve las celdas mensuales (tipo, categoría, subcategoría) del usuario
+        """
+        query = select(MonthlyRollup).where(MonthlyRollup.user_id == user_id, MonthlyRollup.count > 0)
+
+        if first_month is not None:
+            query = query.where(tuple_(MonthlyRollup.year, MonthlyRollup.month) >= tuple_(*first_month))
+
+        if last_month is not None:
+            query = query.where(tuple_(MonthlyRollup.year, MonthlyRollup.month) <= tuple_(*last_month))
+
+        if category is not None:
+            query = query.where(MonthlyRollup.category == category)
+
+        return [
+            {
+                "year": cell.year,
+                "month": cell.month,
+                "type": cell.type,
+                "category": cell.category,
+                "subcategory": cell.subcategory or None,
+                "amount": cell.amount,
+                "count": cell.count
+            }
+            for cell in self.session.scalars(query)
+        ]
+
+    def dashboard(self, user_id: str, month: Tuple[int, int], recent: int, limit: int,
+                  income_after: Optional[Tuple[int, str]] = None,
+                  expense_after: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """
+        Datos del panel principal del usuario (ver collect_dashboard)
+        """
+        return collect_dashboard(self, user_id, month, recent, limit, income_after, expense_after)
+
+    def category_totals(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Devuelve monto y cantidad históricos del usuario por (tipo, categoría)
+        """
+        query = (
+            select(
+                MonthlyRollup.type,
+                MonthlyRollup.category,
+                func.sum(MonthlyRollup.amount),
+                func.sum(MonthlyRollup.count)
+            )
+            .where(MonthlyRollup.user_id == user_id, MonthlyRollup.count > 0)
+            .group_by(MonthlyRollup.type, MonthlyRollup.category)
+        )
+
+        return [
+            {"type": tx_type, "category": category, "amount": amount, "count": count}
+            for tx_type, category, amount, count in self.session.execute(query)
+        ]
+
+    def latest_created_at(self, user_id: str):
+        """
+        Fecha de creación de la última transacción del usuario
+        """
+        return self.session.scalar(
+            select(func.max(Transaction.created_at)).where(Transaction.user_id == user_id)
+        )
+
+    def columns_for_user(self, user_id: str) -> TransactionColumns:
+        """
+        Carga en columnas NumPy los montos, tipos, categorías y días del usuario
+        """
+        query = select(
+            Transaction.amount, Transaction.type, Transaction.category, Transaction.date_ordinal
+        ).where(Transaction.user_id == user_id)
+
+        return TransactionColumns.from_transactions(
+            {
+                "amount": amount,
+                "type": TransactionType(tx_type).value,
+                "category": category,
+                "date_ordinal": date_ordinal
+            }
+            for amount, tx_type, category, date_ordinal in self.session.execute(query)
+        )
+
+    def rebuild_rollups(self, user_id: Optional[str] = None, chunk_size: int = 10_000):
+        """
+        Recalcula monthly_rollups desde las transacciones (de un usuario o de
+        todos), recorriéndolas por lotes para no cargarlas en memoria
+        """
+        cells: Dict[Tuple, List[float]] = {}
+
+        query = select(
+            Transaction.user_id, Transaction.type, Transaction.amount,
+            Transaction.date_ordinal, Transaction.category, Transaction.subcategory
+        )
+        clear = delete(MonthlyRollup)
+
+        if user_id is not None:
+            query = query.where(Transaction.user_id == user_id)
+            clear = clear.where(MonthlyRollup.user_id == user_id)
+
+        rows = self.session.execute(query.execution_options(yield_per=chunk_size))
+        for owner, tx_type, amount, date_ordinal, category, subcategory in rows:
+            year, month = month_of_ordinal(date_ordinal)
+            key = (owner, year, month, TransactionType(tx_type).value, category, subcategory or "")
+            cell = cells.setdefault(key, [0.0, 0])
+            cell[0] += amount
+            cell[1] += 1
+
+        self.session.execute(clear)
+
+        columns = ("user_id", "year", "month", "type", "category", "subcategory")
+        values = [
+            {**dict(zip(columns, key)), "amount": amount, "count": count}
+            for key, (amount, count) in cells.items()
+        ]
+        for start in range(0, len(values), chunk_size):
+            self.session.execute(insert(MonthlyRollup), values[start:start + chunk_size])
+
+        self._commit()
+
+
+class AsyncTransactionRepository:
+    """
+    Interfaz asíncrona de TransactionRepository sobre una AsyncSession.
+
+    Cada método ejecuta la implementación síncrona con AsyncSession.run_sync:
+    el código corre en un greenlet sobre la conexión asíncrona (aiosqlite o
+    asyncpg), así que la E/S se espera sin bloquear el event loop y no hace
+    falta duplicar las consultas. iter_for_user usa un resultado en streaming.
+
+    Con un escritor (SQLiteWriter) la sesión solo se usa para leer y los
+    métodos de WRITE_METHODS se encolan en la tarea escritora.
+    """
+
+    def __init__(self, session: AsyncSession, writer=None):
+        self.session = session
+        self.writer = writer
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(TransactionRepository, name, None)):
+            raise AttributeError(name)
+
+        def operation(session: Session, *args, **kwargs):
+            return getattr(TransactionRepository(session), name)(*args, **kwargs)
+
+        async def call(*args, **kwargs):
+            if self.writer is not None and name in WRITE_METHODS:
+                return await self.writer.submit(lambda session: operation(session, *args, **kwargs))
+            return await self.session.run_sync(lambda session: operation(session, *args, **kwargs))
+
+        return call
+
+    async def iter_for_user(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Recorre las transacciones del usuario en orden (fecha, id) por lotes
+        """
+        query = TransactionRepository(self.session.sync_session).iter_query(
+            user_id, start_ordinal, end_ordinal, chunk_size
+        )
+        result = await self.session.stream(query)
+        async for row in result:
+            yield TransactionRepository._to_dict(row)
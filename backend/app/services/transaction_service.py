@@ -1,67 +1,172 @@
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Union
+from datetime import datetime, date
 
-def calculate_balance(transactions: List[Dict[str, Any]]) -> float:
+import numpy as np
+
+from .columnar import TransactionColumns, as_columns
+from ..utils.formatting import month_of_ordinal, month_ordinal_range
+
+# Transacciones como lista de diccionarios o ya en formato columnar
+Transactions = Union[List[Dict[str, Any]], TransactionColumns]
+
+# Etiquetas de mes para las tendencias
+MONTH_LABELS = ("Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic")
+
+def calculate_balance(transactions: Transactions) -> float:
     """
     Calcula el balance financiero basado en ingresos y egresos
     """
-    income_amount = sum(tx["amount"] for tx in transactions if tx["type"] == "income")
-    expense_amount = sum(tx["amount"] for tx in transactions if tx["type"] == "expense")
+    columns = as_columns(transactions)
+    income_amount = columns.amounts[columns.type_mask("income")].sum()
+    expense_amount = columns.amounts[columns.type_mask("expense")].sum()
     
-    return income_amount - expense_amount
+    return float(income_amount - expense_amount)
 
 def get_monthly_transactions(transactions: List[Dict[str, Any]], month: int, year: int) -> List[Dict[str, Any]]:
     """
-    Filtra las transacciones por mes y año
+    Filtra las transacciones por mes y año según su ordinal de día
     """
-    # Nota: En un caso real, se necesitaría parsear la fecha correctamente
-    # Para este ejemplo, asumimos que todas las transacciones son del mes y año dados
-    return transactions
+    start_ordinal, end_ordinal = month_ordinal_range(year, month)
+    days = as_columns(transactions).days
+    rows = np.flatnonzero((days >= start_ordinal) & (days <= end_ordinal))
+    return [transactions[row] for row in rows]
 
-def get_category_summary(transactions: List[Dict[str, Any]], transaction_type: str) -> List[Dict[str, Any]]:
+def get_category_summary(transactions: Transactions, transaction_type: str) -> List[Dict[str, Any]]:
     """
-    Agrupa las transacciones por categoría y calcula estadísticas
+    Agrupa las transacciones por categoría y calcula estadísticas.
+    Acepta transacciones sueltas o celdas ya agregadas (con "count").
     """
-    filtered_transactions = [tx for tx in transactions if tx["type"] == transaction_type]
-    total_amount = sum(tx["amount"] for tx in filtered_transactions)
-    
-    # Agrupar por categoría
-    categories = {}
-    for tx in filtered_transactions:
-        category = tx["category"]
-        if category not in categories:
-            categories[category] = {"amount": 0, "count": 0}
-        
-        categories[category]["amount"] += tx["amount"]
-        categories[category]["count"] += 1
+    columns = as_columns(transactions)
+    mask = columns.type_mask(transaction_type)
+    codes = columns.categories[mask]
+    size = len(columns.category_names)
     
-    # Calcular porcentajes y preparar resultado
-    result = []
-    for category, data in categories.items():
-        percentage = (data["amount"] / total_amount) * 100 if total_amount > 0 else 0
-        result.append({
-            "category": category,
-            "amount": data["amount"],
-            "percentage": percentage,
-            "count": data["count"]
-        })
+    # Agrupar por código de categoría
+    amounts = np.bincount(codes, weights=columns.amounts[mask], minlength=size)
+    counts = np.bincount(codes, weights=columns.counts[mask], minlength=size).astype(np.int64)
+    total_amount = amounts.sum()
     
-    # Ordenar por monto (de mayor a menor)
-    result.sort(key=lambda x: x["amount"], reverse=True)
+    # Ordenar por monto (de mayor a menor), conservando el orden de aparición en empates
+    present = np.flatnonzero(counts > 0)
+    ordered = present[np.argsort(-amounts[present], kind="stable")]
+    percentages = amounts * 100 / total_amount if total_amount > 0 else np.zeros(size)
     
-    return result
+    return [
+        {
+            "category": columns.category_names[code],
+            "amount": float(amounts[code]),
+            "percentage": float(percentages[code]),
+            "count": int(counts[code])
+        }
+        for code in ordered
+    ]
+
+def _shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    """
+    Desplaza un (año, mes) delta meses
+    """
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+def collect_dashboard(
+    source,
+    user_id: str,
+    month: Tuple[int, int],
+    recent: int,
+    limit: int,
+    income_after: Optional[Tuple[int, str]] = None,
+    expense_after: Optional[Tuple[int, str]] = None
+) -> Dict[str, Any]:
+    """
+    Reúne los datos del panel principal desde un almacén o repositorio
+    síncrono: totales, últimas transacciones, una página de cada tipo (con
+    una fila extra para el cursor) y las celdas del mes. Todo sale de los
+    índices y acumulados, sin recorrer las transacciones del usuario, y en
+    SQL se ejecuta en una sola llamada sobre la misma sesión.
+    """
+    return {
+        "balance": source.get_balance(user_id),
+        "recent": source.recent_for_user(user_id, recent),
+        "income": source.list_for_user(user_id, "income", limit=limit + 1, after=income_after),
+        "expense": source.list_for_user(user_id, "expense", limit=limit + 1, after=expense_after),
+        "month_cells": source.rollup_cells(user_id, month, month),
+    }
+
+async def get_category_rows(
+    db,
+    user_id: str,
+    category: str,
+    start_ordinal: Optional[int] = None,
+    end_ordinal: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Obtiene las filas de una categoría en un rango de días: los meses completos
+    se leen de los acumulados mensuales y solo los meses parciales de los
+    extremos se leen transacción por transacción
+    """
+    if start_ordinal is not None and end_ordinal is not None and start_ordinal > end_ordinal:
+        return []
+
+    first_month = last_month = None
+    edges = []
+
+    if start_ordinal is not None:
+        year, month = month_of_ordinal(start_ordinal)
+        month_start, month_end = month_ordinal_range(year, month)
+        if start_ordinal == month_start:
+            first_month = (year, month)
+        else:
+            first_month = _shift_month(year, month, 1)
+            edges.append((start_ordinal, month_end))
 
-def get_transaction_trends(transactions: List[Dict[str, Any]], months: int = 6) -> Dict[str, Any]:
+    if end_ordinal is not None:
+        year, month = month_of_ordinal(end_ordinal)
+        month_start, month_end = month_ordinal_range(year, month)
+        if end_ordinal == month_end:
+            last_month = (year, month)
+        else:
+            last_month = _shift_month(year, month, -1)
+            edges.append((month_start, end_ordinal))
+
+    # Sin ningún mes completo en el rango se lee directamente el rango entero
+    if first_month is not None and last_month is not None and first_month > last_month:
+        return await db.list_for_user(user_id, category=category, start_ordinal=start_ordinal, end_ordinal=end_ordinal)
+
+    rows = await db.rollup_cells(user_id, first_month, last_month, category=category)
+    for edge_start, edge_end in edges:
+        rows.extend(await db.list_for_user(user_id, category=category, start_ordinal=edge_start, end_ordinal=edge_end))
+
+    return rows
+
+def get_transaction_trends(
+    transactions: Transactions,
+    months: int = 6,
+    reference: Optional[date] = None
+) -> Dict[str, Any]:
     """
     Calcula tendencias de ingresos y egresos para los últimos N meses
+    (hasta el mes de `reference`, por defecto el actual)
     """
-    # Nota: En un caso real, se agruparían las transacciones por mes
-    # Para este ejemplo, se devuelve un resultado simulado
+    reference = reference or datetime.utcnow().date()
+    last_month = reference.year * 12 + reference.month - 1
+    first_month = last_month - months + 1
+    
+    # Posición de cada transacción dentro de la ventana de meses
+    columns = as_columns(transactions)
+    positions = columns.months() - first_month
+    in_window = (positions >= 0) & (positions < months)
+    
+    totals = {}
+    for transaction_type in ("income", "expense"):
+        mask = in_window & columns.type_mask(transaction_type)
+        totals[transaction_type] = np.bincount(
+            positions[mask], weights=columns.amounts[mask], minlength=months
+        ).astype(np.float64).tolist()
     
     return {
-        "months": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"],
-        "income": [1000, 1200, 900, 1500, 1300, 1100],
-        "expense": [800, 900, 850, 950, 1000, 900]
+        "months": [MONTH_LABELS[(first_month + offset) % 12] for offset in range(months)],
+        "income": totals["income"],
+        "expense": totals["expense"]
     }
 
 def validate_transaction_data(transaction_data: Dict[str, Any]) -> Dict[str, str]:
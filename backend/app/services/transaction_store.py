@@ -0,0 +1,448 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
+
+from .balance_ledger import BalanceLedger
+from .columnar import TransactionColumns
+from .rollup_cube import RollupCube, Month
+from .search_index import TrigramIndex
+from .transaction_service import collect_dashboard
+
+# Tipos de transacción soportados por los índices secundarios
+TRANSACTION_TYPES = ("income", "expense")
+# Campos de texto cubiertos por la búsqueda
+SEARCH_FIELDS = ("category", "subcategory", "detail")
+
+
+class TransactionStore:
+    """
+    Almacén en memoria de transacciones con índices por usuario, id y tipo.
+
+    Cada registro vive una sola vez y se referencia desde estos índices:
+    - id -> registro
+    - user_id -> {id: registro} (en orden de inserción)
+    - user_id -> tipo -> {id: registro}
+    - user_id -> [tipo | None] -> lista ordenada de (date_ordinal, id)
+    - user_id -> trigrama -> {id} (TrigramIndex, para la búsqueda de texto)
+    - user_id -> columnas NumPy (TransactionColumns, para las tendencias)
+
+    Así las lecturas por usuario cuestan O(transacciones del usuario), los
+    rangos de fechas se resuelven con búsqueda binaria y las búsquedas,
+    actualizaciones y eliminaciones por id cuestan O(1) (más el desplazamiento
+    de la lista ordenada).
+
+    Además mantiene los totales de cada usuario (BalanceLedger) y sus
+    acumulados mensuales por categoría (RollupCube), que se ajustan en la
+    misma llamada que modifica los índices.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_user: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_user_type: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self._date_index: Dict[str, Dict[Optional[str], List[Tuple[int, str]]]] = {}
+        self._balances = BalanceLedger()
+        self._rollups = RollupCube()
+        self._search = TrigramIndex()
+        self._columns: Dict[str, TransactionColumns] = {}
+
+    def _type_bucket(self, user_id: str, transaction_type: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Devuelve (creándolo si no existe) el índice por tipo de un usuario
+        """
+        buckets = self._by_user_type.setdefault(
+            user_id, {tx_type: {} for tx_type in TRANSACTION_TYPES}
+        )
+        return buckets.setdefault(transaction_type, {})
+
+    def _date_keys(self, user_id: str, transaction_type: Optional[str] = None) -> List[Tuple[int, str]]:
+        """
+        Devuelve (creándola si no existe) la lista ordenada por fecha de un usuario
+        """
+        indexes = self._date_index.setdefault(user_id, {})
+        return indexes.setdefault(transaction_type, [])
+
+    def _index_date(self, transaction: Dict[str, Any]):
+        """
+        Registra la transacción en las listas ordenadas por fecha
+        """
+        key = (transaction["date_ordinal"], transaction["id"])
+        insort(self._date_keys(transaction["user_id"]), key)
+        insort(self._date_keys(transaction["user_id"], transaction["type"]), key)
+
+    def _unindex_date(self, transaction: Dict[str, Any]):
+        """
+        Elimina la transacción de las listas ordenadas por fecha
+        """
+        key = (transaction["date_ordinal"], transaction["id"])
+        for keys in (
+            self._date_keys(transaction["user_id"]),
+            self._date_keys(transaction["user_id"], transaction["type"]),
+        ):
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    def _apply_aggregates(self, transaction: Dict[str, Any], sign: int):
+        """
+        Suma o resta la transacción de los totales y acumulados del usuario
+        """
+        self._balances.apply(
+            transaction["user_id"],
+            transaction["type"],
+            transaction["amount"],
+            transaction["date_ordinal"],
+            sign
+        )
+        self._rollups.apply(
+            transaction["user_id"],
+            transaction["type"],
+            transaction["category"],
+            transaction.get("subcategory"),
+            transaction["amount"],
+            transaction["date_ordinal"],
+            sign
+        )
+
+    def _index_text(self, transaction: Dict[str, Any]):
+        """
+        Registra los campos de texto de la transacción en el índice de búsqueda
+        """
+        self._search.add(
+            transaction["user_id"],
+            transaction["id"],
+            (transaction.get(field) for field in SEARCH_FIELDS)
+        )
+
+    def add(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Agrega una transacción y la registra en todos los índices
+        """
+        transaction_id = transaction["id"]
+        user_id = transaction["user_id"]
+
+        self._by_id[transaction_id] = transaction
+        self._by_user.setdefault(user_id, {})[transaction_id] = transaction
+        self._type_bucket(user_id, transaction["type"])[transaction_id] = transaction
+        self._index_date(transaction)
+        self._index_text(transaction)
+        self._columns.setdefault(user_id, TransactionColumns()).append(transaction)
+        self._apply_aggregates(transaction, 1)
+
+        return transaction
+
+    def add_many(self, transactions: List[Dict[str, Any]]) -> int:
+        """
+        Agrega un lote de transacciones (misma interfaz que el repositorio SQL)
+        """
+        for transaction in transactions:
+            self.add(transaction)
+        return len(transactions)
+
+    def get(self, user_id: str, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una transacción por id, solo si pertenece al usuario
+        """
+        transaction = self._by_id.get(transaction_id)
+        if transaction is None or transaction["user_id"] != user_id:
+            return None
+        return transaction
+
+    def update(self, user_id: str, transaction_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Aplica cambios a una transacción del usuario y mantiene los índices
+        """
+        transaction = self.get(user_id, transaction_id)
+        if transaction is None:
+            return None
+
+        # Las claves de fecha dependen del tipo y del ordinal: reindexar si cambian
+        reindex = any(
+            field in changes and changes[field] != transaction[field]
+            for field in ("type", "date_ordinal")
+        )
+        if reindex:
+            self._unindex_date(transaction)
+
+        # Retirar la transacción de los acumulados si cambia algún campo que los afecta
+        reaggregate = any(
+            field in changes and changes[field] != transaction.get(field)
+            for field in ("type", "amount", "date_ordinal", "category", "subcategory")
+        )
+        if reaggregate:
+            self._apply_aggregates(transaction, -1)
+
+        # Reindexar el texto solo si cambia algún campo buscable
+        retext = any(
+            field in changes and changes[field] != transaction.get(field)
+            for field in SEARCH_FIELDS
+        )
+
+        # Si cambia el tipo, mover el registro al índice correspondiente
+        new_type = changes.get("type")
+        if new_type and new_type != transaction["type"]:
+            self._type_bucket(user_id, transaction["type"]).pop(transaction_id, None)
+            self._type_bucket(user_id, new_type)[transaction_id] = transaction
+
+        transaction.update(changes)
+
+        if reindex:
+            self._index_date(transaction)
+
+        if reaggregate:
+            self._apply_aggregates(transaction, 1)
+            self._columns[user_id].update(transaction)
+
+        if retext:
+            self._search.remove(user_id, transaction_id)
+            self._index_text(transaction)
+
+        return transaction
+
+    def delete(self, user_id: str, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Elimina una transacción del usuario de todos los índices
+        """
+        transaction = self.get(user_id, transaction_id)
+        if transaction is None:
+            return None
+
+        del self._by_id[transaction_id]
+        self._by_user[user_id].pop(transaction_id, None)
+        self._type_bucket(user_id, transaction["type"]).pop(transaction_id, None)
+        self._unindex_date(transaction)
+        self._search.remove(user_id, transaction_id)
+        self._columns[user_id].remove(transaction_id)
+        self._apply_aggregates(transaction, -1)
+
+        return transaction
+
+    def list_for_user(
+        self,
+        user_id: str,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Lista las transacciones de un usuario ordenadas por (fecha, id), aplicando
+        filtros y paginación. El rango de fechas y el cursor `after` se resuelven
+        por búsqueda binaria, así que una página profunda cuesta lo mismo que la primera.
+        """
+        keys = self._date_index.get(user_id, {}).get(transaction_type, [])
+
+        # Acotar el rango de fechas sobre la lista ordenada
+        low = bisect_left(keys, (start_ordinal,)) if start_ordinal is not None else 0
+        high = bisect_left(keys, (end_ordinal + 1,)) if end_ordinal is not None else len(keys)
+
+        # Continuar justo después de la última clave de la página anterior
+        if after is not None:
+            low = max(low, bisect_right(keys, after))
+
+        # Sin filtro de categoría la paginación se aplica directamente sobre las claves
+        if not category:
+            low += skip
+            if limit is not None:
+                high = min(high, low + limit)
+            return [self._by_id[tx_id] for _, tx_id in keys[low:high]]
+
+        transactions = [
+            self._by_id[tx_id] for _, tx_id in keys[low:high]
+            if self._by_id[tx_id]["category"] == category
+        ]
+
+        # Aplicar paginación
+        if limit is not None:
+            return transactions[skip:skip + limit]
+        return transactions[skip:]
+
+    def recent_for_user(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Últimas transacciones del usuario, de la más reciente a la más antigua
+        por (fecha, id)
+        """
+        keys = self._date_index.get(user_id, {}).get(None, [])
+        return [self._by_id[tx_id] for _, tx_id in reversed(keys[-limit:])] if limit > 0 else []
+
+    def iter_for_user(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre las transacciones del usuario en orden (fecha, id) por páginas
+        de chunk_size. Cada página continúa por cursor desde la anterior, así
+        que las escrituras concurrentes no desplazan el recorrido.
+        """
+        after = None
+        while True:
+            page = self.list_for_user(
+                user_id, start_ordinal=start_ordinal, end_ordinal=end_ordinal,
+                limit=chunk_size, after=after
+            )
+            yield from page
+            if len(page) < chunk_size:
+                return
+            after = (page[-1]["date_ordinal"], page[-1]["id"])
+
+    @staticmethod
+    def _matches(transaction: Dict[str, Any], query: str) -> bool:
+        """
+        Indica si la consulta (en minúsculas) aparece en algún campo buscable
+        """
+        return any(
+            transaction.get(field) and query in transaction[field].lower()
+            for field in SEARCH_FIELDS
+        )
+
+    def search_for_user(
+        self,
+        user_id: str,
+        query: str,
+        limit: int,
+        after: Optional[Tuple[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca texto en categoría, subcategoría y detalle de las transacciones
+        de un usuario, en orden (fecha, id) y deteniéndose al llenar la página.
+        Los candidatos salen de intersectar los postings de trigramas; solo
+        las consultas de menos de 3 caracteres recorren todo el historial.
+        """
+        query = query.lower()
+        candidates = self._search.candidates(user_id, query)
+
+        if candidates is None:
+            keys = self._date_index.get(user_id, {}).get(None, [])
+        else:
+            keys = sorted((self._by_id[tx_id]["date_ordinal"], tx_id) for tx_id in candidates)
+
+        low = bisect_right(keys, after) if after is not None else 0
+
+        results = []
+        for position in range(low, len(keys)):
+            tx = self._by_id[keys[position][1]]
+            if self._matches(tx, query):
+                results.append(tx)
+                if len(results) >= limit:
+                    break
+
+        return results
+
+    def get_balance(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None
+    ) -> Tuple[float, float]:
+        """
+        Devuelve (ingresos, egresos) del usuario desde los totales incrementales
+        """
+        return self._balances.totals(user_id, start_ordinal, end_ordinal)
+
+    def rollup_cells(
+        self,
+        user_id: str,
+        first_month: Optional[Month] = None,
+        last_month: Optional[Month] = None,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve las celdas mensuales (tipo, categoría, subcategoría) del usuario
+        """
+        return self._rollups.cells(user_id, first_month, last_month, category)
+
+    def dashboard(self, user_id: str, month: Month, recent: int, limit: int,
+                  income_after: Optional[Tuple[int, str]] = None,
+                  expense_after: Optional[Tuple[int, str]] = None) -> Dict[str, Any]:
+        """
+        Datos del panel principal del usuario (ver collect_dashboard)
+        """
+        return collect_dashboard(self, user_id, month, recent, limit, income_after, expense_after)
+
+    def category_totals(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Devuelve monto y cantidad históricos del usuario por (tipo, categoría)
+        """
+        return self._rollups.category_totals(user_id)
+
+    def latest_created_at(self, user_id: str):
+        """
+        Fecha de creación de la última transacción del usuario (el índice
+        por usuario conserva el orden de inserción)
+        """
+        transactions = self._by_user.get(user_id)
+        if not transactions:
+            return None
+        return next(reversed(transactions.values()))["created_at"]
+
+    def columns_for_user(self, user_id: str) -> TransactionColumns:
+        """
+        Devuelve las columnas NumPy (montos, tipos, categorías, días) del usuario
+        """
+        return self._columns.get(user_id) or TransactionColumns()
+
+    def rebuild_aggregates(self):
+        """
+        Recalcula totales y acumulados mensuales desde las transacciones
+        """
+        self._balances.clear()
+        self._rollups.clear()
+        for transaction in self._by_id.values():
+            self._apply_aggregates(transaction, 1)
+
+    def clear(self):
+        """
+        Elimina todas las transacciones de todos los índices
+        """
+        self._by_id.clear()
+        self._by_user.clear()
+        self._by_user_type.clear()
+        self._date_index.clear()
+        self._balances.clear()
+        self._rollups.clear()
+        self._search.clear()
+        self._columns.clear()
+
+
+class AsyncTransactionStore:
+    """
+    Expone el almacén en memoria con la misma interfaz asíncrona que
+    AsyncTransactionRepository. Las operaciones no hacen E/S, así que cada
+    corrutina llama directamente al método síncrono.
+    """
+
+    def __init__(self, store: TransactionStore):
+        self.store = store
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+    async def iter_for_user(
+        self,
+        user_id: str,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Recorre las transacciones del usuario en orden (fecha, id) por páginas
+        """
+        for transaction in self.store.iter_for_user(user_id, start_ordinal, end_ordinal, chunk_size):
+            yield transaction
+
+
+# Instancia compartida por los routers
+transaction_store = TransactionStore()
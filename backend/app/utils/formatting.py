@@ -1,7 +1,9 @@
 import logging
-from datetime import datetime
+import calendar
+from datetime import datetime, date
+from functools import lru_cache
 import locale
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -29,6 +31,59 @@ def parse_spanish_month(month_str: str) -> int:
     month_str = month_str.lower()
     return month_map.get(month_str, 0)
 
+@lru_cache(maxsize=4096)
+def parse_transaction_date(date_str: str, default_year: int) -> Optional[date]:
+    """
+    Convierte la fecha de una transacción en un objeto date.
+    
+    Acepta "DD MMM" (ej: "15 mar", con el año default_year), "DD MMM YYYY",
+    "YYYY-MM-DD" y "DD/MM/YYYY". Devuelve None si no se puede interpretar.
+    """
+    value = date_str.strip()
+    
+    # Formatos numéricos
+    for input_format in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value, input_format).date()
+        except ValueError:
+            continue
+    
+    # Formato con mes abreviado en español
+    parts = value.split()
+    if len(parts) not in (2, 3):
+        return None
+    
+    month = parse_spanish_month(parts[1].rstrip("."))
+    if not month or not parts[0].isdigit():
+        return None
+    
+    try:
+        year = int(parts[2]) if len(parts) == 3 else default_year
+        return date(year, month, int(parts[0]))
+    except ValueError:
+        return None
+
+def date_to_ordinal(date_str: str, default_year: int) -> Optional[int]:
+    """
+    Convierte la fecha de una transacción en su ordinal de día (date.toordinal)
+    """
+    parsed = parse_transaction_date(date_str, default_year)
+    return parsed.toordinal() if parsed else None
+
+def month_ordinal_range(year: int, month: int) -> Tuple[int, int]:
+    """
+    Devuelve el primer y último ordinal de día de un mes
+    """
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1).toordinal(), date(year, month, last_day).toordinal()
+
+def month_of_ordinal(date_ordinal: int) -> Tuple[int, int]:
+    """
+    Devuelve el (año, mes) de un ordinal de día
+    """
+    day = date.fromordinal(date_ordinal)
+    return day.year, day.month
+
 def format_currency(amount: float) -> str:
     """
     Formatea un monto como moneda
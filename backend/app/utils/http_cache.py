@@ -0,0 +1,27 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+
+def make_etag(user_id: str, version: int, resource: str, epoch: str = "") -> str:
+    """
+    ETag fuerte de un recurso del usuario: cambia con la versión de sus
+    datos, con la URL (ruta y consulta) y con el día, porque algunos valores
+    por defecto (mes actual, últimos N meses) dependen de la fecha
+    """
+    digest = hashlib.blake2b(
+        f"{user_id}|{resource}|{datetime.utcnow().date()}|{epoch}".encode(), digest_size=8
+    ).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comprueba If-None-Match contra el ETag (comparación débil, RFC 9110)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
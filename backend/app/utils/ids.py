@@ -0,0 +1,122 @@
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+from ..db_config import settings
+
+# Alfabeto base32 de Crockford: en orden ASCII, así que el orden de las
+# cadenas coincide con el orden numérico de los ids
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+DECODE_MAP = {char: index for index, char in enumerate(ALPHABET)}
+
+# Distribución de los 128 bits: milisegundos | worker | secuencia
+TIMESTAMP_BITS = 48
+WORKER_BITS = 32
+SEQUENCE_BITS = 48
+ID_LENGTH = 26
+
+WORKER_MASK = (1 << WORKER_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+
+def encode_id(value: int) -> str:
+    """
+    Codifica un entero de 128 bits en 26 caracteres base32
+    """
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def decode_id(identifier: str) -> int:
+    """
+    Recupera el entero de un id. Lanza ValueError si no es válido
+    """
+    if len(identifier) != ID_LENGTH:
+        raise ValueError("Id inválido")
+    value = 0
+    for char in identifier.upper():
+        if char not in DECODE_MAP:
+            raise ValueError("Id inválido")
+        value = value * 32 + DECODE_MAP[char]
+    return value
+
+
+class IdGenerator:
+    """
+    Generador de ids ordenables por tiempo (al estilo ULID/Snowflake).
+
+    Cada id son 128 bits: 48 de milisegundos desde epoch, 32 de identificador
+    de worker y 48 de secuencia, codificados en 26 caracteres base32. Dentro
+    de un proceso los ids son estrictamente crecientes: si el reloj no avanza
+    (o retrocede) se reutiliza el último milisegundo y se incrementa la
+    secuencia. El worker distingue a los procesos: se toma de ID_WORKER_ID o,
+    si no está definido, se elige al azar al arrancar y de nuevo en cada fork,
+    así que varios workers generan ids únicos sin un contador compartido.
+
+    Al crecer con el tiempo, las inserciones caen al final del índice de la
+    clave primaria en lugar de repartirse como con uuid4, y el id sirve como
+    criterio de orden estable para paginar.
+    """
+
+    def __init__(self, worker_id: Optional[int] = None):
+        self._configured_worker = worker_id
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """
+        Elige el worker y reinicia la secuencia (al crear el generador y tras un fork)
+        """
+        if self._configured_worker is not None and self._configured_worker >= 0:
+            self.worker_id = self._configured_worker & WORKER_MASK
+        else:
+            self.worker_id = secrets.randbits(WORKER_BITS)
+        self._last_ms = 0
+        self._sequence = 0
+
+    def new_int(self) -> int:
+        """
+        Siguiente id como entero de 128 bits
+        """
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence > SEQUENCE_MASK:
+                    # Secuencia agotada en este milisegundo: se avanza uno
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (
+                (self._last_ms << (WORKER_BITS + SEQUENCE_BITS))
+                | (self.worker_id << SEQUENCE_BITS)
+                | self._sequence
+            )
+
+    def new_id(self) -> str:
+        """
+        Siguiente id como cadena de 26 caracteres
+        """
+        return encode_id(self.new_int())
+
+
+# Generador del proceso
+id_generator = IdGenerator(settings.ID_WORKER_ID)
+
+# Los workers de uvicorn/gunicorn se crean con fork: cada hijo elige su propio worker
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=id_generator._reset)
+
+
+def new_id() -> str:
+    """
+    Genera un id nuevo, único entre procesos y ordenable por tiempo
+    """
+    return id_generator.new_id()
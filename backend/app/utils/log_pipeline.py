@@ -0,0 +1,232 @@
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..db_config import settings
+
+# Logger de las líneas de acceso (una por solicitud)
+ACCESS_LOGGER = "aureum.access"
+# Atributos estándar de LogRecord: el resto son campos `extra`
+STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatea cada registro como un objeto JSON por línea, con los campos
+    `extra` (ruta, estado, duración...) como claves propias
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler sobre una cola acotada: si está llena el registro se
+    descarta y se cuenta, en lugar de bloquear la solicitud que lo emitió
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo se resuelve el mensaje; el formato JSON se aplica en el hilo del listener
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AccessSampler(logging.Filter):
+    """
+    Muestrea las líneas de acceso por ruta. Las respuestas con error (>= 400)
+    y las lentas se registran siempre; el resto con la tasa de la regla de
+    prefijo más larga que coincida con la ruta, o la tasa por defecto.
+    """
+
+    def __init__(self, default_rate: float, rules: Dict[str, float], slow_ms: float):
+        super().__init__()
+        self.default_rate = default_rate
+        # Prefijos más largos primero
+        self.rules = sorted(rules.items(), key=lambda rule: len(rule[0]), reverse=True)
+        self.slow_ms = slow_ms
+        self.sampled_out = 0
+
+    def rate_for(self, route: str) -> float:
+        for prefix, rate in self.rules:
+            if route.startswith(prefix):
+                return rate
+        return self.default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name != ACCESS_LOGGER:
+            return True
+        if getattr(record, "status", 0) >= 400 or getattr(record, "duration_ms", 0) >= self.slow_ms:
+            return True
+
+        rate = self.rate_for(getattr(record, "route", ""))
+        if rate >= 1 or random.random() < rate:
+            if rate < 1:
+                record.sample_rate = rate
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class WarningDeduplicator(logging.Filter):
+    """
+    Limita los avisos repetidos: por cada punto de emisión (logger, nivel,
+    archivo y línea) deja pasar `burst` registros por intervalo y descarta el
+    resto. El primero que pasa tras un periodo con descartes lleva el número
+    de registros omitidos en `suppressed`.
+    """
+
+    def __init__(self, interval: float, burst: int):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.suppressed = 0
+        self._windows: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.interval <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [inicio de la ventana, registros emitidos, registros omitidos]
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                omitted = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if omitted:
+                    record.suppressed = omitted
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+def parse_sample_rules(value: str) -> Dict[str, float]:
+    """
+    Convierte "ruta=tasa,ruta=tasa" en un diccionario
+    """
+    rules = {}
+    for item in value.split(","):
+        if "=" in item:
+            route, rate = item.split("=", 1)
+            rules[route.strip()] = float(rate)
+    return rules
+
+
+class LogPipeline:
+    """
+    Pipeline de logging sin bloqueo: los loggers de la aplicación escriben
+    en una cola acotada (DroppingQueueHandler) y un QueueListener en otro
+    hilo formatea en JSON y escribe en consola y en el archivo rotativo, así
+    que ni el formato ni la escritura ni la rotación ocurren en el camino de
+    la solicitud. Los filtros de muestreo y deduplicación se aplican antes
+    de encolar, para no gastar cola en registros que se van a descartar.
+    """
+
+    def __init__(
+        self,
+        log_file: Optional[Path] = None,
+        level: int = logging.INFO,
+        queue_size: int = settings.LOG_QUEUE_SIZE,
+        json_format: bool = settings.LOG_FORMAT == "json",
+        stream=None
+    ):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.sampler = AccessSampler(
+            settings.LOG_ACCESS_SAMPLE_RATE,
+            parse_sample_rules(settings.LOG_ACCESS_SAMPLE_ROUTES),
+            settings.LOG_ACCESS_SLOW_MS
+        )
+        self.deduplicator = WarningDeduplicator(settings.LOG_DEDUP_INTERVAL_S, settings.LOG_DEDUP_BURST)
+        self.handler.addFilter(self.sampler)
+        self.handler.addFilter(self.deduplicator)
+        self.level = level
+
+        formatter = JsonFormatter() if json_format else logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        outputs = [logging.StreamHandler(stream or sys.stdout)]
+        if log_file is not None:
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            outputs.append(RotatingFileHandler(log_file, maxBytes=10485760, backupCount=5))
+        for output in outputs:
+            output.setFormatter(formatter)
+        self.listener = QueueListener(self.queue, *outputs, respect_handler_level=True)
+
+    def start(self):
+        """
+        Sustituye los handlers del logger raíz por la cola e inicia el listener
+        """
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+        return self
+
+    def stop(self):
+        """
+        Vacía la cola y detiene el listener
+        """
+        if self.listener._thread is not None:
+            self.listener.stop()
+        logging.getLogger().removeHandler(self.handler)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+            "suppressed": self.deduplicator.suppressed,
+        }
+
+
+def setup_logging(log_file: Optional[Path] = None, level: int = logging.INFO) -> LogPipeline:
+    """
+    Configura y arranca el pipeline de logging de la aplicación
+    """
+    return LogPipeline(log_file, level).start()
@@ -0,0 +1,71 @@
+import logging
+import time
+from typing import Iterable, List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .log_pipeline import ACCESS_LOGGER
+
+# Cabeceras de seguridad de todas las respuestas, ya codificadas como las espera ASGI
+SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"content-security-policy", b"default-src 'self'"),
+]
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+
+class SecurityMiddleware:
+    """
+    Middleware ASGI que añade las cabeceras de seguridad y registra la línea
+    de acceso de cada solicitud HTTP.
+
+    A diferencia de @app.middleware("http") (BaseHTTPMiddleware), no crea
+    una tarea ni copia el cuerpo de la respuesta a otro stream: solo
+    intercepta el mensaje http.response.start para añadir las cabeceras y
+    anotar el estado, y deja pasar el cuerpo tal cual. La duración cubre
+    hasta el envío del último fragmento del cuerpo.
+    """
+
+    def __init__(self, app: ASGIApp, headers: Iterable[Tuple[bytes, bytes]] = SECURITY_HEADERS):
+        self.app = app
+        self.headers = list(headers)
+        self.header_names = frozenset(name.lower() for name, _ in self.headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        # Si la aplicación falla antes de responder, ServerErrorMiddleware responde 500
+        status_code = 500
+
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Lista nueva: las cabeceras originales pueden ser las de un objeto Response
+                # reutilizado. Las de seguridad sustituyen a las que ya traiga la respuesta
+                message["headers"] = [
+                    header for header in message.get("headers", ())
+                    if header[0].lower() not in self.header_names
+                ] + self.headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            client = scope.get("client")
+            access_logger.info(
+                f"{scope['method']} {scope['path']} {status_code}",
+                extra={
+                    "client": client[0] if client else "unknown",
+                    "method": scope["method"],
+                    "route": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                }
+            )
@@ -0,0 +1,39 @@
+import base64
+import logging
+from typing import Optional, Tuple
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+def encode_cursor(date_ordinal: int, transaction_id: str) -> str:
+    """
+    Crea un cursor opaco a partir de la clave (fecha, id) de la última transacción
+    """
+    raw = f"{date_ordinal}:{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, str]]:
+    """
+    Recupera la clave (fecha, id) de un cursor. Lanza ValueError si no es válido
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_ordinal, transaction_id = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        return int(date_ordinal), transaction_id
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.warning(f"Cursor de paginación inválido: {cursor}")
+        raise ValueError("Cursor inválido") from e
+
+def page_with_cursor(transactions: list, limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Recorta una página pedida con limit + 1 filas y calcula el siguiente cursor
+    """
+    if len(transactions) <= limit:
+        return transactions, None
+
+    page = transactions[:limit]
+    last = page[-1]
+    return page, encode_cursor(last["date_ordinal"], last["id"])
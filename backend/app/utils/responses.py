@@ -1,8 +1,13 @@
-from typing import Any
+from typing import Any, Dict, Optional
 from fastapi.responses import JSONResponse
 from fastapi import status
 
-def create_error_response(status_code: int, message: str, details: Any = None) -> JSONResponse:
+def create_error_response(
+    status_code: int,
+    message: str,
+    details: Any = None,
+    headers: Optional[Dict[str, str]] = None
+) -> JSONResponse:
     """
     Crea una respuesta de error para la API
     """
@@ -16,7 +21,8 @@ def create_error_response(status_code: int, message: str, details: Any = None) -
     
     return JSONResponse(
         status_code=status_code,
-        content=content
+        content=content,
+        headers=headers
     )
 
 def create_success_response(data: Any = None, message: str = "Operación exitosa") -> JSONResponse:
@@ -5,9 +5,12 @@ from typing import Optional
 import re
 import logging
 import html
-import hashlib
 import secrets
 
+from ..services import password_hashing
+from ..services.password_pool import password_pool
+from ..services.token_cache import token_cache
+
 # Configuración de logging
 logger = logging.getLogger(__name__)
 
@@ -20,12 +23,10 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 # Funciones para manejo de contraseñas
 def hash_password(password: str) -> str:
     """
-    Create salted password hash using SHA-256
+    Create a versioned bcrypt password hash ($2b$<cost>$...)
     """
     try:
-        salt = secrets.token_hex(16)
-        hash_obj = hashlib.sha256(f"{password}{salt}".encode())
-        hashed_password = f"{hash_obj.hexdigest()}:{salt}"
+        hashed_password = password_hashing.hash_password(password)
         logger.debug("Password hashed successfully")
         return hashed_password
     except Exception as e:
@@ -34,16 +35,10 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify password against stored hash
+    Verify password against stored hash (bcrypt or legacy sha256hex:salt)
     """
     try:
-        if ":" not in hashed_password:
-            logger.warning("Invalid hashed password format")
-            return False
-        
-        hash_val, salt = hashed_password.split(":", 1)
-        hash_obj = hashlib.sha256(f"{plain_password}{salt}".encode())
-        is_valid = hash_obj.hexdigest() == hash_val
+        is_valid = password_hashing.verify_password(plain_password, hashed_password)
         
         if is_valid:
             logger.debug("Password verification successful")
@@ -55,6 +50,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         logger.error(f"Error verifying password: {str(e)}")
         return False
 
+async def hash_password_async(password: str) -> str:
+    """
+    Create the password hash in the password pool, off the event loop
+    """
+    return await password_pool.run(password_hashing.hash_password, password, password_hashing.current_rounds())
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify the password in the password pool, off the event loop
+    """
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
 def generate_secure_token(length: int = 32) -> str:
     """
     Generate a secure random token
@@ -67,10 +74,24 @@ def generate_secure_token(length: int = 32) -> str:
         logger.error(f"Error generating secure token: {str(e)}")
         raise
 
+class CurrentUser(dict):
+    """
+    Usuario autenticado construido a partir de los claims del token. Admite
+    acceso por clave (user["id"]) y por atributo (user.id).
+    """
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
 # Función para verificar token y obtener usuario actual
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
-    Obtiene el usuario actual a partir del token JWT
+    Obtiene el usuario actual a partir de los claims verificados del token de
+    acceso (uid, email, nombre, tipo y versión del perfil), sin consultar la
+    base de datos
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,28 +99,42 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Token ya verificado y vigente: se evita decodificarlo y buscar el usuario
+    cached = token_cache.get(token)
+    if cached is not None:
+        if cached["profile_version"] < token_cache.min_version(cached["id"]):
+            raise credentials_exception
+        return CurrentUser(cached)
+    
     try:
         # Decodificar el token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
-            logger.warning("Token JWT sin campo 'sub'")
+        if email is None or not payload.get("uid"):
+            logger.warning("Token JWT sin campos 'sub' o 'uid'")
+            raise credentials_exception
+        if payload.get("typ", "access") != "access":
+            logger.warning("Token JWT que no es de acceso usado para autenticar")
             raise credentials_exception
     except JWTError as e:
         logger.warning(f"Error al decodificar token JWT: {str(e)}")
         raise credentials_exception
     
-    # En un caso real, buscaríamos el usuario en la base de datos
-    # Para este ejemplo, simulamos un usuario
-    user = {
-        "id": "user-123",
-        "name": "Usuario de Prueba",
-        "email": email,
-        "type": "personal"
-    }
+    # El token es de corta duración y está firmado: sus claims bastan
+    user = CurrentUser(
+        id=payload["uid"],
+        name=payload.get("name"),
+        email=email,
+        type=payload.get("type"),
+        profile_version=payload.get("ver", 1),
+    )
     
-    if user is None:
-        logger.warning(f"Usuario no encontrado para email: {email}")
+    # Tokens emitidos antes de un cambio de contraseña o de perfil, o de eliminar la cuenta
+    if user["profile_version"] < token_cache.min_version(user["id"]):
+        logger.warning(f"Token con versión de perfil revocada para: {email}")
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    # Guardar el usuario resuelto hasta que caduque el token
+    token_cache.put(token, user, payload.get("exp", 0), (user["id"], user["email"]))
+    
+    return CurrentUser(user)
\ No newline at end of file
@@ -17,7 +17,8 @@ def validate_input(input_string: str) -> bool:
     result = not bool(pattern.search(input_string))
     
     if not result:
-        logger.warning(f"Detectado posible ataque XSS: {input_string}")
+        # Solo un extracto: la entrada completa puede ser arbitrariamente larga
+        logger.warning(f"Detectado posible ataque XSS: {input_string[:64]!r} ({len(input_string)} caracteres)")
     
     return result
 
@@ -0,0 +1,158 @@
+"""
+Benchmark de concurrencia: sesión síncrona frente a sesión asíncrona.
+
+Carga transacciones sintéticas en un archivo SQLite, levanta uvicorn en un
+proceso aparte y lanza C clientes HTTP concurrentes contra dos endpoints
+equivalentes: uno que consulta con la sesión síncrona dentro de un
+`async def` (el patrón anterior, que bloquea el event loop) y otro que usa
+AsyncTransactionRepository sobre aiosqlite. Cada solicitud hace una búsqueda
+por texto sin índice (recorre las filas del usuario) y un balance por rango.
+Muestra el rendimiento (solicitudes/s) y la latencia p50/p99 de cada uno.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_async_db --clients 100 --requests 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db_config import async_database_url, settings
+from app.models import Base
+from app.services.transaction_repository import AsyncTransactionRepository, TransactionRepository
+from benchmarks.bench_transaction_indexes import load_rows
+
+
+def build_app(database_url: str) -> FastAPI:
+    """
+    Crea una aplicación con la misma consulta servida de forma síncrona y asíncrona
+    """
+    sync_engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    SyncSession = sessionmaker(bind=sync_engine)
+    async_engine = create_async_engine(async_database_url(database_url))
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    # Búsqueda con LIKE: cada solicitud recorre las transacciones del usuario en SQLite
+    settings.TRANSACTION_SEARCH = "like"
+    app = FastAPI()
+
+    @app.get("/sync/{user_id}")
+    async def sync_route(user_id: str):
+        session = SyncSession()
+        try:
+            repository = TransactionRepository(session)
+            found = repository.search_for_user(user_id, "sin coincidencias", limit=20)
+            return {"count": len(found), "balance": repository.get_balance(user_id, 0, 10 ** 7)}
+        finally:
+            session.close()
+
+    @app.get("/async/{user_id}")
+    async def async_route(user_id: str):
+        async with AsyncSession() as session:
+            repository = AsyncTransactionRepository(session)
+            found = await repository.search_for_user(user_id, "sin coincidencias", limit=20)
+            return {"count": len(found), "balance": await repository.get_balance(user_id, 0, 10 ** 7)}
+
+    return app
+
+
+def serve(database_url: str, port: int):
+    """
+    Sirve la aplicación de prueba con uvicorn (se ejecuta en otro proceso)
+    """
+    uvicorn.run(build_app(database_url), host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_for_server(base_url: str):
+    """
+    Espera a que el servidor acepte conexiones
+    """
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        for _ in range(100):
+            try:
+                await http.get("/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("El servidor de prueba no arrancó")
+
+
+async def run_clients(base_url: str, path: str, clients: int, requests: int, users: int):
+    """
+    Lanza `clients` clientes concurrentes que hacen `requests` solicitudes cada uno
+    """
+    latencies = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        async def client(index: int):
+            for i in range(requests):
+                start = time.perf_counter()
+                response = await http.get(f"{path}/user-{(index + i) % users}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(index) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, statistics.median(latencies), p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Número de transacciones a cargar")
+    parser.add_argument("--clients", type=int, default=100, help="Clientes concurrentes")
+    parser.add_argument("--requests", type=int, default=20, help="Solicitudes por cliente")
+    parser.add_argument("--users", type=int, default=10, help="Número de usuarios distintos")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto del servidor de prueba")
+    parser.add_argument("--db", default="bench_async.db", help="Archivo SQLite de trabajo")
+    parser.add_argument("--keep", action="store_true", help="Conservar el archivo al terminar")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+
+    database_url = f"sqlite:///{args.db}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    load_rows(engine, args.rows, args.users)
+    with sessionmaker(bind=engine)() as session:
+        TransactionRepository(session).rebuild_balances()
+    engine.dispose()
+
+    server = multiprocessing.Process(target=serve, args=(database_url, args.port), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        asyncio.run(wait_for_server(base_url))
+
+        print(f"{args.clients} clientes x {args.requests} solicitudes, {args.rows} filas")
+        print(f"\n{'sesión':<10}{'sol/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+        for name, path in (("síncrona", "/sync"), ("asíncrona", "/async")):
+            throughput, p50, p99 = asyncio.run(
+                run_clients(base_url, path, args.clients, args.requests, args.users)
+            )
+            print(f"{name:<10}{throughput:>10.0f}{p50 * 1000:>12.1f}{p99 * 1000:>12.1f}")
+    finally:
+        server.terminate()
+        server.join()
+
+    if not args.keep:
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Latencia de main.py con el logging desactivado, con los handlers síncronos
+anteriores (RotatingFileHandler + consola en el hilo de la solicitud) y con
+el pipeline de cola (app/utils/log_pipeline.py).
+
+Ejecuta la aplicación en proceso con httpx.ASGITransport y el backend de
+estado en memoria, lanza C clientes concurrentes contra /transactions y
+/balance y muestra p50/p99 por modo. La salida de consola de cada modo se
+escribe en un archivo temporal para no medir la terminal. Con el pipeline
+las líneas de acceso se muestrean según LOG_ACCESS_SAMPLE_ROUTES y el
+formato JSON y la escritura ocurren en el hilo del listener.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_logging --clients 32 --requests 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+os.environ.setdefault("STATE_BACKEND", "memory")
+
+import httpx
+
+from app import main
+from app.utils.log_pipeline import LogPipeline
+
+
+def configure(mode: str, workdir: Path):
+    """
+    Instala los handlers del modo indicado y devuelve una función para retirarlos
+    """
+    main.log_pipeline.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+    console = open(workdir / f"{mode}.stdout", "w")
+
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+        return lambda: (logging.disable(logging.NOTSET), console.close())
+
+    if mode == "sync":
+        # Configuración anterior: formato y escritura en el hilo de la solicitud
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        handlers = [
+            RotatingFileHandler(workdir / "sync.log", maxBytes=10485760, backupCount=5),
+            logging.StreamHandler(console),
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+
+        def teardown():
+            for handler in handlers:
+                root.removeHandler(handler)
+                handler.close()
+            console.close()
+        return teardown
+
+    pipeline = LogPipeline(workdir / "queue.log", stream=console).start()
+
+    def teardown():
+        pipeline.stop()
+        console.close()
+        print(f"    métricas del pipeline: {pipeline.metrics()}")
+    return teardown
+
+
+async def run_clients(headers: dict, clients: int, requests: int):
+    """
+    Lanza los clientes y devuelve (p50, p99) en milisegundos
+    """
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as http:
+        async def client(index: int):
+            for i in range(requests):
+                path = "/transactions" if (index + i) % 2 == 0 else "/balance"
+                start = time.perf_counter()
+                response = await http.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        await asyncio.gather(*(client(index) for index in range(clients)))
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return statistics.median(latencies) * 1000, p99 * 1000
+
+
+async def seed(transactions: int) -> dict:
+    """
+    Crea un usuario con transacciones directamente en el estado y devuelve su cabecera
+    """
+    await main.state.startup()
+    await main.state.add_user(main.UserInDB(
+        id="bench-user",
+        email="bench@example.com",
+        name="Bench",
+        type="personal",
+        hashed_password="x"
+    ).dict())
+    for i in range(transactions):
+        await main.state.add_transaction({
+            "id": f"bench-{i}",
+            "user_id": "bench-user",
+            "type": "income" if i % 2 else "expense",
+            "category": "General",
+            "amount": float(i + 1),
+            "detail": "Transaccion de carga",
+            "date": f"2025-03-{i % 28 + 1:02d}",
+            "created_at": datetime(2025, 3, 1),
+        })
+    token = main.create_access_token({"sub": "bench@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=("off", "sync", "queue"), default=["off", "sync", "queue"])
+    parser.add_argument("--clients", type=int, default=32, help="Clientes concurrentes")
+    parser.add_argument("--requests", type=int, default=200, help="Solicitudes por cliente")
+    parser.add_argument("--transactions", type=int, default=50, help="Transacciones del usuario")
+    parser.add_argument("--rounds", type=int, default=3, help="Repeticiones por modo (se toma la mediana)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="aureum_logbench_"))
+    headers = asyncio.run(seed(args.transactions))
+    print(f"{args.clients} clientes x {args.requests} solicitudes, {args.rounds} rondas, {os.cpu_count()} CPU")
+    print(f"\n{'modo':<10}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+
+    for mode in args.modes:
+        results = []
+        for _ in range(args.rounds):
+            teardown = configure(mode, workdir)
+            try:
+                results.append(asyncio.run(run_clients(headers, args.clients, args.requests)))
+            finally:
+                teardown()
+        p50 = statistics.median(result[0] for result in results)
+        p99 = statistics.median(result[1] for result in results)
+        print(f"{mode:<10}{p50:>12.2f}{p99:>12.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,161 @@
+"""
+Solicitudes/s de main.py con el middleware de seguridad anterior
+(@app.middleware("http"), es decir BaseHTTPMiddleware) y con el
+middleware ASGI puro (app/utils/middleware.py), más una línea base sin
+middleware.
+
+Monta las rutas de main.py en una aplicación por modo, con el backend de
+estado en memoria, y lanza C clientes concurrentes por httpx.ASGITransport
+contra /health y contra /transactions con una lista grande. El logging se
+desactiva para medir solo el coste del middleware; ambos emiten la misma
+línea de acceso.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_middleware --transactions 2000 --clients 8 --requests 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from datetime import datetime
+
+os.environ.setdefault("STATE_BACKEND", "memory")
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app import main
+from app.utils.middleware import SecurityMiddleware
+
+
+def legacy_app() -> FastAPI:
+    """
+    Rutas de main.py con el middleware basado en BaseHTTPMiddleware
+    """
+    app = FastAPI()
+    app.router.routes.extend(main.app.router.routes)
+    access_logger = logging.getLogger("aureum.access")
+
+    @app.middleware("http")
+    async def security_middleware(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        access_logger.info(
+            f"{request.method} {request.url.path} {response.status_code}",
+            extra={
+                "client": request.client.host if request.client else "unknown",
+                "method": request.method,
+                "route": request.url.path,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+        )
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Content-Security-Policy"] = "default-src 'self'"
+        return response
+
+    return app
+
+
+def asgi_app() -> FastAPI:
+    """
+    Rutas de main.py con el middleware ASGI puro
+    """
+    app = FastAPI()
+    app.router.routes.extend(main.app.router.routes)
+    app.add_middleware(SecurityMiddleware)
+    return app
+
+
+def bare_app() -> FastAPI:
+    """
+    Rutas de main.py sin middleware de seguridad
+    """
+    app = FastAPI()
+    app.router.routes.extend(main.app.router.routes)
+    return app
+
+
+MODES = {"none": bare_app, "legacy": legacy_app, "asgi": asgi_app}
+
+
+async def seed(transactions: int) -> dict:
+    """
+    Crea un usuario con transacciones directamente en el estado y devuelve su cabecera
+    """
+    await main.state.startup()
+    await main.state.add_user(main.UserInDB(
+        id="bench-user",
+        email="bench@example.com",
+        name="Bench",
+        type="personal",
+        hashed_password="x"
+    ).dict())
+    for i in range(transactions):
+        await main.state.add_transaction({
+            "id": f"bench-{i}",
+            "user_id": "bench-user",
+            "type": "income" if i % 2 else "expense",
+            "category": "General",
+            "amount": float(i + 1),
+            "detail": "Transaccion de carga",
+            "date": f"2025-03-{i % 28 + 1:02d}",
+            "created_at": datetime(2025, 3, 1),
+        })
+    token = main.create_access_token({"sub": "bench@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def run_clients(app: FastAPI, path: str, headers: dict, clients: int, requests: int) -> float:
+    """
+    Lanza los clientes contra una ruta y devuelve solicitudes/s
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as http:
+        async def client():
+            for _ in range(requests):
+                response = await http.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        return clients * requests / (time.perf_counter() - start)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=tuple(MODES), default=list(MODES))
+    parser.add_argument("--paths", nargs="+", default=["/health", "/transactions"], help="Rutas a medir")
+    parser.add_argument("--transactions", type=int, default=2000, help="Transacciones del usuario")
+    parser.add_argument("--clients", type=int, default=8, help="Clientes concurrentes")
+    parser.add_argument("--requests", type=int, default=200, help="Solicitudes por cliente")
+    parser.add_argument("--rounds", type=int, default=3, help="Repeticiones por modo (se toma la mediana)")
+    args = parser.parse_args()
+
+    main.log_pipeline.stop()
+    logging.disable(logging.CRITICAL)
+    headers = asyncio.run(seed(args.transactions))
+    print(f"{args.clients} clientes x {args.requests} solicitudes, {args.transactions} transacciones, "
+          f"{args.rounds} rondas, {os.cpu_count()} CPU")
+
+    for path in args.paths:
+        print(f"\n{path}")
+        print(f"{'modo':<10}{'sol/s':>10}{'vs legacy':>12}")
+        results = {}
+        for mode in args.modes:
+            app = MODES[mode]()
+            results[mode] = statistics.median(
+                asyncio.run(run_clients(app, path, headers, args.clients, args.requests))
+                for _ in range(args.rounds)
+            )
+        for mode, throughput in results.items():
+            ratio = f"x{throughput / results['legacy']:.2f}" if "legacy" in results else "-"
+            print(f"{mode:<10}{throughput:>10.0f}{ratio:>12}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,40 @@
+"""
+Benchmark del coste de bcrypt.
+
+Mide, en este equipo, cuánto tarda crear un hash bcrypt con cada coste del
+rango indicado y muestra la tabla coste / latencia junto con los logins por
+segundo que sostiene cada trabajador del pool de contraseñas. Marca el coste
+que elegiría la calibración de arranque para la latencia objetivo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_password_hash --target-ms 250 --min-rounds 8 --max-rounds 14
+"""
+import argparse
+
+from app.db_config import settings
+from app.services.password_hashing import MAX_BCRYPT_ROUNDS, MIN_BCRYPT_ROUNDS, measure_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=settings.PASSWORD_HASH_TARGET_MS,
+                        help="Latencia objetivo por hash en milisegundos")
+    parser.add_argument("--min-rounds", type=int, default=MIN_BCRYPT_ROUNDS, help="Coste mínimo a medir")
+    parser.add_argument("--max-rounds", type=int, default=MAX_BCRYPT_ROUNDS - 2, help="Coste máximo a medir")
+    parser.add_argument("--samples", type=int, default=3, help="Hashes por coste (se toma la mediana)")
+    args = parser.parse_args()
+
+    table = [(rounds, measure_rounds(rounds, args.samples)) for rounds in range(args.min_rounds, args.max_rounds + 1)]
+    # Mismo criterio que calibrate_rounds: el mayor coste dentro del objetivo
+    within = [rounds for rounds, elapsed in table if elapsed * 1000 <= args.target_ms]
+    chosen = within[-1] if within else args.min_rounds
+
+    print(f"Objetivo: {args.target_ms:.0f} ms por hash, {args.samples} muestras por coste")
+    print(f"\n{'coste':<8}{'ms/hash':>10}{'logins/s':>12}")
+    for rounds, elapsed in table:
+        mark = "  <- calibrado" if rounds == chosen else ""
+        print(f"{rounds:<8}{elapsed * 1000:>10.1f}{1 / elapsed:>12.1f}{mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark de los índices compuestos de la tabla transactions.
+
+Carga N transacciones sintéticas en un archivo SQLite, ejecuta las consultas
+de TransactionRepository sin los índices compuestos y después de crearlos,
+y muestra el plan de consulta (EXPLAIN QUERY PLAN) y el tiempo de cada una.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_transaction_indexes --rows 10000000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.models import Base
+from app.models.transaction import Transaction, TransactionType
+from app.services.transaction_repository import TransactionRepository
+from app.utils.formatting import month_ordinal_range
+
+CATEGORIES = {
+    TransactionType.INCOME: ["Salario", "Venta", "Intereses", "Inversiones", "Bonificación"],
+    TransactionType.EXPENSE: ["Supermercado", "Restaurantes", "Transporte", "Gasolina", "Vivienda", "Ropa"],
+}
+COMPOSITE_INDEXES = [
+    index for index in Transaction.__table__.indexes
+    if index.name.startswith("ix_transactions_user_")
+]
+
+
+def generate_rows(count: int, users: int, seed: int = 42):
+    """
+    Genera transacciones sintéticas repartidas entre varios usuarios
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    first_day = date(now.year - 5, 1, 1).toordinal()
+    for _ in range(count):
+        day = date.fromordinal(first_day + rng.randrange(5 * 365))
+        tx_type = TransactionType.INCOME if rng.random() < 0.3 else TransactionType.EXPENSE
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": f"user-{rng.randrange(users)}",
+            "type": tx_type,
+            "category": rng.choice(CATEGORIES[tx_type]),
+            "subcategory": None,
+            "amount": round(rng.uniform(1, 2000), 2),
+            "date": day.strftime("%d/%m/%Y"),
+            "date_ordinal": day.toordinal(),
+            "detail": "Transacción de prueba",
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+def load_rows(engine, count: int, users: int, chunk_size: int = 50_000):
+    """
+    Inserta las filas por lotes con executemany
+    """
+    insert = Transaction.__table__.insert()
+    chunk = []
+    with engine.begin() as connection:
+        for row in generate_rows(count, users):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                connection.execute(insert, chunk)
+                chunk.clear()
+        if chunk:
+            connection.execute(insert, chunk)
+
+
+def benchmark_queries(engine, user_id: str, repeat: int):
+    """
+    Muestra el plan y el tiempo mediano de cada consulta del repositorio
+    """
+    month_start, month_end = month_ordinal_range(date.today().year - 1, 3)
+
+    with Session(engine) as session:
+        repository = TransactionRepository(session)
+        queries = {
+            "usuario": {},
+            "usuario + tipo": {"transaction_type": "expense"},
+            "usuario + categoría": {"category": "Supermercado"},
+            "usuario + mes": {"start_ordinal": month_start, "end_ordinal": month_end},
+            "usuario + cursor": {"after": (month_start, "")},
+        }
+
+        for name, filters in queries.items():
+            statement = repository.list_query(user_id, **filters).limit(100)
+            sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                session.execute(statement).all()
+                timings.append(time.perf_counter() - start)
+
+            print(f"\n[{name}] mediana: {statistics.median(timings) * 1000:.2f} ms")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Número de transacciones a cargar")
+    parser.add_argument("--users", type=int, default=10_000, help="Número de usuarios distintos")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por consulta")
+    parser.add_argument("--db", default="bench_transactions.db", help="Archivo SQLite de trabajo")
+    parser.add_argument("--keep", action="store_true", help="Conservar el archivo al terminar")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+
+    # Cargar sin los índices compuestos y crearlos al final es mucho más rápido
+    for index in COMPOSITE_INDEXES:
+        index.drop(engine)
+
+    start = time.perf_counter()
+    load_rows(engine, args.rows, args.users)
+    print(f"{args.rows} filas cargadas en {time.perf_counter() - start:.1f} s")
+
+    print("\n=== Sin índices compuestos ===")
+    benchmark_queries(engine, "user-1", args.repeat)
+
+    start = time.perf_counter()
+    for index in COMPOSITE_INDEXES:
+        index.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    print(f"\nÍndices compuestos creados en {time.perf_counter() - start:.1f} s")
+
+    print("\n=== Con índices compuestos ===")
+    benchmark_queries(engine, "user-1", args.repeat)
+
+    engine.dispose()
+    if not args.keep:
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
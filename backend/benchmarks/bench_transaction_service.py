@@ -0,0 +1,152 @@
+"""
+Benchmark del motor columnar de transaction_service.
+
+Genera N transacciones sintéticas y compara las agregaciones con bucles de
+Python sobre listas de diccionarios (la implementación anterior) contra las
+versiones vectorizadas sobre TransactionColumns. Verifica además que ambos
+resultados coincidan.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_transaction_service --rows 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date
+
+from app.services.columnar import TransactionColumns
+from app.services.transaction_service import calculate_balance, get_category_summary, get_transaction_trends
+
+CATEGORIES = {
+    "income": ["Salario", "Venta", "Intereses", "Inversiones", "Bonificación"],
+    "expense": ["Supermercado", "Restaurantes", "Transporte", "Gasolina", "Vivienda", "Ropa"],
+}
+
+
+def generate_transactions(count: int, seed: int = 42):
+    """
+    Genera transacciones sintéticas de un usuario repartidas en dos años
+    """
+    rng = random.Random(seed)
+    first_day = date(date.today().year - 1, 1, 1).toordinal()
+    transactions = []
+    for i in range(count):
+        tx_type = "income" if rng.random() < 0.3 else "expense"
+        transactions.append({
+            "id": str(i),
+            "type": tx_type,
+            "category": rng.choice(CATEGORIES[tx_type]),
+            "amount": round(rng.uniform(1, 2000), 2),
+            "date_ordinal": first_day + rng.randrange(730),
+        })
+    return transactions
+
+
+def loop_balance(transactions):
+    income_amount = sum(tx["amount"] for tx in transactions if tx["type"] == "income")
+    expense_amount = sum(tx["amount"] for tx in transactions if tx["type"] == "expense")
+    return income_amount - expense_amount
+
+
+def loop_category_summary(transactions, transaction_type):
+    filtered_transactions = [tx for tx in transactions if tx["type"] == transaction_type]
+    total_amount = sum(tx["amount"] for tx in filtered_transactions)
+    categories = {}
+    for tx in filtered_transactions:
+        data = categories.setdefault(tx["category"], {"amount": 0, "count": 0})
+        data["amount"] += tx["amount"]
+        data["count"] += 1
+    result = [
+        {
+            "category": category,
+            "amount": data["amount"],
+            "percentage": (data["amount"] / total_amount) * 100 if total_amount > 0 else 0,
+            "count": data["count"]
+        }
+        for category, data in categories.items()
+    ]
+    result.sort(key=lambda x: x["amount"], reverse=True)
+    return result
+
+
+def loop_trends(transactions, months, reference):
+    last_month = reference.year * 12 + reference.month - 1
+    totals = {"income": [0.0] * months, "expense": [0.0] * months}
+    for tx in transactions:
+        day = date.fromordinal(tx["date_ordinal"])
+        position = day.year * 12 + day.month - 1 - (last_month - months + 1)
+        if 0 <= position < months and tx["type"] in totals:
+            totals[tx["type"]][position] += tx["amount"]
+    return totals
+
+
+def measure(function, repeat: int):
+    """
+    Devuelve el resultado y el tiempo mediano de una función
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def check(name: str, expected, result):
+    """
+    Comprueba que la versión columnar devuelva lo mismo que los bucles
+    """
+    if name == "calculate_balance":
+        assert abs(expected - result) < 1e-3 * max(1.0, abs(expected)), name
+    elif name == "get_category_summary":
+        assert [row["category"] for row in expected] == [row["category"] for row in result], name
+        assert [row["count"] for row in expected] == [row["count"] for row in result], name
+    else:
+        for transaction_type in ("income", "expense"):
+            for a, b in zip(expected[transaction_type], result[transaction_type]):
+                assert abs(a - b) < 1e-3 * max(1.0, abs(a)), name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Número de transacciones")
+    parser.add_argument("--months", type=int, default=12, help="Meses de la tendencia")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición")
+    args = parser.parse_args()
+
+    transactions = generate_transactions(args.rows)
+    reference = date.today()
+
+    start = time.perf_counter()
+    columns = TransactionColumns.from_transactions(transactions)
+    print(f"{args.rows} filas convertidas a columnas en {time.perf_counter() - start:.2f} s")
+
+    cases = [
+        (
+            "calculate_balance",
+            lambda: loop_balance(transactions),
+            lambda: calculate_balance(columns),
+        ),
+        (
+            "get_category_summary",
+            lambda: loop_category_summary(transactions, "expense"),
+            lambda: get_category_summary(columns, "expense"),
+        ),
+        (
+            "get_transaction_trends",
+            lambda: loop_trends(transactions, args.months, reference),
+            lambda: get_transaction_trends(columns, args.months, reference),
+        ),
+    ]
+
+    print(f"\n{'función':<24}{'bucles (ms)':>14}{'columnar (ms)':>16}{'aceleración':>14}")
+    for name, loop_version, columnar_version in cases:
+        expected, loop_time = measure(loop_version, args.repeat)
+        result, columnar_time = measure(columnar_version, args.repeat)
+        check(name, expected, result)
+        print(f"{name:<24}{loop_time * 1000:>14.1f}{columnar_time * 1000:>16.1f}{loop_time / columnar_time:>13.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Prueba de carga de main.py con varios workers.
+
+Levanta `uvicorn app.main:app --workers N` para cada N indicado, con el
+backend de estado elegido (STATE_BACKEND), registra un usuario, crea
+transacciones a través de la API y lanza C clientes concurrentes que leen
+/transactions y /balance. Cada respuesta se comprueba contra el total
+esperado: con estado por proceso, los workers que no atendieron las
+escrituras devolverían listas vacías. Muestra solicitudes/s, p50/p99 y la
+aceleración respecto a un worker; el escalado es casi lineal mientras haya
+núcleos libres (con un solo núcleo no puede mejorar).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_workers --backend sql --workers 1 2 4 --clients 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+USER = {"email": "carga@example.com", "name": "Carga", "password": "Secreta123", "birthdate": "1990-01-01"}
+
+
+def start_server(workers: int, port: int, env: dict) -> subprocess.Popen:
+    """
+    Arranca uvicorn con N workers en un proceso aparte
+    """
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_server(base_url: str):
+    """
+    Espera a que el servidor responda en /health
+    """
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        for _ in range(300):
+            try:
+                if (await http.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("El servidor de prueba no arrancó")
+
+
+async def seed(base_url: str, transactions: int) -> dict:
+    """
+    Registra el usuario y crea las transacciones; devuelve la cabecera de autenticación
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        response = await http.post("/register", json=USER)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for i in range(transactions):
+            response = await http.post("/transactions", headers=headers, json={
+                "type": "income" if i % 3 == 0 else "expense",
+                "category": "Carga",
+                "amount": i + 1,
+                "detail": "Transaccion de carga",
+                "date": f"2025-03-{i % 28 + 1:02d}",
+            })
+            response.raise_for_status()
+    return headers
+
+
+async def run_clients(base_url: str, headers: dict, clients: int, requests: int, expected: int):
+    """
+    Lanza los clientes y comprueba que todas las respuestas vean el mismo estado
+    """
+    latencies = []
+    inconsistent = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120) as http:
+        async def client(index: int):
+            nonlocal inconsistent
+            for i in range(requests):
+                path = "/transactions" if (index + i) % 2 == 0 else "/balance"
+                start = time.perf_counter()
+                response = await http.get(path)
+                latencies.append(time.perf_counter() - start)
+                # Un worker que no conoce al usuario o sus transacciones responde
+                # 401 o una lista incompleta
+                if response.status_code != 200:
+                    inconsistent += 1
+                elif path == "/transactions" and len(response.json()) != expected:
+                    inconsistent += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(index) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, statistics.median(latencies), p99, inconsistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sql", "file", "memory"), default="sql", help="STATE_BACKEND a probar")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Números de workers")
+    parser.add_argument("--clients", type=int, default=64, help="Clientes concurrentes")
+    parser.add_argument("--requests", type=int, default=50, help="Solicitudes por cliente")
+    parser.add_argument("--transactions", type=int, default=200, help="Transacciones creadas antes de medir")
+    parser.add_argument("--port", type=int, default=8766, help="Puerto del servidor de prueba")
+    args = parser.parse_args()
+
+    print(f"backend={args.backend}, {args.clients} clientes x {args.requests} solicitudes, {os.cpu_count()} CPU")
+    print(f"\n{'workers':<10}{'sol/s':>10}{'x1':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'incons.':>10}")
+
+    baseline = None
+    for workers in args.workers:
+        workdir = tempfile.mkdtemp(prefix="aureum_bench_")
+        env = dict(
+            os.environ,
+            STATE_BACKEND=args.backend,
+            STATE_FILE=os.path.join(workdir, "state.jsonl"),
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            SQLITE_PROFILE="production",
+            PASSWORD_BCRYPT_ROUNDS="10",
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(workers, args.port, env)
+        try:
+            asyncio.run(wait_for_server(base_url))
+            headers = asyncio.run(seed(base_url, args.transactions))
+            throughput, p50, p99, inconsistent = asyncio.run(
+                run_clients(base_url, headers, args.clients, args.requests, args.transactions)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        baseline = baseline or throughput
+        print(f"{workers:<10}{throughput:>10.0f}{throughput / baseline:>8.2f}{p50 * 1000:>12.1f}{p99 * 1000:>12.1f}{inconsistent:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Configuración común de las pruebas: base de datos SQLite temporal y coste
+mínimo de bcrypt. Las variables se fijan antes de importar la aplicación,
+porque db_config lee la configuración al importarse.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_workdir = tempfile.mkdtemp(prefix="aureum_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("STATE_BACKEND", "memory")
+
+# Permitir ejecutar pytest desde backend/ o desde la raíz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from app.db_config import engine
+from app.models import Base
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """
+    Crea las tablas de la base de datos de pruebas
+    """
+    Base.metadata.create_all(engine)
+    yield
+    engine.dispose()
@@ -0,0 +1,89 @@
+"""
+Pruebas de los GET condicionales (ETag / 304) de las lecturas de transacciones
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import auth, transactions
+from app.app_config import create_app
+from app.db_config import SessionLocal
+from app.models.user import User, UserType
+from app.services.auth_service import get_password_hash
+from app.utils.http_cache import etag_matches
+from app.utils.ids import new_id
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.include_router(auth.router)
+    app.include_router(transactions.router)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    email = f"{new_id().lower()}@example.com"
+    with SessionLocal() as session:
+        session.add(User(
+            id=new_id(),
+            name="Ana",
+            email=email,
+            hashed_password=get_password_hash("Secreta123"),
+            type=UserType.PERSONAL,
+            birthdate="1990-01-01"
+        ))
+        session.commit()
+    response = client.post("/api/auth/token", data={"username": email, "password": "Secreta123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def add_transaction(client: TestClient, headers: dict, amount: float):
+    response = client.post("/api/transactions", headers=headers, json={
+        "type": "income",
+        "category": "Salario",
+        "amount": amount,
+        "date": "2025-03-01",
+        "detail": "Pago mensual",
+    })
+    assert response.status_code == 200
+
+
+def test_matching_etag_returns_304_until_the_data_changes(client, headers):
+    add_transaction(client, headers, 100.0)
+
+    first = client.get("/api/transactions/balance", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    for if_none_match in (etag, f"W/{etag}", f'"otro", {etag}', "*"):
+        cached = client.get("/api/transactions/balance", headers={**headers, "If-None-Match": if_none_match})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+    # Una escritura sube la versión de datos del usuario y cambia el ETag
+    add_transaction(client, headers, 50.0)
+    changed = client.get("/api/transactions/balance", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_etag_depends_on_the_query(client, headers):
+    add_transaction(client, headers, 100.0)
+
+    income = client.get("/api/transactions?type=income", headers=headers)
+    expense = client.get("/api/transactions?type=expense", headers=headers)
+    assert income.headers["etag"] != expense.headers["etag"]
+
+    other = client.get("/api/transactions?type=expense", headers={**headers, "If-None-Match": income.headers["etag"]})
+    assert other.status_code == 200
+
+
+def test_etag_matches():
+    assert etag_matches('"1-abc"', '"1-abc"')
+    assert etag_matches('W/"1-abc"', '"1-abc"')
+    assert not etag_matches(None, '"1-abc"')
+    assert not etag_matches('"2-abc"', '"1-abc"')
@@ -0,0 +1,48 @@
+"""
+Pruebas del generador de ids ordenables por tiempo
+"""
+from app.utils import ids
+from app.utils.ids import ID_LENGTH, SEQUENCE_MASK, IdGenerator, decode_id, encode_id
+
+
+def test_ids_are_strictly_increasing_within_a_millisecond(monkeypatch):
+    monkeypatch.setattr(ids.time, "time_ns", lambda: 1_700_000_000_000_000_000)
+    generator = IdGenerator(worker_id=7)
+
+    generated = [generator.new_id() for _ in range(1000)]
+
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+    assert all(len(identifier) == ID_LENGTH for identifier in generated)
+
+
+def test_ids_keep_increasing_when_the_clock_goes_back(monkeypatch):
+    clock = iter([2_000_000_000, 1_000_000_000, 1_000_000_000, 3_000_000_000])
+    monkeypatch.setattr(ids.time, "time_ns", lambda: next(clock))
+    generator = IdGenerator(worker_id=7)
+
+    generated = [generator.new_int() for _ in range(4)]
+
+    assert generated == sorted(generated)
+    assert len(set(generated)) == 4
+
+
+def test_exhausted_sequence_moves_to_the_next_millisecond(monkeypatch):
+    monkeypatch.setattr(ids.time, "time_ns", lambda: 5_000_000)
+    generator = IdGenerator(worker_id=7)
+    first = generator.new_int()
+    generator._sequence = SEQUENCE_MASK
+
+    following = generator.new_int()
+
+    assert following > first
+    assert generator._last_ms == 6
+    assert generator._sequence == 0
+
+
+def test_encode_and_decode_round_trip():
+    generator = IdGenerator()
+    for _ in range(100):
+        value = generator.new_int()
+        assert decode_id(encode_id(value)) == value
+        assert decode_id(encode_id(value).lower()) == value
@@ -0,0 +1,68 @@
+"""
+Pruebas de la paginación por cursor (clave fecha, id)
+"""
+from datetime import datetime
+
+import pytest
+
+from app.db_config import SessionLocal
+from app.services.transaction_repository import TransactionRepository
+from app.services.transaction_store import TransactionStore
+from app.utils.ids import new_id
+from app.utils.pagination import decode_cursor, encode_cursor, page_with_cursor
+
+
+def test_cursor_round_trip():
+    for date_ordinal, transaction_id in [(739000, new_id()), (1, "a:b:c"), (739000, "ñandú")]:
+        cursor = encode_cursor(date_ordinal, transaction_id)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (date_ordinal, transaction_id)
+
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+# Base64 inválido, "sin" (sin separador) y "abc:id" (fecha no numérica)
+@pytest.mark.parametrize("cursor", ["###", "c2lu", "YWJjOmlk"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request):
+    if request.param == "memory":
+        yield TransactionStore()
+        return
+    session = SessionLocal()
+    yield TransactionRepository(session)
+    session.close()
+
+
+def test_pages_cover_every_transaction_once(store):
+    user_id = new_id()
+    # Varias transacciones por día: el id desempata dentro de la misma fecha
+    for i in range(23):
+        store.add({
+            "id": new_id(),
+            "user_id": user_id,
+            "type": "income" if i % 3 else "expense",
+            "category": "General",
+            "amount": float(i + 1),
+            "date": "2025-03-01",
+            "date_ordinal": datetime(2025, 3, 1).toordinal() + i % 4,
+            "detail": f"Pago {i}",
+            "created_at": datetime(2025, 3, 1),
+        })
+    expected = [(tx["date_ordinal"], tx["id"]) for tx in store.list_for_user(user_id)]
+
+    seen, cursor = [], None
+    while True:
+        rows = store.list_for_user(user_id, limit=5 + 1, after=decode_cursor(cursor))
+        page, cursor = page_with_cursor(rows, 5)
+        seen.extend((tx["date_ordinal"], tx["id"]) for tx in page)
+        if cursor is None:
+            break
+
+    assert seen == sorted(expected)
+    assert len(seen) == 23
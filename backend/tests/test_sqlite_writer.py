@@ -0,0 +1,71 @@
+"""
+Pruebas del escritor único de SQLite con group commit
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.db_config import AsyncSessionLocal, SessionLocal
+from app.services.sqlite_writer import SQLiteWriter
+from app.services.transaction_repository import TransactionRepository
+from app.utils.ids import new_id
+
+
+def transaction(user_id: str, amount: float, transaction_id: str = None) -> dict:
+    return {
+        "id": transaction_id or new_id(),
+        "user_id": user_id,
+        "type": "income",
+        "category": "Salario",
+        "amount": amount,
+        "date": "2025-03-01",
+        "date_ordinal": datetime(2025, 3, 1).toordinal(),
+        "detail": "Pago",
+        "created_at": datetime(2025, 3, 1),
+    }
+
+
+def add(data: dict):
+    return lambda session: TransactionRepository(session).add(data)["id"]
+
+
+@pytest.mark.asyncio
+async def test_batch_commits_every_write_together():
+    writer = SQLiteWriter(AsyncSessionLocal, max_batch=10, max_delay=0.05)
+    user_id = new_id()
+    writes = [transaction(user_id, float(amount)) for amount in (1, 2, 3)]
+
+    ids = await asyncio.gather(*(writer.submit(add(data)) for data in writes))
+    await writer.stop()
+
+    assert ids == [data["id"] for data in writes]
+    with SessionLocal() as session:
+        assert TransactionRepository(session).get_balance(user_id) == (6.0, 0.0)
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_one_by_one(caplog):
+    writer = SQLiteWriter(AsyncSessionLocal, max_batch=10, max_delay=0.05)
+    user_id = new_id()
+    existing = await writer.submit(add(transaction(user_id, 100.0)))
+
+    # El id repetido hace fallar el lote: solo esa escritura debe recibir el error
+    results = await asyncio.gather(
+        writer.submit(add(transaction(user_id, 1.0))),
+        writer.submit(add(transaction(user_id, 2.0, transaction_id=existing))),
+        writer.submit(add(transaction(user_id, 3.0))),
+        return_exceptions=True
+    )
+    await writer.stop()
+
+    assert "Lote de 3 escrituras revertido" in caplog.text
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], IntegrityError)
+    assert isinstance(results[2], str)
+    with SessionLocal() as session:
+        repository = TransactionRepository(session)
+        # Los acumulados del lote revertido no quedan aplicados dos veces
+        assert repository.get_balance(user_id) == (104.0, 0.0)
+        assert len(repository.list_for_user(user_id)) == 3
@@ -0,0 +1,113 @@
+"""
+Pruebas de los backends de estado de main.py
+"""
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from app.services.state_backend import FileStateBackend, MemoryStateBackend, SQLStateBackend
+from app.utils.ids import new_id
+
+
+def user_record(email: str) -> dict:
+    return {"id": new_id(), "email": email, "name": "Ana", "type": "personal", "hashed_password": "hash-1"}
+
+
+@pytest_asyncio.fixture
+async def sql_backend():
+    backend = SQLStateBackend()
+    await backend.startup()
+    yield backend
+    await backend.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sql_users_are_written_through_run_write(sql_backend):
+    email = f"{new_id()}@example.com"
+
+    assert await sql_backend.add_user(user_record(email)) is True
+    # El IntegrityError del email repetido se traduce en False
+    assert await sql_backend.add_user(user_record(email)) is False
+
+    await sql_backend.update_password(email, "hash-2")
+    assert (await sql_backend.get_user(email))["hashed_password"] == "hash-2"
+
+
+@pytest_asyncio.fixture(params=["memory", "file", "sql"])
+async def backend(request):
+    if request.param == "memory":
+        backend = MemoryStateBackend()
+    elif request.param == "file":
+        backend = FileStateBackend(os.path.join(tempfile.mkdtemp(), "state.jsonl"))
+    else:
+        backend = SQLStateBackend()
+    await backend.startup()
+    yield backend
+    await backend.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_unknown_types_are_rejected_on_every_backend(backend):
+    user = {**user_record(f"{new_id()}@example.com"), "type": "otro"}
+    with pytest.raises(ValueError):
+        await backend.add_user(user)
+    assert await backend.get_user(user["email"]) is None
+
+    transaction = {
+        "id": new_id(),
+        "user_id": "u-tipos",
+        "type": "gift",
+        "category": "A",
+        "amount": 1.0,
+        "detail": "x",
+        "date": "2025-03-01",
+        "created_at": datetime(2025, 3, 1),
+    }
+    with pytest.raises(ValueError):
+        await backend.add_transaction(transaction)
+    assert await backend.list_transactions("u-tipos") == []
+
+
+@pytest.mark.asyncio
+async def test_file_backend_compacts_superseded_events():
+    path = os.path.join(tempfile.mkdtemp(), "state.jsonl")
+    writer = FileStateBackend(path, compact_bytes=0)
+    reader = FileStateBackend(path, compact_bytes=0)
+    await writer.startup()
+    await reader.startup()
+
+    user = user_record("ana@example.com")
+    await writer.add_user(user)
+    await writer.add_transaction({
+        "id": new_id(),
+        "user_id": user["id"],
+        "type": "income",
+        "category": "Salario",
+        "amount": 100.0,
+        "detail": "Marzo",
+        "date": "2025-03-01",
+        "created_at": datetime(2025, 3, 1),
+    })
+    for version in range(5):
+        await writer.update_password(user["email"], f"hash-{version}")
+
+    # Los cambios de contraseña se reducen a un evento por registro vivo
+    with open(path) as state_file:
+        assert len(state_file.readlines()) < 7
+
+    # El otro proceso sigue el archivo nuevo y escribe en él
+    assert (await reader.get_user(user["email"]))["hashed_password"] == "hash-4"
+    assert await reader.get_balance(user["id"]) == (100.0, 0.0)
+    assert await reader.add_user(user_record("luis@example.com")) is True
+    assert await writer.get_user("luis@example.com") is not None
+
+    fresh = FileStateBackend(path)
+    await fresh.startup()
+    assert (await fresh.get_user(user["email"]))["hashed_password"] == "hash-4"
+    assert len(await fresh.list_transactions(user["id"])) == 1
+
+    for backend in (writer, reader, fresh):
+        await backend.shutdown()
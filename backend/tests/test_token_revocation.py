@@ -0,0 +1,86 @@
+"""
+Pruebas de la revocación de tokens de acceso tras cambios de perfil
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import auth, users
+from app.app_config import create_app
+from app.db_config import SessionLocal
+from app.models.user import User, UserType
+from app.services.auth_service import get_password_hash
+from app.services.token_cache import TokenCache
+from app.utils.ids import new_id
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.include_router(auth.router)
+    app.include_router(users.router)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def account():
+    email = f"{new_id().lower()}@example.com"
+    with SessionLocal() as session:
+        session.add(User(
+            id=new_id(),
+            name="Ana",
+            email=email,
+            hashed_password=get_password_hash("Secreta123"),
+            type=UserType.PERSONAL,
+            birthdate="1990-01-01"
+        ))
+        session.commit()
+    return email
+
+
+def login(client: TestClient, email: str, password: str) -> dict:
+    response = client.post("/api/auth/token", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_password_change_rejects_earlier_access_tokens(client, account):
+    headers = login(client, account, "Secreta123")
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    response = client.post(
+        "/api/auth/change-password",
+        headers=headers,
+        json={"old_password": "Secreta123", "new_password": "Nueva12345"}
+    )
+    assert response.status_code == 200
+
+    # La entrada en caché se eliminó: el token se decodifica de nuevo y su
+    # versión de perfil queda por debajo de la mínima
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+    new_headers = login(client, account, "Nueva12345")
+    assert client.get("/api/auth/me", headers=new_headers).status_code == 200
+
+
+def test_profile_update_and_deletion_reject_earlier_access_tokens(client, account):
+    headers = login(client, account, "Secreta123")
+    assert client.put("/api/users/me", headers=headers, json={"name": "Beatriz"}).status_code == 200
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+
+    headers = login(client, account, "Secreta123")
+    assert client.get("/api/users/me", headers=headers).json()["name"] == "Beatriz"
+    assert client.delete("/api/users/me", headers=headers).status_code == 200
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+
+
+
+def test_revocation_is_forgotten_once_earlier_tokens_expire():
+    cache = TokenCache(revocation_ttl=0)
+    cache.revoke_before("u1", 3)
+    assert cache.min_version("u1") == 0
+
+    cache = TokenCache()
+    cache.revoke_before("u1", 3)
+    cache.revoke_before("u1", 2)
+    assert cache.min_version("u1") == 3
@@ -0,0 +1,105 @@
+"""
+Pruebas de la importación masiva (CSV y NDJSON)
+"""
+from datetime import datetime
+
+import pytest
+
+from app.services.transaction_export import export_transactions
+from app.services.transaction_import import import_transactions
+
+
+class RecordingStore:
+    """
+    Almacén mínimo que guarda los registros insertados
+    """
+
+    def __init__(self):
+        self.records = []
+
+    async def add_many(self, records):
+        self.records.extend(records)
+        return len(records)
+
+
+def exported_transaction(detail: str) -> dict:
+    return {
+        "id": "01TEST",
+        "type": "expense",
+        "category": "Comida",
+        "subcategory": None,
+        "amount": 12.5,
+        "date": "2025-03-01",
+        "detail": detail,
+        "created_at": datetime(2025, 3, 1, 12, 0),
+    }
+
+
+async def body(transactions, export_format: str):
+    """
+    Cuerpo de una exportación, como lo recibiría la importación
+    """
+    async def source():
+        for tx in transactions:
+            yield tx
+
+    async for chunk in export_transactions(source(), export_format):
+        yield chunk
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("export_format", ["csv", "ndjson"])
+async def test_export_reimport_round_trip_with_multiline_detail(export_format):
+    transactions = [
+        exported_transaction("linea1\nlinea2"),
+        exported_transaction('dijo "hola", y se fue'),
+        exported_transaction("simple"),
+    ]
+    store = RecordingStore()
+
+    result = await import_transactions(store, "u1", body(transactions, export_format), export_format)
+
+    assert result == {"inserted": 3, "failed": 0, "errors": []}
+    assert [record["detail"] for record in store.records] == ["linea1\nlinea2", 'dijo "hola", y se fue', "simple"]
+    assert all(record["amount"] == 12.5 and record["date"] == "2025-03-01" for record in store.records)
+
+
+@pytest.mark.asyncio
+async def test_csv_line_numbers_follow_multiline_records():
+    data = (
+        "type,category,amount,date,detail\n"
+        'income,Sueldo,100,2025-03-01,"varias\nlineas"\n'
+        "income,Sueldo,100\n"
+        'income,Sueldo,100,2025-03-02,"sin cerrar\n'
+    ).encode()
+    store = RecordingStore()
+
+    # Fragmentos pequeños: los registros quedan partidos entre fragmentos
+    result = await import_transactions(store, "u1", chunked(data, 7), "csv")
+
+    assert result["inserted"] == 1
+    assert result["errors"] == [
+        {"line": 4, "error": "Número de columnas incorrecto"},
+        {"line": 5, "error": "Campo entre comillas sin cerrar"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_invalid_utf8_reports_partial_counts():
+    data = (
+        b'{"type":"income","category":"A","amount":1,"date":"2025-03-01","detail":"ok"}\n'
+        b'{"type":"income","detail":"\xff"}\n'
+    )
+    store = RecordingStore()
+
+    # El error llega en un fragmento posterior a la primera línea
+    result = await import_transactions(store, "u1", chunked(data, 16), "ndjson")
+
+    assert result["inserted"] == 1
+    assert result["failed"] == 1
+    assert result["errors"][0]["line"] == 2
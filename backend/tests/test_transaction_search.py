@@ -0,0 +1,68 @@
+"""
+Pruebas del índice FTS5 de búsqueda de transacciones
+"""
+from datetime import datetime
+
+import pytest
+
+from app.db_config import SessionLocal
+from app.db_init import vacuum_database
+from app.services.transaction_repository import TransactionRepository
+from app.utils.ids import new_id
+
+
+def transaction(user_id: str, detail: str) -> dict:
+    now = datetime(2025, 3, 1)
+    return {
+        "id": new_id(),
+        "user_id": user_id,
+        "type": "expense",
+        "category": "Hogar",
+        "amount": 10.0,
+        "date": "2025-03-01",
+        "date_ordinal": now.toordinal(),
+        "detail": detail,
+        "created_at": now,
+    }
+
+
+@pytest.fixture
+def repository():
+    session = SessionLocal()
+    yield TransactionRepository(session)
+    session.close()
+
+
+def found(repository: TransactionRepository, user_id: str, query: str) -> list:
+    return [tx["id"] for tx in repository.search_for_user(user_id, query, limit=50)]
+
+
+def test_index_follows_updates_and_deletes(repository):
+    user_id = new_id()
+    first = repository.add(transaction(user_id, "Factura de electricidad"))
+    second = repository.add(transaction(user_id, "Compra de muebles"))
+
+    assert found(repository, user_id, "electri") == [first["id"]]
+
+    repository.update(user_id, first["id"], {"detail": "Factura del agua"})
+    assert found(repository, user_id, "electri") == []
+    assert found(repository, user_id, "del agua") == [first["id"]]
+
+    repository.delete(user_id, second["id"])
+    assert found(repository, user_id, "muebles") == []
+    assert found(repository, user_id, "Factura") == [first["id"]]
+
+
+def test_index_survives_vacuum(repository):
+    user_id = new_id()
+    removed = [repository.add(transaction(user_id, f"Borrada {i}")) for i in range(5)]
+    kept = repository.add(transaction(user_id, "Suscripción anual"))
+    # Los huecos de rowid que deja el borrado son los que VACUUM puede renumerar
+    for tx in removed:
+        repository.delete(user_id, tx["id"])
+    repository.session.close()
+
+    vacuum_database()
+
+    assert found(repository, user_id, "anual") == [kept["id"]]
+    assert found(repository, user_id, "Borrada") == []